@@ -0,0 +1,135 @@
+"""Benchmark the aggregation of per-host responses in process_inventory.
+
+The legacy aggregation flattened every response from every host and then, for
+each unique host, scanned the flattened list backwards for its last response:
+O(hosts x responses).  process_host now returns its own final response, so
+process_inventory collects one response per host in a single pass.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_aggregation
+    python -m benchmarks.bench_aggregation --hosts 100 1000 10000 --steps 100
+
+The end-to-end runs execute a tree of ``--steps`` Return operations on every
+host.  Return is a PASSTHROUGH operation, so no SSH connection is made.
+"""
+
+import argparse
+import asyncio
+import time
+
+from reemote.execute import process_inventory
+from reemote.system import Return
+
+
+def legacy_aggregate(all_responses):
+    """The aggregation process_inventory used before it was made linear."""
+
+    def recursive_flatten_and_filter(data):
+        if isinstance(data, list):
+            for item in data:
+                yield from recursive_flatten_and_filter(item)
+        elif data is not None:
+            yield data
+
+    flattened_responses = list(recursive_flatten_and_filter(all_responses))
+    unique_hosts = set(item["host"] for item in flattened_responses)
+    return [
+        next(item for item in reversed(flattened_responses) if item["host"] == host)
+        for host in unique_hosts
+    ]
+
+
+def linear_aggregate(final_responses):
+    """The aggregation process_inventory uses now."""
+    responses = {}
+    for response in final_responses:
+        if response is not None:
+            responses[response["host"]] = response
+    return list(responses.values())
+
+
+def host_responses(hosts, steps):
+    return [
+        [
+            {"host": f"host{h}", "value": s, "changed": False, "error": False}
+            for s in range(steps)
+        ]
+        for h in range(hosts)
+    ]
+
+
+def inventory(hosts):
+    return {
+        "hosts": [
+            {"connection": {"host": f"host{h}"}, "groups": ["all"]}
+            for h in range(hosts)
+        ]
+    }
+
+
+class Steps:
+    def __init__(self, steps):
+        self.steps = steps
+
+    async def execute(self):
+        for step in range(self.steps):
+            yield Return(value=step, changed=False)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument(
+        "--legacy-max-hosts",
+        type=int,
+        default=2000,
+        help="skip the legacy aggregation above this many hosts",
+    )
+    parser.add_argument(
+        "--no-end-to-end",
+        action="store_true",
+        help="only benchmark the aggregation step",
+    )
+    args = parser.parse_args()
+
+    print(f"Aggregation only, {args.steps} responses per host")
+    print(f"{'hosts':>8} {'legacy s':>10} {'linear s':>10}")
+    for hosts in args.hosts:
+        responses = host_responses(hosts, args.steps)
+        finals = [r[-1] for r in responses]
+        linear, linear_time = timed(linear_aggregate, finals)
+        assert [r["host"] for r in linear] == [f"host{h}" for h in range(hosts)]
+        if hosts <= args.legacy_max_hosts:
+            legacy, legacy_time = timed(legacy_aggregate, responses)
+            assert sorted(map(id, legacy)) == sorted(map(id, linear))
+            legacy_text = f"{legacy_time:10.4f}"
+        else:
+            legacy_text = f"{'skipped':>10}"
+        print(f"{hosts:>8} {legacy_text} {linear_time:10.4f}")
+
+    if args.no_end_to_end:
+        return
+
+    print(f"\nEnd to end, {args.steps} Return operations per host")
+    print(f"{'hosts':>8} {'total s':>10} {'ops/s':>10}")
+    for hosts in args.hosts:
+        start = time.perf_counter()
+        responses = asyncio.run(
+            process_inventory(inventory(hosts), lambda: Steps(args.steps))
+        )
+        elapsed = time.perf_counter() - start
+        assert len(responses) == hosts
+        assert all(r["value"] == args.steps - 1 for r in responses)
+        print(f"{hosts:>8} {elapsed:10.2f} {hosts * args.steps / elapsed:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
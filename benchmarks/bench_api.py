@@ -0,0 +1,95 @@
+"""Benchmark the REST API endpoints against stand-in SSH servers.
+
+The FastAPI app is called in process through httpx's ASGI transport, so the
+timings include request validation, execution and response serialisation,
+but no HTTP networking.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_api --hosts 8 --rounds 20 --concurrency 4
+
+Latencies are per request.
+"""
+
+import asyncio
+
+import httpx
+
+from reemote.app import app
+
+from benchmarks import harness
+
+
+async def run(args):
+    results = []
+    async with harness.servers(args) as (inventory, stats):
+        with harness.isolated_config(inventory):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://reemote"
+            ) as client:
+
+                def requests(method, url, rounds, concurrency, **kwargs):
+                    async def benchmark(timer):
+                        async def worker(count):
+                            for _ in range(count):
+                                with timer.time():
+                                    response = await client.request(method, url, **kwargs)
+                                response.raise_for_status()
+
+                        per_worker, extra = divmod(rounds, concurrency)
+                        await asyncio.gather(
+                            *(worker(per_worker + (i < extra)) for i in range(concurrency))
+                        )
+
+                    return benchmark
+
+                shell = {"cmd": "echo Hello"}
+                rounds, concurrency = args.rounds, args.concurrency
+                benchmarks = [
+                    # Opens the pooled connections
+                    ("api connect", 1, requests("POST", "/reemote/host/shell", 1, 1, params=shell)),
+                    (
+                        "api shell",
+                        rounds,
+                        requests("POST", "/reemote/host/shell", rounds, concurrency, params=shell),
+                    ),
+                    (
+                        "api shell ndjson",
+                        rounds,
+                        requests(
+                            "POST",
+                            "/reemote/host/shell",
+                            rounds,
+                            concurrency,
+                            params={**shell, "stream": "ndjson"},
+                        ),
+                    ),
+                    (
+                        "api sftp isdir",
+                        rounds,
+                        requests(
+                            "GET", "/reemote/sftp/isdir", rounds, concurrency, params={"path": "."}
+                        ),
+                    ),
+                    (
+                        "api inventory",
+                        rounds,
+                        requests("GET", "/reemote/inventory/get", rounds, concurrency),
+                    ),
+                ]
+                for name, count, benchmark in benchmarks:
+                    results.append(
+                        await harness.measure(name, count, benchmark, stats, args.memory)
+                    )
+    return results
+
+
+def configure(parser):
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="requests in flight at once"
+    )
+
+
+if __name__ == "__main__":
+    harness.main(__doc__.splitlines()[0], run, configure)
@@ -0,0 +1,216 @@
+"""Benchmark compressing shell output and file reads, by bytes on the wire and latency.
+
+Each stand-in server sits behind a relay that counts the bytes crossing it
+in both directions, and can hold them to a bandwidth, as a WAN link would.
+The operations run plain, with SSH compression, and, for Read and Get, with
+the file compressed by gzip or zstd on the host.  Compression trades CPU
+time on both ends for fewer bytes, so it pays on slow links and costs on
+fast ones; run with and without ``--bandwidth`` to see both.
+
+zstd is skipped when it cannot be decompressed locally, which needs
+Python 3.14 or the zstandard package.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --bandwidth 0 --size 33554432
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from reemote.core.compression import decompressor
+from reemote.core.connection_pool import connection_pool
+from reemote.execute import process_inventory
+from reemote.host import Shell
+from reemote.inventory import Connection, Inventory, InventoryItem
+from reemote.sftp import Get, Read
+
+from benchmarks.standin import Standin
+
+
+class Wire:
+    """A TCP relay in front of a server that counts the bytes it carries.
+
+    Args:
+        host: The address the relay and the server listen on.
+        port: The port the relay listens on.
+        target: The port of the server.
+        bandwidth: The bytes per second carried in each direction, or 0 for
+            no limit.
+    """
+
+    def __init__(self, host: str, port: int, target: int, bandwidth: float = 0):
+        self.host = host
+        self.port = port
+        self.target = target
+        self.bandwidth = bandwidth
+        self.bytes = 0
+        self._server = None
+        self._relays = set()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._relay, self.host, self.port)
+
+    async def stop(self) -> None:
+        """Stop listening, and wait for the connections relayed to be closed."""
+        self._server.close()
+        await asyncio.gather(*self._relays)
+
+    async def _relay(self, reader, writer) -> None:
+        self._relays.add(asyncio.current_task())
+        upstream_reader, upstream_writer = await asyncio.open_connection(self.host, self.target)
+        await asyncio.gather(
+            self._pipe(reader, upstream_writer),
+            self._pipe(upstream_reader, writer),
+            return_exceptions=True,
+        )
+
+    async def _pipe(self, reader, writer) -> None:
+        try:
+            while data := await reader.read(65536):
+                self.bytes += len(data)
+                if self.bandwidth:
+                    await asyncio.sleep(len(data) / self.bandwidth)
+                writer.write(data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+def log_text(size: int) -> bytes:
+    """Return about ``size`` bytes of compressible log lines."""
+    rng = random.Random(0)
+    lines = []
+    total = 0
+    while total < size:
+        line = (
+            f"2026-10-18T{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d} "
+            f"web{rng.randrange(8)} nginx[{rng.randrange(1000, 9999)}]: "
+            f"GET /api/v1/items/{rng.randrange(100000)} status={rng.choice((200, 200, 200, 404, 500))} "
+            f"time={rng.random() * 100:.2f}ms\n"
+        )
+        lines.append(line)
+        total += len(line)
+    return "".join(lines).encode()
+
+
+def zstd_available() -> bool:
+    try:
+        decompressor("zstd")
+    except ModuleNotFoundError:
+        return False
+    return True
+
+
+async def measure(inventory, wires, operation, rounds):
+    """Run the operation on every host; return the mean seconds and wire bytes per round."""
+
+    class Root:
+        async def execute(self):
+            yield operation()
+
+    # Open the pooled connections first, so that handshakes are not counted
+    await process_inventory(inventory, lambda: Root())
+    before = sum(wire.bytes for wire in wires)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        responses = await process_inventory(inventory, lambda: Root())
+        assert not any(response["error"] for response in responses), responses
+    seconds = time.perf_counter() - start
+    return seconds / rounds, (sum(wire.bytes for wire in wires) - before) / rounds
+
+
+async def run(args):
+    bandwidth = args.bandwidth * 1e6 / 8
+    text = log_text(args.size)
+    async with Standin(args.hosts, port=args.port, packages=args.packages) as standin:
+        wires = [
+            Wire(standin.address(n), args.port + 1000 + n, args.port + n, bandwidth)
+            for n in range(args.hosts)
+        ]
+        for n, wire in enumerate(wires):
+            await wire.start()
+            (standin.sftp_root(n) / "app.log").write_bytes(text)
+        inventory = Inventory(
+            hosts=[
+                InventoryItem(
+                    connection=Connection(
+                        host=wire.host,
+                        port=wire.port,
+                        username="user",
+                        password="password",
+                        known_hosts=None,
+                    ),
+                )
+                for wire in wires
+            ]
+        )
+
+        methods = ["gzip", "zstd"] if zstd_available() else ["gzip"]
+        operations = [
+            ("apt list", "plain", lambda: Shell(cmd="apt list --installed")),
+            (
+                "apt list",
+                "ssh",
+                lambda: Shell(cmd="apt list --installed", ssh_compression=True),
+            ),
+            ("read", "plain", lambda: Read(path="app.log")),
+            ("read", "ssh", lambda: Read(path="app.log", ssh_compression=True)),
+            *[
+                ("read", method, lambda method=method: Read(path="app.log", compress=method))
+                for method in methods
+            ],
+            ("get", "plain", lambda: Get(remotepaths="app.log", localpath=os.devnull)),
+            (
+                "get",
+                "ssh",
+                lambda: Get(remotepaths="app.log", localpath=os.devnull, ssh_compression=True),
+            ),
+            *[
+                (
+                    "get",
+                    method,
+                    lambda method=method: Get(
+                        remotepaths="app.log", localpath=os.devnull, compress=method
+                    ),
+                )
+                for method in methods
+            ],
+        ]
+
+        link = f"{args.bandwidth:g} Mbit/s" if args.bandwidth else "unlimited"
+        print(
+            f"{args.hosts} hosts, {args.packages} packages, {len(text)} byte log, "
+            f"{link} link, {args.rounds} rounds"
+        )
+        if "zstd" not in methods:
+            print("zstd skipped: needs Python 3.14 or the zstandard package")
+        print(f"{'operation':<10} {'mode':<6} {'KiB/round':>10} {'ms/round':>10}")
+        for name, mode, operation in operations:
+            seconds, wire_bytes = await measure(inventory, wires, operation, args.rounds)
+            print(f"{name:<10} {mode:<6} {wire_bytes / 1024:10.1f} {seconds * 1000:10.1f}")
+
+        await connection_pool.close()
+        for wire in wires:
+            await wire.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--size", type=int, default=4 * 1024 * 1024, help="bytes in the log file")
+    parser.add_argument("--packages", type=int, default=20000, help="packages apt lists")
+    parser.add_argument(
+        "--bandwidth", type=float, default=100, help="Mbit/s of each link, 0 for no limit"
+    )
+    parser.add_argument("--port", type=int, default=22200)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark the executor's per-step handling of a Context.
+
+For every step, process_host used to assign the host's inventory item to the
+Context, and callbacks assigned ``changed`` and ``error``.  Context validates
+assignment, so each step re-validated the inventory item.  The executor now
+copies the Context into a slots-based ExecutionContext and assigns to that.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_context
+    python -m benchmarks.bench_context --steps 200000 --hosts 100
+
+The end-to-end run executes ``--steps`` LOCAL callbacks per host, which set
+``changed`` as the file operations do.  No SSH connection is made.
+"""
+
+import argparse
+import asyncio
+import time
+
+from reemote.context import ConnectionType, Context, ExecutionContext
+from reemote.core.inventory_model import InventoryItem
+from reemote.execute import process_inventory
+
+
+def inventory_item():
+    return InventoryItem.model_validate(
+        {
+            "connection": {"host": "host0", "username": "user", "password": "password"},
+            "authentication": {"sudo_password": "secret"},
+            "groups": ["all", "web", "db"],
+        }
+    )
+
+
+def context():
+    return Context(
+        type=ConnectionType.LOCAL,
+        command="true",
+        call="Bench()",
+        changed=True,
+        group="all",
+    )
+
+
+def legacy_step(context, item):
+    """What a step did to a Context before ExecutionContext."""
+    context.inventory_item = item
+    context.changed = False
+    context.error = False
+    return context
+
+
+def execution_step(context, item):
+    """What a step does now."""
+    execution_context = ExecutionContext(context, item)
+    execution_context.changed = False
+    execution_context.error = False
+    return execution_context
+
+
+def per_step(step, steps):
+    item = inventory_item()
+    contexts = [context() for _ in range(steps)]
+    start = time.perf_counter()
+    for c in contexts:
+        step(c, item)
+    return (time.perf_counter() - start) / steps
+
+
+async def callback(context):
+    context.changed = False
+
+
+class Steps:
+    def __init__(self, steps):
+        self.steps = steps
+
+    async def execute(self):
+        for _ in range(self.steps):
+            yield Context(type=ConnectionType.LOCAL, callback=callback, call="Bench()")
+
+
+def inventory(hosts):
+    return {
+        "hosts": [
+            {"connection": {"host": f"host{h}"}, "groups": ["all"]}
+            for h in range(hosts)
+        ]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=100000)
+    parser.add_argument("--hosts", type=int, default=100)
+    parser.add_argument("--host-steps", type=int, default=200)
+    parser.add_argument(
+        "--no-end-to-end",
+        action="store_true",
+        help="only benchmark the handling of a Context",
+    )
+    args = parser.parse_args()
+
+    print(f"Per step, {args.steps} steps")
+    print(f"{'context':<12} {'us/step':>10}")
+    for name, step in [("legacy", legacy_step), ("execution", execution_step)]:
+        print(f"{name:<12} {per_step(step, args.steps) * 1e6:10.2f}")
+
+    if args.no_end_to_end:
+        return
+
+    print(f"\nEnd to end, {args.hosts} hosts, {args.host_steps} callbacks per host")
+    steps = args.hosts * args.host_steps
+    start = time.perf_counter()
+    responses = asyncio.run(
+        process_inventory(inventory(args.hosts), lambda: Steps(args.host_steps))
+    )
+    elapsed = time.perf_counter() - start
+    assert len(responses) == args.hosts
+    assert not any(r["changed"] for r in responses)
+    print(f"{'total s':>10} {'us/step':>10}")
+    print(f"{elapsed:10.2f} {elapsed / steps * 1e6:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
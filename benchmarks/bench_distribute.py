@@ -0,0 +1,77 @@
+"""Benchmark distributing a file to many hosts, directly and by relay.
+
+Upload sends the file from the API host to every host.  Distribute sends it
+to the first hosts only, which copy it on to the others with scp, so the API
+host's uplink carries the file a few times rather than once per host.  The
+stand-in servers copy between their SFTP roots when they run scp.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_distribute
+    python -m benchmarks.bench_distribute --hosts 32 --size 16777216 --fanout 3
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from reemote.execute import process_inventory
+from reemote.scp import Distribute, Upload
+
+from benchmarks.standin import Standin
+
+
+async def measure(standin, operation):
+    """Run the operation on every host; return the seconds and the responses."""
+    class Root:
+        async def execute(self):
+            yield operation()
+
+    start = time.perf_counter()
+    responses = await process_inventory(standin.inventory(), lambda: Root())
+    seconds = time.perf_counter() - start
+    assert not any(response["error"] for response in responses), responses
+    return seconds, responses
+
+
+async def run(args):
+    with tempfile.NamedTemporaryFile() as f:
+        f.write(os.urandom(args.size))
+        f.flush()
+        async with Standin(args.hosts, port=args.port) as standin:
+            operations = [
+                ("upload", lambda: Upload(srcpaths=[f.name], dstpath="/upload.bin")),
+                (
+                    "distribute",
+                    lambda: Distribute(
+                        srcpaths=[f.name], dstpath="/distribute.bin", fanout=args.fanout
+                    ),
+                ),
+            ]
+            print(f"{args.hosts} hosts, {args.size} bytes, fanout {args.fanout}")
+            print(f"{'operation':<12} {'seconds':>10} {'from API':>10} {'MiB sent':>10}")
+            for name, operation in operations:
+                seconds, responses = await measure(standin, operation)
+                # Distribute returns the seed each host copied from, or None
+                direct = len(responses) if name == "upload" else sum(
+                    response["value"] is None for response in responses
+                )
+                print(
+                    f"{name:<12} {seconds:10.3f} {direct:10d} "
+                    f"{direct * args.size / 2**20:10.1f}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=16)
+    parser.add_argument("--size", type=int, default=4 * 1024 * 1024, help="bytes in the file")
+    parser.add_argument("--fanout", type=int, default=2)
+    parser.add_argument("--port", type=int, default=22200)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
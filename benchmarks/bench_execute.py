@@ -0,0 +1,82 @@
+"""Benchmark execute() against stand-in SSH servers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_execute --hosts 8 --rounds 20
+    python -m benchmarks.bench_execute --subprocess --json execute.json
+
+Latencies are per command, except for "execute calls", where they are per
+call to execute(), and "pipeline commands", where they are per batch of
+--rounds commands.  Use --latency to see the effect of round trips.
+"""
+
+from reemote.apt import GetPackages
+from reemote.execute import execute
+from reemote.host import Pipeline, Shell
+
+from benchmarks import harness
+
+
+class Commands:
+    """Run the same operation ``rounds`` times, timing each one."""
+
+    def __init__(self, timer, rounds, operation):
+        self.timer = timer
+        self.rounds = rounds
+        self.operation = operation
+
+    async def execute(self):
+        for _ in range(self.rounds):
+            with self.timer.time():
+                yield self.operation()
+
+
+async def run(args):
+    results = []
+    async with harness.servers(args) as (inventory, stats):
+
+        async def warmup(timer):
+            with timer.time():
+                await execute(lambda: Shell(cmd="echo Hello"), inventory)
+
+        async def commands(timer):
+            await execute(
+                lambda: Commands(timer, args.rounds, lambda: Shell(cmd="echo Hello")),
+                inventory,
+            )
+
+        async def pipeline(timer):
+            class Batch:
+                async def execute(self):
+                    with timer.time():
+                        yield Pipeline(
+                            operations=[Shell(cmd="echo Hello") for _ in range(args.rounds)]
+                        )
+
+            await execute(lambda: Batch(), inventory)
+
+        async def calls(timer):
+            for _ in range(args.rounds):
+                with timer.time():
+                    await execute(lambda: Shell(cmd="echo Hello"), inventory)
+
+        async def packages(timer):
+            await execute(lambda: Commands(timer, args.rounds, GetPackages), inventory)
+
+        ops = args.hosts * args.rounds
+        for name, count, benchmark in [
+            # Opens the pooled connections, so later benchmarks reuse them
+            ("execute connect", args.hosts, warmup),
+            ("execute commands", ops, commands),
+            ("pipeline commands", ops, pipeline),
+            ("execute calls", ops, calls),
+            ("get_packages", ops, packages),
+        ]:
+            results.append(
+                await harness.measure(name, count, benchmark, stats, args.memory)
+            )
+    return results
+
+
+if __name__ == "__main__":
+    harness.main(__doc__.splitlines()[0], run)
@@ -0,0 +1,72 @@
+"""Benchmark parsing the package listing of GetPackages.
+
+GetPackages used to split the output of ``apt list --installed`` into a list
+of lines, parse each into a dictionary, and validate a PackageModel for each
+package.  It now yields a (name, version) tuple for each line as it is read
+and keeps the tuples; PackageModels are only created when an HTTP response is
+validated.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_packages
+    python -m benchmarks.bench_packages --packages 3000 --hosts 100
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from reemote.apt import PackageList, PackageModel
+from reemote.core.parse_apt_list_installed import (
+    iter_apt_list_installed,
+    parse_apt_list_installed,
+)
+
+from benchmarks.standin import apt_list_installed
+
+
+def legacy_parse(stdout):
+    """The parsing GetPackages did before it kept tuples."""
+    return PackageList(
+        packages=[PackageModel(**pkg) for pkg in parse_apt_list_installed(stdout)]
+    )
+
+
+def tuple_parse(stdout):
+    """The parsing GetPackages does now."""
+    return PackageList.from_tuples(iter_apt_list_installed(stdout))
+
+
+def measure(parse, stdout, hosts):
+    """Parse one listing per host; return the seconds and peak bytes."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    lists = [parse(stdout) for _ in range(hosts)]
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert all(len(package_list.packages) == len(lists[0].packages) for package_list in lists)
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packages", type=int, default=2500, help="packages per host")
+    parser.add_argument("--hosts", type=int, default=50)
+    args = parser.parse_args()
+
+    stdout = apt_list_installed(args.packages)
+    assert tuple_parse(stdout).model_dump() == legacy_parse(stdout).model_dump()
+
+    print(f"{args.hosts} hosts, {args.packages} packages each")
+    print(f"{'parser':<10} {'total s':>10} {'ms/host':>10} {'peak MiB':>10}")
+    for name, parse in [("legacy", legacy_parse), ("tuples", tuple_parse)]:
+        seconds, peak = measure(parse, stdout, args.hosts)
+        print(
+            f"{name:<10} {seconds:10.3f} {seconds / args.hosts * 1000:10.2f} "
+            f"{peak / 2**20:10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
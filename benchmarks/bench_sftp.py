@@ -0,0 +1,58 @@
+"""Benchmark the SFTP operations against stand-in SFTP servers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sftp --hosts 8 --rounds 20 --size 65536
+
+Latencies are per operation.
+"""
+
+from reemote.execute import execute
+from reemote.sftp import Isdir, Makedirs, Read, Rmtree, Stat, Write
+
+from benchmarks import harness
+from benchmarks.bench_execute import Commands
+
+
+async def run(args):
+    results = []
+    text = "x" * args.size
+    async with harness.servers(args) as (inventory, stats):
+
+        def operations(operation):
+            async def benchmark(timer):
+                await execute(
+                    lambda: Commands(timer, args.rounds, operation), inventory
+                )
+
+            return benchmark
+
+        async def setup(timer):
+            with timer.time():
+                await execute(lambda: Makedirs(path="bench"), inventory)
+
+        ops = args.hosts * args.rounds
+        benchmarks = [
+            # Opens the pooled connections and SFTP sessions
+            ("sftp makedirs", args.hosts, setup),
+            ("sftp write", ops, operations(lambda: Write(path="bench/file", text=text))),
+            ("sftp read", ops, operations(lambda: Read(path="bench/file"))),
+            ("sftp stat", ops, operations(lambda: Stat(path="bench/file"))),
+            ("sftp isdir", ops, operations(lambda: Isdir(path="bench"))),
+        ]
+        for name, count, benchmark in benchmarks:
+            results.append(
+                await harness.measure(name, count, benchmark, stats, args.memory)
+            )
+        await execute(lambda: Rmtree(path="bench"), inventory)
+    return results
+
+
+def configure(parser):
+    parser.add_argument(
+        "--size", type=int, default=4096, help="bytes written and read per operation"
+    )
+
+
+if __name__ == "__main__":
+    harness.main(__doc__.splitlines()[0], run, configure)
@@ -0,0 +1,264 @@
+"""Shared measurement and reporting for the benchmarks."""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from reemote.config import Config
+from reemote.core.connection_pool import connection_pool
+from reemote.inventory import Inventory
+
+from benchmarks.standin import BASE_PORT, Standin, Stats, inventory
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Return the p-th percentile of ``values`` by the nearest-rank method."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Result:
+    """The measurements of one benchmark."""
+
+    def __init__(self, name: str, ops: int, seconds: float, latencies: List[float]):
+        self.name = name
+        self.ops = ops
+        self.seconds = seconds
+        self.latencies = latencies
+        self.peak_memory: Optional[int] = None
+        self.connects: Optional[int] = None
+        self.server_connections: Optional[int] = None
+        self.server_channels: Optional[int] = None
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.ops / self.seconds if self.seconds else math.inf
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "ops": self.ops,
+            "seconds": self.seconds,
+            "ops_per_sec": self.ops_per_sec,
+            "p50": percentile(self.latencies, 50),
+            "p90": percentile(self.latencies, 90),
+            "p99": percentile(self.latencies, 99),
+            "peak_memory": self.peak_memory,
+            "connects": self.connects,
+            "server_connections": self.server_connections,
+            "server_channels": self.server_channels,
+        }
+
+
+class Timer:
+    """Record the latency of each operation, for example each host's tree."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+async def measure(
+    name: str,
+    ops: int,
+    run: Callable[[Timer], Awaitable[None]],
+    stats: Optional[Stats] = None,
+    memory: bool = False,
+) -> Result:
+    """Run ``run`` once and measure it.
+
+    Args:
+        name: The name reported for the benchmark.
+        ops: The number of operations ``run`` performs, to compute ops/sec.
+        run: Called with a Timer that it uses to record latencies.
+        stats: The stand-in servers' counters, when they run in this process.
+        memory: Trace allocations to report the peak memory.  Tracing slows
+            the benchmark, so the timings of a traced run are not comparable
+            with an untraced one.
+    """
+    timer = Timer()
+    connects = connection_pool.connects
+    connections = stats.connections if stats else 0
+    channels = stats.channels if stats else 0
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        await run(timer)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+    finally:
+        if memory:
+            tracemalloc.stop()
+    result = Result(name, ops, seconds, timer.latencies)
+    result.peak_memory = peak
+    result.connects = connection_pool.connects - connects
+    if stats:
+        result.server_connections = stats.connections - connections
+        result.server_channels = stats.channels - channels
+    return result
+
+
+@asynccontextmanager
+async def servers(args: argparse.Namespace) -> AsyncIterator[tuple[Inventory, Optional[Stats]]]:
+    """Start the stand-in servers, in this process or in a subprocess.
+
+    Yields the inventory of the servers and, for in-process servers, their
+    counters.  Pooled connections to the servers are closed on exit.
+    """
+    try:
+        if args.subprocess:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                "benchmarks.standin",
+                "--hosts",
+                str(args.hosts),
+                "--port",
+                str(args.port),
+                "--latency",
+                str(args.latency),
+                stdout=asyncio.subprocess.PIPE,
+            )
+            try:
+                line = await process.stdout.readline()
+                if line.strip() != b"ready":
+                    raise RuntimeError("The stand-in servers did not start")
+                yield inventory(args.hosts, args.port), None
+            finally:
+                process.terminate()
+                await process.wait()
+        else:
+            async with Standin(args.hosts, port=args.port, latency=args.latency) as standin:
+                yield standin.inventory(), standin.stats
+    finally:
+        await connection_pool.close()
+
+
+@contextmanager
+def isolated_config(inventory: Inventory) -> Iterator[Config]:
+    """Point Config at a temporary data directory holding ``inventory``.
+
+    The endpoints read the inventory through Config, so this keeps the
+    benchmarks away from the user's own configuration.
+    """
+    data_dir = Config.data_dir
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.data_dir = Path(tmp)
+        try:
+            config = Config()
+            config.set_inventory(inventory.to_json_serializable())
+            yield config
+        finally:
+            Config.data_dir = data_dir
+
+
+def parser(description: str) -> argparse.ArgumentParser:
+    """Return an argument parser with the options every benchmark accepts."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--hosts", type=int, default=8, help="number of stand-in hosts")
+    parser.add_argument("--rounds", type=int, default=20, help="operations per host")
+    parser.add_argument("--port", type=int, default=BASE_PORT)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds each command waits"
+    )
+    parser.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="run the stand-in servers in another process",
+    )
+    parser.add_argument(
+        "--memory", action="store_true", help="trace allocations to report peak memory"
+    )
+    parser.add_argument("--json", type=str, help="write the results to this file")
+    parser.add_argument(
+        "--compare",
+        type=str,
+        help="compare ops/sec with results written earlier by --json",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="fraction by which ops/sec may fall before --compare fails",
+    )
+    return parser
+
+
+def report(results: List[Result]) -> None:
+    """Print a table of results."""
+
+    def text(value, fmt):
+        return "-" if value is None else format(value, fmt)
+
+    print(
+        f"{'benchmark':<28} {'ops':>7} {'ops/s':>10} {'p50 ms':>9} {'p90 ms':>9} "
+        f"{'p99 ms':>9} {'peak MiB':>9} {'connects':>8} {'srv conn':>8} {'srv chan':>8}"
+    )
+    for result in results:
+        row = result.to_dict()
+        print(
+            f"{result.name:<28} {result.ops:>7} {result.ops_per_sec:>10.1f} "
+            f"{row['p50'] * 1000:>9.2f} {row['p90'] * 1000:>9.2f} {row['p99'] * 1000:>9.2f} "
+            f"{text(result.peak_memory and result.peak_memory / 2**20, '9.1f'):>9} "
+            f"{text(result.connects, 'd'):>8} {text(result.server_connections, 'd'):>8} "
+            f"{text(result.server_channels, 'd'):>8}"
+        )
+
+
+def compare(results: List[Result], path: str, tolerance: float) -> bool:
+    """Report benchmarks whose ops/sec fell by more than ``tolerance``."""
+    with open(path) as f:
+        baseline = {row["name"]: row for row in json.load(f)}
+    ok = True
+    for result in results:
+        row = baseline.get(result.name)
+        if row is None:
+            continue
+        if result.ops_per_sec < row["ops_per_sec"] * (1 - tolerance):
+            print(
+                f"REGRESSION {result.name}: {result.ops_per_sec:.1f} ops/s, "
+                f"baseline {row['ops_per_sec']:.1f} ops/s"
+            )
+            ok = False
+    return ok
+
+
+def main(
+    description: str,
+    run: Callable[[argparse.Namespace], Awaitable[List[Result]]],
+    configure: Optional[Callable[[argparse.ArgumentParser], None]] = None,
+) -> None:
+    """Parse the command line, run the benchmarks, and report the results.
+
+    Exits with status 1 if --compare finds a regression.
+    """
+    argument_parser = parser(description)
+    if configure is not None:
+        configure(argument_parser)
+    args = argument_parser.parse_args()
+    results = asyncio.run(run(args))
+    report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([result.to_dict() for result in results], f, indent=2)
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
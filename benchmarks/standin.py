@@ -0,0 +1,377 @@
+"""Stand-in SSH/SFTP servers for benchmarking reemote without real hosts.
+
+Each server listens on its own loopback address, 127.0.0.<n>, so that every
+server is a distinct inventory host.  The servers accept any password and
+run a fake shell: ``echo`` prints its arguments, the apt and dpkg commands
+print canned output, ``scp`` copies files to another of the servers, the
+``gzip`` and ``zstd`` commands of compressed reads run for real on the
+host's files, and any other command prints the command line.  SFTP is
+real, rooted in a per-host directory under a temporary directory.
+
+Run the servers in another process, so they do not share the event loop
+with the client being measured:
+
+    python -m benchmarks.standin --hosts 8
+"""
+
+import argparse
+import asyncio
+import re
+import shlex
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import asyncssh
+from asyncssh.scp import run_scp_server
+
+from reemote.inventory import Connection, Inventory, InventoryItem
+
+BASE_PORT = 22200
+
+# A command framed by reemote's shell channel
+FRAMED_COMMAND = re.compile(
+    r"sh -c (?P<command>.*) </dev/null; "
+    r"printf '(?P<marker>\w+)%d__' \$\?; printf '(?P=marker)' >&2"
+)
+
+# A command of reemote's compressed reads, of a path relative to the SFTP root
+_PATH = r"(?:'[^']*'|[^\s'|;&<>`$]+)"
+COMPRESS_COMMAND = re.compile(
+    rf"(?:tail -c \+\d+ -- {_PATH}(?: \| head -c \d+)? \| )?"
+    rf"(?:gzip -c|zstd -c -q)(?: -- {_PATH})?"
+)
+
+
+def apt_list_installed(packages: int) -> str:
+    lines = ["Listing..."]
+    for i in range(packages):
+        lines.append(f"package{i}/stable,now 1.{i}.0-1 amd64 [installed]")
+    return "\n".join(lines) + "\n"
+
+
+def dpkg_query(names: List[str], packages: int) -> str:
+    """List those of ``names`` that ``apt_list_installed(packages)`` lists."""
+    lines = []
+    for name in names:
+        match = re.fullmatch(r"package(\d+)", name)
+        if match and int(match[1]) < packages:
+            lines.append(f"{name}\t1.{match[1]}.0-1\tinstall ok installed\n")
+    return "".join(lines)
+
+
+class Stats:
+    """Counts of the connections, channels, scp and compression commands on the servers."""
+
+    def __init__(self):
+        self.connections = 0
+        self.channels = 0
+        self.scps = 0
+        self.compressions = 0
+
+
+class _Server(asyncssh.SSHServer):
+    def __init__(self, stats: Stats):
+        self._stats = stats
+
+    def connection_made(self, conn):
+        self._stats.connections += 1
+
+    def begin_auth(self, username):
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    def validate_password(self, username, password):
+        return True
+
+
+class FakeShell:
+    """Answer commands with canned output instead of running them.
+
+    Args:
+        packages: The number of packages listed by ``apt list --installed``.
+        latency: Seconds to wait before answering each command, to simulate
+            a remote host.
+    """
+
+    def __init__(self, packages: int = 2000, latency: float = 0.0):
+        self.packages = packages
+        self.latency = latency
+        self._apt_list = apt_list_installed(packages)
+
+    def run(self, command: str) -> str:
+        # Strip "echo password | sudo -S" and "sudo" prefixes
+        if "sudo -S " in command:
+            command = command.split("sudo -S ", 1)[1]
+        elif command.startswith("sudo "):
+            command = command[len("sudo "):]
+        try:
+            args = shlex.split(command)
+        except ValueError:
+            args = command.split()
+        if not args:
+            return ""
+        if args[0] == "echo":
+            return " ".join(args[1:]) + "\n"
+        if args[:3] == ["apt", "list", "--installed"]:
+            return self._apt_list
+        if args[0] == "dpkg-query":
+            names = [arg for arg in args[1:] if not arg.startswith("-")]
+            return dpkg_query(names, self.packages)
+        return command + "\n"
+
+    async def __call__(self, process: asyncssh.SSHServerProcess) -> None:
+        if process.command == "sh":
+            await self.shell(process)
+            return
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        process.stdout.write(self.run(process.command or "").encode())
+        process.exit(0)
+
+    async def shell(self, process: asyncssh.SSHServerProcess) -> None:
+        """Answer the framed commands written by reemote's shell channel.
+
+        Each answer is delayed by ``latency`` from when its command arrived,
+        like a reply crossing a network, so commands written together are
+        answered together.
+        """
+        loop = asyncio.get_running_loop()
+        answers: asyncio.Queue = asyncio.Queue()
+
+        async def answer():
+            while True:
+                item = await answers.get()
+                if item is None:
+                    break
+                deadline, line = item
+                await asyncio.sleep(deadline - loop.time())
+                match = FRAMED_COMMAND.fullmatch(line)
+                if match is None:
+                    process.stdout.write(self.run(line).encode())
+                    continue
+                command = shlex.split(match["command"])[0]
+                process.stdout.write((self.run(command) + f"{match['marker']}0__").encode())
+                process.stderr.write(match["marker"].encode())
+
+        answerer = asyncio.create_task(answer())
+        try:
+            async for line in process.stdin:
+                await answers.put((loop.time() + self.latency, line.decode().rstrip("\n")))
+        except asyncssh.BreakReceived:
+            pass
+        await answers.put(None)
+        await answerer
+        process.exit(0)
+
+
+class Standin:
+    """Run ``hosts`` stand-in servers in the current event loop.
+
+    Use as an async context manager.  ``inventory()`` returns an Inventory
+    that connects to the servers.
+
+    Args:
+        hosts: The number of servers.
+        port: The port of the first server; server n listens on port + n.
+        root: The directory holding each server's SFTP root, or None for a
+            new temporary directory.
+        packages: The number of packages listed by ``apt list --installed``.
+        latency: Seconds each command waits before answering.
+    """
+
+    def __init__(
+        self,
+        hosts: int,
+        port: int = BASE_PORT,
+        root: Optional[str] = None,
+        packages: int = 2000,
+        latency: float = 0.0,
+    ):
+        self.hosts = hosts
+        self.port = port
+        self._tempdir = None if root else tempfile.TemporaryDirectory()
+        self.root = Path(root or self._tempdir.name)
+        self.shell = FakeShell(packages=packages, latency=latency)
+        self.stats = Stats()
+        self._servers: List[asyncssh.SSHAcceptor] = []
+
+    def address(self, n: int) -> str:
+        return f"127.0.0.{n + 1}"
+
+    def sftp_root(self, n: int) -> Path:
+        return self.root / self.address(n)
+
+    async def start(self) -> None:
+        key = asyncssh.generate_private_key("ssh-ed25519")
+        for n in range(self.hosts):
+            sftp_root = self.sftp_root(n)
+            sftp_root.mkdir(parents=True, exist_ok=True)
+            server = await asyncssh.create_server(
+                lambda: _Server(self.stats),
+                self.address(n),
+                self.port + n,
+                server_host_keys=[key],
+                # Bytes, for the scp server; the fake shell encodes its own
+                encoding=None,
+                process_factory=self._process,
+                sftp_factory=lambda chan, root=str(sftp_root): self._sftp(chan, root),
+            )
+            self._servers.append(server)
+
+    async def _process(self, process: asyncssh.SSHServerProcess) -> None:
+        self.stats.channels += 1
+        command = process.command or ""
+        if command.startswith("scp "):
+            if " -t " in command or " -f " in command:
+                # The remote end of an scp client, served from the SFTP root
+                address = process.get_extra_info("sockname")[0]
+                sftp = self._sftp(process.channel, str(self.root / address))
+                await run_scp_server(sftp, command, process.stdin, process.stdout, process.stderr)
+            else:
+                await self._scp(process)
+            return
+        if COMPRESS_COMMAND.fullmatch(command):
+            await self._compress(process)
+            return
+        await self.shell(process)
+
+    def _local_path(self, root: Path, path: str) -> Path:
+        return root / path.lstrip("/")
+
+    async def _scp(self, process: asyncssh.SSHServerProcess) -> None:
+        """Copy files to another server, as scp run on this server would.
+
+        Only copies between the stand-in servers are supported; the
+        destination must name one of their addresses.
+        """
+        self.stats.scps += 1
+        address = process.get_extra_info("sockname")[0]
+        source_root = self.root / address
+        args = shlex.split(process.command)[1:]
+        recurse = "-r" in args
+        paths = []
+        skip = False
+        for arg in args:
+            if skip:
+                skip = False
+            elif arg in ("-P", "-o", "-i"):
+                skip = True
+            elif not arg.startswith("-"):
+                paths.append(arg)
+        *sources, destination = paths
+        host, _, dstpath = destination.rpartition(":")
+        host = host.rpartition("@")[2].strip("[]")
+        target_root = self.root / host
+        if not target_root.is_dir():
+            process.stderr.write(f"ssh: Could not resolve hostname {host}\n".encode())
+            process.exit(1)
+            return
+        if self.shell.latency:
+            await asyncio.sleep(self.shell.latency)
+        target = self._local_path(target_root, dstpath)
+        for source in sources:
+            source_path = self._local_path(source_root, source)
+            dst = target / source_path.name if target.is_dir() else target
+            if source_path.is_dir():
+                if not recurse:
+                    process.stderr.write(f"scp: {source}: not a regular file\n".encode())
+                    process.exit(1)
+                    return
+                shutil.copytree(source_path, dst, dirs_exist_ok=True)
+            else:
+                shutil.copy2(source_path, dst)
+        process.exit(0)
+
+    async def _compress(self, process: asyncssh.SSHServerProcess) -> None:
+        """Run a gzip or zstd command for real, in the host's SFTP root."""
+        self.stats.compressions += 1
+        address = process.get_extra_info("sockname")[0]
+        if self.shell.latency:
+            await asyncio.sleep(self.shell.latency)
+        proc = await asyncio.create_subprocess_shell(
+            process.command,
+            cwd=self.root / address,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        while data := await proc.stdout.read(65536):
+            process.stdout.write(data)
+            await process.stdout.drain()
+        process.stderr.write(await proc.stderr.read())
+        process.exit(await proc.wait())
+
+    def _sftp(self, chan: asyncssh.SSHServerChannel, root: str) -> asyncssh.SFTPServer:
+        self.stats.channels += 1
+        return asyncssh.SFTPServer(chan, chroot=root)
+
+    async def stop(self) -> None:
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers.clear()
+        if self._tempdir is not None:
+            self._tempdir.cleanup()
+
+    async def __aenter__(self) -> "Standin":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    def inventory(self) -> Inventory:
+        return inventory(self.hosts, self.port)
+
+
+def inventory(hosts: int, port: int = BASE_PORT) -> Inventory:
+    """Return an Inventory of ``hosts`` stand-in servers."""
+    return Inventory(
+        hosts=[
+            InventoryItem(
+                connection=Connection(
+                    host=f"127.0.0.{n + 1}",
+                    port=port + n,
+                    username="user",
+                    password="password",
+                    known_hosts=None,
+                ),
+                groups=["all", f"host{n}"],
+            )
+            for n in range(hosts)
+        ]
+    )
+
+
+async def serve(args: argparse.Namespace) -> None:
+    async with Standin(
+        args.hosts,
+        port=args.port,
+        root=args.root,
+        packages=args.packages,
+        latency=args.latency,
+    ):
+        print("ready", flush=True)
+        await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--port", type=int, default=BASE_PORT)
+    parser.add_argument("--root", type=str, default=None)
+    parser.add_argument("--packages", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
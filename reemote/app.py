@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from reemote.apt import router as apt_router
@@ -5,11 +7,25 @@ from reemote.scp import router as scp_router
 from reemote.host import router as server_router
 from reemote.sftp import router as sftp_router
 from reemote.inventory import router as inventory_router
+from reemote.jobs import router as jobs_router
+from reemote.core.connection_pool import connection_pool
+from reemote.core.jobs import job_manager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop the background jobs, then close the pooled SSH connections, when
+    # the server shuts down
+    await job_manager.close()
+    await connection_pool.close()
+
 
 app = FastAPI(
     title="Reemote",
     summary="An API for controlling remote systems.",
     version="0.1.3",
+    lifespan=lifespan,
     swagger_ui_parameters={"docExpansion": "none", "title": "Reemote - Swagger UI"},
     openapi_tags=[
         {
@@ -42,6 +58,12 @@ Copy files and directories to and from remote hosts.
 Create files and directories on remote hosts and transfer files to from hosts.
                     """,
         },
+        {
+            "name": "Job Management",
+            "description": """
+Poll, stream and cancel the operations started with `background=true`.
+            """,
+        },
     ],
 )
 
@@ -54,3 +76,5 @@ app.include_router(apt_router, prefix="/reemote/apt")
 app.include_router(sftp_router, prefix="/reemote/sftp")
 app.include_router(scp_router, prefix="/reemote/scp")
 
+app.include_router(jobs_router, prefix="/reemote/jobs")
+
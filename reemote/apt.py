@@ -1,16 +1,19 @@
-from typing import AsyncGenerator, Union
+from typing import AsyncGenerator, Optional, Tuple, Union
 from reemote.core.response import ResponseElement, Response
-from reemote.core.parse_apt_list_installed import parse_apt_list_installed
+import shlex
+from reemote.core.parse_apt_list_installed import iter_apt_list_installed
+from reemote.core.parse_dpkg_query import DPKG_QUERY_FORMAT, iter_dpkg_query
 from fastapi import APIRouter, Query, Depends
 from reemote.context import Context
 from reemote.core.router_handler import router_handler
 from reemote.core.remote import remotemodel, RemoteModel
 from reemote.core.remote import Remote
+from reemote.core.model_cache import validate_model
 from reemote.core.response import ShellResponseModel
 from reemote.system import Return
 from reemote.core.response import ResponseModel
 from reemote.core.router_handler import router_handler_put
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer, model_validator
 from typing import List
 
 
@@ -18,19 +21,49 @@ router = APIRouter()
 
 
 class GetPackagesRequestModel(RemoteModel):
-    pass
+    packages: list[str] = Field(
+        default=[],
+        description="Only query these packages; all installed packages if empty",
+    )
 
 
 class PackageModel(BaseModel):
     name: str = Field(..., description="The name of the package")
     version: str = Field(..., description="The version of the package")
 
+    @model_validator(mode="before")
+    @classmethod
+    def from_tuple(cls, data):
+        # Accept the (name, version) tuples yielded by the parsers
+        if isinstance(data, tuple):
+            name, version = data
+            return {"name": name, "version": version}
+        return data
+
 
 class PackageList(BaseModel):
+    """The installed packages of a host.
+
+    GetPackages fills ``packages`` with the (name, version) tuples of the
+    parser, which have the same ``name`` and ``version`` attributes as
+    PackageModel, without validating them.  A host lists thousands of
+    packages, so the PackageModel objects are only created where the
+    response is validated, at the HTTP response.
+    """
+
     packages: List[PackageModel] = Field(
         ..., description="A list of packages with their names and versions"
     )
 
+    @classmethod
+    def from_tuples(cls, packages) -> "PackageList":
+        """Return a list holding ``packages``, (name, version) tuples, as they are."""
+        return cls.model_construct(packages=list(packages))
+
+    @field_serializer("packages")
+    def serialize_packages(self, packages):
+        return [{"name": package.name, "version": package.version} for package in packages]
+
 
 class GetPackagesResponse(ResponseElement):
     value: Union[str, PackageList] = Field(
@@ -43,23 +76,33 @@ class GetPackages(Remote):
     Model = GetPackagesRequestModel
 
     async def execute(self) -> AsyncGenerator[Context, Response]:
-        model_instance = self.Model.model_validate(self.kwargs)
-
-        result = yield Context(
-            command=f"apt list --installed",
-            call=self.__class__.child + "(" + str(model_instance) + ")",
-            changed=False,
-            **self.common_kwargs,
-        )
-        parsed_packages = parse_apt_list_installed(result["value"]["stdout"])
-
-        # Convert the parsed list of dictionaries into a PackageList
-        package_list = PackageList(
-            packages=[PackageModel(**pkg) for pkg in parsed_packages]
-        )
+        model_instance = validate_model(self.Model, self.kwargs)
 
-        # Wrap the PackageList in a GetPackagesResponse
-        result["value"] = package_list
+        if model_instance.packages:
+            # dpkg-query exits with status 1 when some of the packages are
+            # unknown, but still lists the others
+            names = sorted(set(model_instance.packages))
+            result = yield Context(
+                command=f"dpkg-query -W -f={shlex.quote(DPKG_QUERY_FORMAT)} "
+                + " ".join(shlex.quote(name) for name in names),
+                call=self.__class__.child + "(" + str(model_instance) + ")",
+                changed=False,
+                fact=f"GetPackages({','.join(names)})",
+                **self.common_kwargs,
+            )
+            parsed_packages = iter_dpkg_query(result["value"]["stdout"])
+        else:
+            result = yield Context(
+                command=f"apt list --installed",
+                call=self.__class__.child + "(" + str(model_instance) + ")",
+                changed=False,
+                fact="GetPackages()",
+                **self.common_kwargs,
+            )
+            parsed_packages = iter_apt_list_installed(result["value"]["stdout"])
+
+        # Keep the parsed tuples; they become PackageModels in the HTTP response
+        result["value"] = PackageList.from_tuples(parsed_packages)
 
         return
 
@@ -69,9 +112,16 @@ class GetPackages(Remote):
     tags=["APT Package Manager"],
     response_model=List[GetPackagesResponse],
 )
-async def get_packages(common: RemoteModel = Depends(remotemodel)) -> list[dict]:
+async def get_packages(
+    packages: list[str] = Query(
+        [], description="Only query these packages; all installed packages if empty"
+    ),
+    common: RemoteModel = Depends(remotemodel),
+) -> list[dict]:
     """# Get installed APT packages"""
-    return await router_handler(RemoteModel, GetPackages)(common=common)
+    return await router_handler(GetPackagesRequestModel, GetPackages)(
+        packages=packages, common=common
+    )
 
 
 class InstallRequestModel(RemoteModel):
@@ -82,7 +132,7 @@ class Install(Remote):
     Model = InstallRequestModel
 
     async def execute(self) -> AsyncGenerator[Context, Response]:
-        model_instance = self.Model.model_validate(self.kwargs)
+        model_instance = validate_model(self.Model, self.kwargs)
 
         yield Context(
             command=f"apt-get install -y {' '.join(model_instance.packages)}",
@@ -114,7 +164,7 @@ class Remove(Remote):
     Model = RemoveModel
 
     async def execute(self) -> AsyncGenerator[Context, Response]:
-        model_instance = self.Model.model_validate(self.kwargs)
+        model_instance = validate_model(self.Model, self.kwargs)
 
         yield Context(
             command=f"apt-get remove -y {' '.join(model_instance.packages)}",
@@ -144,7 +194,7 @@ class Update(Remote):
     Model = UpdateRequestModel
 
     async def execute(self) -> AsyncGenerator[Context, Response]:
-        model_instance = self.Model.model_validate(self.kwargs)
+        model_instance = validate_model(self.Model, self.kwargs)
 
         yield Context(
             command="apt-get update",
@@ -173,7 +223,7 @@ class Upgrade(Remote):
     Model = UpgradeRequestModel
 
     async def execute(self) -> AsyncGenerator[Context, Response]:
-        model_instance = self.Model.model_validate(self.kwargs)
+        model_instance = validate_model(self.Model, self.kwargs)
 
         yield Context(
             command="apt-get upgrade",
@@ -204,28 +254,58 @@ class PackageRequestModel(RemoteModel):
     )
 
 
+def split_package(package: str) -> Tuple[str, Optional[str]]:
+    """Split a package as given to apt-get into its name and pinned version.
+
+    apt-get accepts ``name=version``, ``name/release`` and ``name:arch``,
+    while dpkg-query lists the bare name.
+
+    Returns:
+        The name, and the version if one is pinned, else None.
+        Example: `split_package('libc6:amd64=2.36-9')` is `('libc6', '2.36-9')`.
+    """
+    name, _, version = package.partition("=")
+    name = name.partition("/")[0].partition(":")[0]
+    return name, version or None
+
+
 class Package(Remote):
     Model = PackageRequestModel
 
     async def execute(
         self,
     ) -> AsyncGenerator[GetPackages | Update | Install | Remove, Response]:
-        model_instance = self.Model.model_validate(self.kwargs)
+        model_instance = validate_model(self.Model, self.kwargs)
+        packages = model_instance.packages
+        wanted = dict(split_package(package) for package in packages)
+        names = sorted(wanted)
 
-        pre = yield GetPackages(sudo=True)
+        # Only the requested packages are queried, before and after
+        pre = None
+        if packages:
+            pre = yield GetPackages(packages=names, **self.common_kwargs)
 
         if model_instance.update:
             yield Update(**self.common_kwargs)
 
-        if model_instance.packages:
+        changed = False
+        if pre:
+            installed = {package.name: package.version for package in pre["value"].packages}
             if model_instance.present:
-                yield Install(packages=model_instance.packages, **self.common_kwargs)
+                # Any installed version will do, unless one is pinned
+                missing = [
+                    name
+                    for name, version in wanted.items()
+                    if name not in installed or version not in (None, installed[name])
+                ]
+                mutate = Install if missing else None
             else:
-                yield Remove(packages=model_instance.packages, **self.common_kwargs)
-
-        post = yield GetPackages()
+                mutate = Remove if installed.keys() & wanted.keys() else None
 
-        changed = pre["value"] != post["value"]
+            if mutate is not None:
+                yield mutate(packages=packages, **self.common_kwargs)
+                post = yield GetPackages(packages=names, **self.common_kwargs)
+                changed = pre["value"] != post["value"]
 
         yield Return(changed=changed, value=None)
 
@@ -1,6 +1,64 @@
+import copy
 import json
+import os
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Tuple
+
+from reemote.core.inventory_model import Inventory
+
+
+class FileCache:
+    """Cache values loaded from files until the file's mtime or size changes.
+
+    The cache is shared by every Config instance, so repeated API requests do
+    not re-read and re-parse files that have not changed.
+    """
+
+    def __init__(self, load: Callable[[str], Any]):
+        self._load = load
+        self._entries: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+
+    def get(self, path: str) -> Any:
+        """Return the value loaded from ``path``, reloading it if the file has changed."""
+        path = str(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._entries.pop(path, None)
+            raise
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        value = self._load(path)
+        self._entries[path] = (stamp, value)
+        return value
+
+    def invalidate(self, path: str) -> None:
+        """Forget the value loaded from ``path``."""
+        self._entries.pop(str(path), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def _load_json(path: str) -> Any:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _load_inventory(path: str) -> Inventory:
+    try:
+        inventory_data = _json_cache.get(path)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in inventory file: {e}")
+    # A new inventory file holds an empty list
+    return Inventory.model_validate(inventory_data or {"hosts": []})
+
+
+_json_cache = FileCache(_load_json)
+_inventory_cache = FileCache(_load_inventory)
+
 
 class Config:
     # Default data directory (can be overridden)
@@ -40,6 +98,7 @@ class Config:
         }
         with open(self.config_path, "w") as f:
             json.dump(config_data, f, indent=2)
+        _json_cache.invalidate(self.config_path)
 
     def _create_default_files(self) -> None:
         """Create default log and inventory files if they don't exist."""
@@ -59,18 +118,17 @@ class Config:
             self._initialize_config_file()
 
         try:
-            with open(self.config_path, "r") as f:
-                return json.load(f)
+            return dict(_json_cache.get(self.config_path))
         except (json.JSONDecodeError, FileNotFoundError):
             # If config file is corrupted or missing, recreate it
             self._initialize_config_file()
-            with open(self.config_path, "r") as f:
-                return json.load(f)
+            return dict(_json_cache.get(self.config_path))
 
     def _write_config(self, config_data: Dict[str, Any]) -> None:
         """Write configuration data to the config file."""
         with open(self.config_path, "w") as f:
             json.dump(config_data, f, indent=2)
+        _json_cache.invalidate(self.config_path)
 
     def get_inventory_path(self) -> str:
         """Returns the inventory path from the config file."""
@@ -89,14 +147,28 @@ class Config:
             # Return an empty inventory if the file does not exist
             return {"hosts": []}
 
-        # Read and parse the JSON content from the file
-        with open(inventory_path, "r") as f:
-            try:
-                inventory_data = json.load(f)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Invalid JSON in inventory file: {e}")
+        # Read and parse the JSON content from the file, or reuse the cached
+        # content if the file is unchanged.  Return a copy so that callers
+        # may modify it.
+        try:
+            inventory_data = _json_cache.get(inventory_path)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in inventory file: {e}")
+
+        return copy.deepcopy(inventory_data)
+
+    def get_inventory_model(self) -> Inventory:
+        """
+        Return the validated inventory from the current inventory file.
+        The inventory is validated once and cached until the file changes, so
+        the returned object is shared and must not be modified.
+        """
+        inventory_path = self.get_inventory_path()
+
+        if not Path(inventory_path).exists():
+            return Inventory()
 
-        return inventory_data
+        return _inventory_cache.get(inventory_path)
 
     def set_inventory(self, inventory_data: List) -> None:
         """Write inventory data to the current inventory file."""
@@ -111,6 +183,8 @@ class Config:
         # Write the JSON content to the file
         with open(inventory_path, "w") as f:
             json.dump(inventory_data, f, indent=2)
+        _json_cache.invalidate(inventory_path)
+        _inventory_cache.invalidate(inventory_path)
 
     def set_inventory_path(self, inventory_path: str) -> None:
         """Replaces the inventory path in the config file."""
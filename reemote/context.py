@@ -38,6 +38,12 @@ class Context(RemoteModel):
         default=None, description="Caller object", exclude=True
     )
 
+    fact: Optional[str] = Field(
+        default=None,
+        description="The name of the fact returned, to answer from the fact cache",
+        exclude=True,
+    )
+
     inventory_item: Optional[InventoryItem] = Field(
         default=None, description="Inventory item"
     )
@@ -65,3 +71,35 @@ class Context(RemoteModel):
 
     def to_json_serializable(self) -> Dict[str, Any]:
         return self.model_dump()
+
+
+class ExecutionContext:
+    """The executor's working copy of a Context, for one host.
+
+    A Context is validated once, when the operation creates it.  The executor
+    then copies its fields into an ExecutionContext and attaches the host's
+    inventory item.  Callbacks set ``changed`` and ``error`` on it.  These
+    are plain attribute assignments, so the executor does not re-validate the
+    inventory item, or the Context, at every step.
+
+    Use ``to_context()`` to get a Context back, for example to return it in a
+    response.
+    """
+
+    __slots__ = tuple(Context.model_fields)
+
+    def __init__(self, context: Context, inventory_item: InventoryItem):
+        fields = context.__dict__
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+        self.inventory_item = inventory_item
+
+    def to_context(self) -> Context:
+        """Return the fields as a Context, without validating them again."""
+        return Context.model_construct(
+            **{name: getattr(self, name) for name in self.__slots__}
+        )
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import math
+import time
+import weakref
+from typing import Callable, Dict, Optional
+
+import asyncssh
+
+from reemote.core.inventory_model import Connection
+
+logger = logging.getLogger(__name__)
+
+# The largest block requested, even from servers that allow larger ones
+MAX_BLOCK_SIZE = 256 * 1024
+
+# The bounds of the parallel requests kept in flight
+MIN_REQUESTS = 16
+MAX_REQUESTS = 1024
+
+# The bounds of the chunk read or written at a time by chunked transfers,
+# which is their window of bytes in flight
+MIN_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+
+# The round trips timed to measure the RTT of a host
+RTT_PROBES = 3
+
+# Each transfer is measured for its first PROBE_SECONDS, one throughput
+# sample every SAMPLE_SECONDS
+PROBE_SECONDS = 2.0
+SAMPLE_SECONDS = 0.5
+
+# Shorter or smaller samples say more about latency than throughput
+MIN_SAMPLE_SECONDS = 0.05
+MIN_SAMPLE_BYTES = 256 * 1024
+
+# The weight of a new throughput sample in the average
+SAMPLE_WEIGHT = 0.5
+
+# A pipeline carrying this fraction of what it can carry is what limits the
+# transfer, so it is deepened
+PIPELINE_BOUND = 0.8
+
+
+class Link:
+    """What is known of the link to a host, and the parameters chosen for it.
+
+    ``block_size`` is the largest the server allows, up to
+    ``MAX_BLOCK_SIZE``, since fewer, larger requests cost less.
+    ``max_requests`` is None until the throughput has been measured, which
+    leaves asyncssh's default.  After each throughput sample, it keeps twice
+    the bandwidth-delay product in flight, and is doubled instead while the
+    transfer goes as fast as the pipeline allows, as the throughput then
+    measures the pipeline rather than the link.
+    """
+
+    def __init__(self, rtt: float, block_size: int):
+        self.rtt = rtt
+        self.block_size = block_size
+        self.max_requests: Optional[int] = None
+        self.throughput: Optional[float] = None
+
+    def observe(self, throughput: float) -> None:
+        """Update the parameters from a throughput sample, in bytes per second."""
+        max_requests = self.max_requests or 128
+        capacity = max_requests * self.block_size / self.rtt
+        if self.throughput is None:
+            self.throughput = throughput
+        else:
+            self.throughput += SAMPLE_WEIGHT * (throughput - self.throughput)
+
+        if throughput >= PIPELINE_BOUND * capacity:
+            max_requests *= 2
+        else:
+            bdp = self.throughput * self.rtt
+            max_requests = math.ceil(2 * bdp / self.block_size)
+        self.max_requests = min(MAX_REQUESTS, max(MIN_REQUESTS, max_requests))
+
+    @property
+    def chunk_size(self) -> int:
+        """The bytes a chunked transfer reads or writes at a time."""
+        if self.max_requests is None:
+            return MIN_CHUNK_SIZE
+        return min(MAX_CHUNK_SIZE, max(MIN_CHUNK_SIZE, self.max_requests * self.block_size))
+
+    def __repr__(self):
+        return (
+            f"Link(rtt={self.rtt * 1000:.1f}ms, throughput={self.throughput}, "
+            f"block_size={self.block_size}, max_requests={self.max_requests})"
+        )
+
+
+class Meter:
+    """Measure the throughput of a transfer to a host for its first seconds.
+
+    Each sample updates the host's Link, so a transfer that reads
+    ``chunk_size`` for each chunk follows the tuning as it goes, and later
+    transfers start from it.
+    """
+
+    def __init__(self, link: Link):
+        self.link = link
+        self._start = self._last = time.monotonic()
+        self._bytes = self._sampled = 0
+        self._copied: Dict[tuple, int] = {}
+
+    @property
+    def block_size(self) -> int:
+        return self.link.block_size
+
+    @property
+    def max_requests(self) -> int:
+        return self.link.max_requests or -1
+
+    @property
+    def chunk_size(self) -> int:
+        return self.link.chunk_size
+
+    def add(self, nbytes: int) -> None:
+        """Count ``nbytes`` more bytes transferred."""
+        self._bytes += nbytes
+        now = time.monotonic()
+        if now - self._start <= PROBE_SECONDS and now - self._last >= SAMPLE_SECONDS:
+            self._sample(now)
+
+    def finish(self) -> None:
+        """Take the last sample of a transfer that ended while it was measured."""
+        now = time.monotonic()
+        if self._last - self._start < PROBE_SECONDS:
+            self._sample(now)
+
+    def _sample(self, now: float) -> None:
+        seconds = now - self._last
+        nbytes = self._bytes - self._sampled
+        if seconds >= MIN_SAMPLE_SECONDS and nbytes >= MIN_SAMPLE_BYTES:
+            self.link.observe(nbytes / seconds)
+            logger.debug("%r", self.link)
+        self._last = now
+        self._sampled = self._bytes
+
+    def progress_handler(self, handler: Optional[Callable] = None) -> Callable:
+        """Return a progress handler for get() and put() that counts the bytes
+        copied, and calls ``handler`` if it is set."""
+
+        def progress(srcpath, dstpath, copied, total):
+            key = (srcpath, dstpath)
+            self.add(copied - self._copied.get(key, 0))
+            self._copied[key] = copied
+            if handler is not None:
+                handler(srcpath, dstpath, copied, total)
+
+        return progress
+
+
+class LinkTuner:
+    """Remember the Link to each host, measuring its RTT when first used."""
+
+    def __init__(self):
+        self._links: Dict[str, Link] = {}
+        # Locks serialise measurements per key, one set per event loop
+        self._locks = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _key(connection: Connection) -> str:
+        return f"{connection.host}:{getattr(connection, 'port', None) or 22}"
+
+    def get(self, connection: Connection) -> Optional[Link]:
+        return self._links.get(self._key(connection))
+
+    async def link(self, connection: Connection, sftp: asyncssh.SFTPClient) -> Link:
+        """Return the Link to the host, measuring it over ``sftp`` if it is new."""
+        key = self._key(connection)
+        locks = self._locks.setdefault(asyncio.get_running_loop(), {})
+        async with locks.setdefault(key, asyncio.Lock()):
+            if key not in self._links:
+                rtts = []
+                for _ in range(RTT_PROBES):
+                    start = time.monotonic()
+                    await sftp.stat(".")
+                    rtts.append(time.monotonic() - start)
+                limits = sftp.limits
+                block_size = min(MAX_BLOCK_SIZE, limits.max_read_len, limits.max_write_len)
+                # Keep a zero RTT from dividing by zero
+                self._links[key] = Link(max(min(rtts), 1e-4), block_size)
+                logger.info("%s: %r", connection.host, self._links[key])
+        return self._links[key]
+
+    async def meter(self, connection: Connection, sftp: asyncssh.SFTPClient) -> Meter:
+        """Return a Meter for a new transfer to the host."""
+        return Meter(await self.link(connection, sftp))
+
+    def clear(self) -> None:
+        self._links.clear()
+        self._locks.clear()
+
+
+# The process-wide tuner shared by every transfer
+link_tuner = LinkTuner()
@@ -0,0 +1,155 @@
+import logging
+import os
+import shlex
+import stat as stat_module
+import zlib
+from typing import AsyncIterator, Callable, Literal, Optional, Sequence
+
+import asyncssh
+
+from reemote.core.inventory_model import Connection
+from reemote.core.sync import LocalPath
+from reemote.core.transfer import LocalFile, plan_downloads
+
+logger = logging.getLogger(__name__)
+
+# The algorithms offered when a connection asks for SSH compression, in
+# order of preference.  "none" comes last, so that hosts which do not
+# compress still connect.
+SSH_COMPRESSION_ALGS = ["zlib@openssh.com", "zlib", "none"]
+
+# The programs that compress a file on the remote host, writing it to stdout
+Method = Literal["gzip", "zstd"]
+COMMANDS = {"gzip": "gzip -c", "zstd": "zstd -c -q"}
+
+# The compressed bytes read from the remote program at a time
+READ_SIZE = 256 * 1024
+
+
+def ssh_connection(connection: Connection, compress: bool = False) -> Connection:
+    """Return the connection parameters, asking for SSH compression if ``compress``.
+
+    The parameters differ from the uncompressed ones, so the connection pool
+    keeps a compressed connection to the host beside the plain one.  A host
+    whose inventory item sets ``compression_algs`` itself is left as it is
+    when ``compress`` is false.
+    """
+    if not compress:
+        return connection
+    return connection.model_copy(update={"compression_algs": SSH_COMPRESSION_ALGS})
+
+
+def decompressor(method: Method):
+    """Return a streaming decompressor for the output of ``COMMANDS[method]``.
+
+    gzip is decompressed by zlib.  zstd needs Python 3.14's compression.zstd,
+    or else the zstandard package.
+    """
+    if method == "gzip":
+        # 16 + MAX_WBITS expects a gzip header and trailer
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        from compression import zstd
+
+        return zstd.ZstdDecompressor()
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ModuleNotFoundError(
+            "zstd decompression needs Python 3.14 or the zstandard package"
+        ) from None
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+def compress_command(path: str, method: Method, offset: int = 0, length: Optional[int] = None) -> str:
+    """Return the command that writes ``path`` compressed by ``method`` to stdout."""
+    quoted = shlex.quote(path)
+    if not offset and length is None:
+        return f"{COMMANDS[method]} -- {quoted}"
+    command = f"tail -c +{offset + 1} -- {quoted}"
+    if length is not None:
+        command += f" | head -c {length}"
+    return f"{command} | {COMMANDS[method]}"
+
+
+async def read_compressed(
+    conn: asyncssh.SSHClientConnection,
+    path: str,
+    method: Method,
+    offset: int = 0,
+    length: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Yield the bytes of a remote file, compressed on the host and decompressed here.
+
+    The file is compressed by ``gzip`` or ``zstd`` on the host as it is read,
+    so only the compressed bytes cross the network.  The host's program must
+    be installed; it failing raises asyncssh.ProcessError.
+
+    Args:
+        conn: The connection to the host.
+        path: The remote file.
+        method: "gzip" or "zstd".
+        offset: The byte to start reading at.
+        length: The number of bytes to read, or None to read to the end.
+    """
+    d = decompressor(method)
+    async with conn.create_process(
+        compress_command(path, method, offset, length), encoding=None
+    ) as process:
+        received = 0
+        while data := await process.stdout.read(READ_SIZE):
+            received += len(data)
+            if out := d.decompress(data):
+                yield out
+        await process.wait(check=True)
+    # Any output the decompressor still holds
+    flush = getattr(d, "flush", None)
+    if flush is not None and (out := flush()):
+        yield out
+    if not getattr(d, "eof", True):
+        raise EOFError(f"{path}: the compressed stream ended early")
+    logger.debug("%s: %d compressed bytes received", path, received)
+
+
+async def get_compressed(
+    sftp: asyncssh.SFTPClient,
+    conn: asyncssh.SSHClientConnection,
+    remotepaths: Sequence[LocalPath],
+    localpath: LocalPath,
+    method: Method,
+    recurse: bool = False,
+    preserve: bool = False,
+    progress_handler: Optional[Callable] = None,
+) -> int:
+    """Download remote files and directories, compressing each file on the host.
+
+    The files are found as get() finds them, over ``sftp``, and each is read
+    with ``read_compressed()`` over ``conn``.
+
+    Returns:
+        The bytes written, after decompression.
+    """
+    copies, directories = await plan_downloads(sftp, remotepaths, localpath, recurse)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+    written = 0
+    for remote, local in copies:
+        attrs = await sftp.stat(remote)
+        f = await LocalFile.open(local, "wb")
+        offset = 0
+        try:
+            async for data in read_compressed(conn, remote, method):
+                await f.write(data, offset)
+                offset += len(data)
+                if progress_handler is not None:
+                    progress_handler(remote.encode(), local.encode(), offset, attrs.size)
+        finally:
+            await f.close()
+        written += offset
+        if preserve:
+            os.utime(local, (attrs.atime or attrs.mtime, attrs.mtime))
+            if attrs.permissions is not None:
+                os.chmod(local, stat_module.S_IMODE(attrs.permissions))
+    return written
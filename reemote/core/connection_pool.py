@@ -0,0 +1,262 @@
+import asyncio
+import json
+import logging
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+import asyncssh
+
+from reemote.core.inventory_model import Connection
+from reemote.core.shell_channel import ShellChannel
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection:
+    """An SSH connection held by the pool, with its bookkeeping."""
+
+    __slots__ = (
+        "key",
+        "conn",
+        "loop",
+        "created",
+        "last_used",
+        "leases",
+        "sftp",
+        "sftp_lock",
+        "shells",
+        "shell_lock",
+    )
+
+    def __init__(self, key: str, conn: asyncssh.SSHClientConnection):
+        self.key = key
+        self.conn = conn
+        self.loop = asyncio.get_running_loop()
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.leases = 0
+        self.sftp: Optional[asyncssh.SFTPClient] = None
+        self.sftp_lock = asyncio.Lock()
+        self.shells: Dict[str, ShellChannel] = {}
+        self.shell_lock = asyncio.Lock()
+
+    def close_sftp(self) -> None:
+        """Close the cached SFTP session, if there is one."""
+        if self.sftp is not None:
+            self.sftp.exit()
+            self.sftp = None
+
+    def close_shell(self, key: str, shell: ShellChannel) -> None:
+        """Close a cached shell channel and forget it."""
+        if self.shells.get(key) is shell:
+            del self.shells[key]
+        shell.close()
+
+    def is_usable(self) -> bool:
+        """Whether the connection is still open and bound to the running loop."""
+        return self.loop is asyncio.get_running_loop() and not self.conn.is_closed()
+
+
+def is_connection_error(e: BaseException) -> bool:
+    """Whether an exception means the underlying SSH connection is unusable."""
+    return isinstance(e, (asyncssh.DisconnectError, asyncssh.ChannelOpenError, OSError))
+
+
+def is_channel_error(e: BaseException) -> bool:
+    """Whether an exception means an SFTP session's channel is unusable."""
+    return is_connection_error(e) or isinstance(
+        e, (asyncssh.SFTPConnectionLost, asyncssh.SFTPNoConnection)
+    )
+
+
+class ConnectionPool:
+    """A pool of SSH connections keyed by the inventory connection parameters.
+
+    A connection is opened on first use and kept open so that later operations on
+    the same host, including operations started by later calls to ``execute()``,
+    reuse it instead of repeating the SSH handshake.  SSH multiplexes channels, so
+    several operations may lease the same connection concurrently.
+
+    Args:
+        max_idle: Seconds an unused connection is kept open.
+        max_lifetime: Seconds after which a connection is retired, even if busy.
+            A busy connection is closed once its last lease is released.
+        health_check_interval: Keepalive interval, in seconds, used to detect
+            dead connections.  A connection that stops answering keepalives is
+            closed by asyncssh and is replaced on the next lease.
+        sweep_interval: Minimum number of seconds between eviction sweeps.
+    """
+
+    def __init__(
+        self,
+        max_idle: float = 300.0,
+        max_lifetime: float = 3600.0,
+        health_check_interval: float = 30.0,
+        sweep_interval: float = 10.0,
+    ):
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.sweep_interval = sweep_interval
+        self.connects = 0
+        self._entries: Dict[str, PooledConnection] = {}
+        self._retiring: Set[PooledConnection] = set()
+        # Locks serialise connection attempts per key, one set per event loop
+        self._locks = weakref.WeakKeyDictionary()
+        self._last_sweep = time.monotonic()
+
+    @staticmethod
+    def key(connection: Connection) -> str:
+        """Return the pool key for a set of connection parameters."""
+        return json.dumps(connection.to_json_serializable(), sort_keys=True, default=str)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @asynccontextmanager
+    async def connection(
+        self, connection: Connection
+    ) -> AsyncIterator[asyncssh.SSHClientConnection]:
+        """Lease the pooled connection for ``connection``, opening it if needed.
+
+        The connection is discarded from the pool if the body raises an error
+        showing that the connection itself is broken.
+        """
+        async with self._lease(connection) as entry:
+            yield entry.conn
+
+    @asynccontextmanager
+    async def sftp_client(self, connection: Connection) -> AsyncIterator[asyncssh.SFTPClient]:
+        """Lease the SFTP session cached on the pooled connection for ``connection``.
+
+        The session is started on first use and then shared by every SFTP
+        operation on the host.  It is closed and replaced if the body raises an
+        error showing that its channel is broken; ordinary SFTP errors, such as
+        a missing file, leave it in place.
+        """
+        async with self._lease(connection) as entry:
+            async with entry.sftp_lock:
+                if entry.sftp is None:
+                    entry.sftp = await entry.conn.start_sftp_client()
+                sftp = entry.sftp
+            try:
+                yield sftp
+            except BaseException as e:
+                if is_channel_error(e) and entry.sftp is sftp:
+                    entry.close_sftp()
+                raise
+
+    @asynccontextmanager
+    async def shell_channel(
+        self, connection: Connection, session: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[ShellChannel]:
+        """Lease the shell channel cached on the pooled connection for ``connection``.
+
+        A shell is started on first use for each set of ``session`` arguments
+        and then reused by later batches of commands.  The lease is exclusive:
+        other batches wait until it ends.  If the body raises an error, the
+        shell may hold unread output, so it is closed and replaced.
+        """
+        session = session or {}
+        key = json.dumps(session, sort_keys=True, default=str)
+        async with self._lease(connection) as entry:
+            async with entry.shell_lock:
+                shell = entry.shells.get(key)
+                if shell is None or not shell.is_open():
+                    shell = entry.shells[key] = await ShellChannel.open(
+                        entry.conn, **session
+                    )
+            async with shell.lock:
+                try:
+                    yield shell
+                except BaseException:
+                    entry.close_shell(key, shell)
+                    raise
+
+    @asynccontextmanager
+    async def _lease(self, connection: Connection) -> AsyncIterator[PooledConnection]:
+        entry = await self._acquire(connection)
+        entry.leases += 1
+        try:
+            yield entry
+        except BaseException as e:
+            if is_connection_error(e) or entry.conn.is_closed():
+                self.discard(entry)
+            raise
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            if entry.leases == 0 and entry in self._retiring:
+                self._retiring.discard(entry)
+                entry.conn.close()
+
+    def discard(self, entry: PooledConnection) -> None:
+        """Remove a connection from the pool and close it once it is unused."""
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+        if entry.leases > 0:
+            self._retiring.add(entry)
+        elif entry.loop is asyncio.get_running_loop():
+            entry.conn.close()
+
+    async def _acquire(self, connection: Connection) -> PooledConnection:
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+
+        key = self.key(connection)
+        entry = self._entries.get(key)
+        if entry is not None and self._is_reusable(entry, now):
+            return entry
+
+        locks = self._locks.setdefault(asyncio.get_running_loop(), {})
+        async with locks.setdefault(key, asyncio.Lock()):
+            # Another task may have connected while we waited for the lock
+            entry = self._entries.get(key)
+            if entry is not None and self._is_reusable(entry, time.monotonic()):
+                return entry
+            if entry is not None:
+                self.discard(entry)
+
+            kwargs = connection.to_json_serializable()
+            kwargs.setdefault("keepalive_interval", self.health_check_interval)
+            conn = await asyncssh.connect(**kwargs)
+            self.connects += 1
+            entry = self._entries[key] = PooledConnection(key, conn)
+            return entry
+
+    def _is_reusable(self, entry: PooledConnection, now: float) -> bool:
+        if not entry.is_usable():
+            return False
+        return now - entry.created < self.max_lifetime
+
+    def _sweep(self, now: float) -> None:
+        self._last_sweep = now
+        expired: List[PooledConnection] = []
+        for entry in self._entries.values():
+            if not entry.is_usable() or now - entry.created >= self.max_lifetime:
+                expired.append(entry)
+            elif entry.leases == 0 and now - entry.last_used >= self.max_idle:
+                expired.append(entry)
+        for entry in expired:
+            logger.debug("Evicting pooled connection to %s", entry.conn.get_extra_info("peername"))
+            self.discard(entry)
+
+    async def close(self) -> None:
+        """Close every connection owned by the running event loop."""
+        loop = asyncio.get_running_loop()
+        entries = list(self._entries.values()) + list(self._retiring)
+        self._entries.clear()
+        self._retiring.clear()
+        for entry in entries:
+            if entry.loop is loop:
+                entry.conn.close()
+        for entry in entries:
+            if entry.loop is loop:
+                await entry.conn.wait_closed()
+
+
+# The process-wide pool shared by every execution
+connection_pool = ConnectionPool()
@@ -0,0 +1,51 @@
+import copy
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class FactCache:
+    """Remember the responses of discovery operations for each host.
+
+    A fact is the response of an operation that only reads the state of a
+    host, such as the installed packages or the attributes of a path.  The
+    executor answers a Context that names a fact from the cache while the
+    fact is fresh, instead of running it again.  Every fact of a host is
+    forgotten when an operation reports that it changed the host.
+
+    Args:
+        ttl: Seconds a fact stays fresh.  0 disables the cache.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._facts: Dict[str, Dict[str, Tuple[float, Any]]] = {}
+
+    def get(self, host: str, fact: str) -> Optional[Any]:
+        """Return a copy of the cached response for ``fact``, or None."""
+        entry = self._facts.get(host, {}).get(fact)
+        if entry is None or entry[0] <= time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def set(self, host: str, fact: str, response: Any) -> None:
+        """Cache a copy of the response for ``fact``."""
+        if self.ttl > 0:
+            self._facts.setdefault(host, {})[fact] = (
+                time.monotonic() + self.ttl,
+                copy.deepcopy(response),
+            )
+
+    def invalidate(self, host: str) -> None:
+        """Forget every fact of ``host``."""
+        self._facts.pop(host, None)
+
+    def clear(self) -> None:
+        self._facts.clear()
+
+
+# The process-wide cache shared by every execution
+fact_cache = FactCache()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, model_validator, Field
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, model_validator, Field, PrivateAttr
+from typing import List, Dict, Any, FrozenSet, Optional
 
 
 class Connection(BaseModel):
@@ -22,6 +22,9 @@ class Connection(BaseModel):
                 "port": {
                     "description": "The ssh port number for connecting to the remote host."
                 },
+                "compression_algs": {
+                    "description": "The SSH compression algorithms to offer, such as [\"zlib@openssh.com\", \"zlib\", \"none\"] to compress every transfer with the host."
+                },
             },
             "required": ["host"],
             "additionalProperties": {
@@ -76,6 +79,23 @@ class InventoryItem(BaseModel):
     groups: List[str] = Field(
         [], description="The groups to which the remote host belongs."
     )
+    # The groups as a set, built at validation for constant time membership tests
+    _group_set: FrozenSet[str] = PrivateAttr(default=frozenset())
+
+    @model_validator(mode="after")
+    def index_groups(self):
+        """
+        Build the set of groups to which the host belongs.
+        """
+        self._group_set = frozenset(self.groups)
+        return self
+
+    def in_group(self, group: Optional[str]) -> bool:
+        """
+        Whether the host is in a group.  Every host is in the group "all", and
+        an empty group also selects every host.
+        """
+        return not group or group == "all" or group in self._group_set
 
     def to_json_serializable(self) -> Dict[str, Any]:
         return self.model_dump()
@@ -85,6 +105,8 @@ class Inventory(BaseModel):
         default_factory=list,
         description="A list of inventory items representing remote hosts.",
     )
+    # Maps each group name to the items in that group, built at validation
+    _groups: Dict[str, List[InventoryItem]] = PrivateAttr(default_factory=dict)
 
     @model_validator(mode="after")
     def check_unique_hosts(self):
@@ -99,6 +121,27 @@ class Inventory(BaseModel):
             seen_hosts.add(host)
         return self
 
+    @model_validator(mode="after")
+    def index_groups(self):
+        """
+        Build the index of the items in each group.
+        """
+        groups: Dict[str, List[InventoryItem]] = {}
+        for item in self.hosts:
+            for group in dict.fromkeys(item.groups):
+                groups.setdefault(group, []).append(item)
+        self._groups = groups
+        return self
+
+    def hosts_in_group(self, group: Optional[str]) -> List[InventoryItem]:
+        """
+        Return the items in a group, in inventory order.  Every item is in
+        the group "all", and an empty group also selects every item.
+        """
+        if not group or group == "all":
+            return list(self.hosts)
+        return list(self._groups.get(group, []))
+
     def to_json_serializable(self):
         """
         Convert the Inventory object to a plain dictionary suitable for json.dump().
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field
+
+from reemote.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Job ids are uuid4 hex strings; anything else names no job, and no file
+JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+# Seconds between saves of a running job's JobInfo; until the job ends it is
+# read from memory, and the saves only serve other processes
+SAVE_INTERVAL = 1.0
+
+
+class JobStatus(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    # The process running the job stopped before the job ended
+    INTERRUPTED = "interrupted"
+
+
+class JobInfo(BaseModel):
+    id: str = Field(..., description="The job id")
+    operation: str = Field(..., description="The operation the job runs")
+    group: Optional[str] = Field(None, description="The inventory group the job runs on")
+    status: JobStatus = Field(JobStatus.RUNNING, description="The state of the job")
+    created: str = Field(..., description="When the job was submitted, in ISO 8601")
+    finished: Optional[str] = Field(None, description="When the job ended, in ISO 8601")
+    responses: int = Field(0, description="The number of host responses saved")
+    errors: int = Field(0, description="The number of host responses that are errors")
+    error: Optional[str] = Field(None, description="Why the job failed, if it failed")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Job:
+    """A job running in this process, and the responses it has saved."""
+
+    def __init__(self, info: JobInfo, directory: Path):
+        self.info = info
+        self.info_path = directory / f"{info.id}.json"
+        self.results_path = directory / f"{info.id}.ndjson"
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Condition()
+
+    def save(self) -> None:
+        temporary = self.info_path.with_name(self.info_path.name + ".tmp")
+        temporary.write_text(self.info.model_dump_json())
+        os.replace(temporary, self.info_path)
+
+    def append(self, line: str) -> None:
+        with open(self.results_path, "a") as f:
+            f.write(line)
+
+
+class JobManager:
+    """Run operations in the background, saving each host's response as it arrives.
+
+    Each job has two files in the jobs directory: ``<id>.json`` holds its
+    JobInfo, and ``<id>.ndjson`` holds the responses saved so far, one line
+    per host in the order the hosts finished.  Each response is appended as
+    it arrives, and the JobInfo is saved every ``SAVE_INTERVAL`` seconds
+    and when the job ends, so a job's responses can be read while it runs,
+    and after the process that ran it has stopped.  Only running jobs are
+    held in memory.  A job the process was running when it stopped is
+    reported as interrupted.
+
+    Args:
+        directory: The jobs directory, by default ``jobs`` in the data directory.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        self._directory = directory
+        self._jobs: Dict[str, Job] = {}
+        self._closing = False
+
+    @property
+    def directory(self) -> Path:
+        # Read on each use, so that a changed data directory is followed
+        return Path(self._directory or Config.data_dir / "jobs")
+
+    def submit(
+        self,
+        operation: str,
+        responses: Callable[[], AsyncIterator[Any]],
+        group: Optional[str] = None,
+    ) -> JobInfo:
+        """Start a job that saves the responses yielded by ``responses()``.
+
+        Returns:
+            The JobInfo of the new job, at once.
+        """
+        directory = self.directory
+        directory.mkdir(parents=True, exist_ok=True)
+        info = JobInfo(id=uuid.uuid4().hex, operation=operation, group=group, created=_now())
+        job = self._jobs[info.id] = Job(info, directory)
+        job.results_path.touch()
+        job.save()
+        job.task = asyncio.create_task(self._run(job, responses))
+        logger.info("Job %s: %s started", info.id, operation)
+        return info
+
+    async def _run(self, job: Job, responses: Callable[[], AsyncIterator[Any]]) -> None:
+        # The files are written in a thread, so that a job with many hosts
+        # does not hold up the event loop, and other requests, on the disk
+        info = job.info
+        saved = time.monotonic()
+
+        async def record(response: Any) -> None:
+            nonlocal saved
+            await asyncio.to_thread(job.append, json.dumps(jsonable_encoder(response)) + "\n")
+            info.responses += 1
+            if isinstance(response, dict) and response.get("error"):
+                info.errors += 1
+            if time.monotonic() - saved >= SAVE_INTERVAL:
+                await asyncio.to_thread(job.save)
+                saved = time.monotonic()
+            async with job.changed:
+                job.changed.notify_all()
+
+        recording: Optional[asyncio.Future] = None
+        try:
+            async for response in responses():
+                # Shielded, so a response being written when the job is
+                # cancelled is still counted
+                recording = asyncio.ensure_future(record(response))
+                await asyncio.shield(recording)
+            info.status = JobStatus.COMPLETED
+        except asyncio.CancelledError:
+            info.status = JobStatus.INTERRUPTED if self._closing else JobStatus.CANCELLED
+        except Exception as e:
+            logger.error("Job %s: %s", info.id, e, exc_info=True)
+            info.status = JobStatus.FAILED
+            info.error = f"{e.__class__.__name__}: {e}"
+        if recording is not None:
+            await asyncio.gather(recording, return_exceptions=True)
+        info.finished = _now()
+        await asyncio.to_thread(job.save)
+        # An ended job is read back from its files, so stop holding it
+        self._jobs.pop(info.id, None)
+        logger.info("Job %s: %s", info.id, info.status.value)
+        async with job.changed:
+            job.changed.notify_all()
+
+    def _load(self, job_id: str) -> Optional[JobInfo]:
+        if not JOB_ID.fullmatch(job_id):
+            return None
+        path = self.directory / f"{job_id}.json"
+        try:
+            info = JobInfo.model_validate_json(path.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        if info.status == JobStatus.RUNNING:
+            info.status = JobStatus.INTERRUPTED
+        return info
+
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        """Return the JobInfo of a job, or None if there is no such job."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.info
+        return self._load(job_id)
+
+    def list(self) -> List[JobInfo]:
+        """Return the JobInfo of every job in the jobs directory, oldest first."""
+        jobs = []
+        if self.directory.is_dir():
+            for path in self.directory.glob("*.json"):
+                info = self.get(path.stem)
+                if info is not None:
+                    jobs.append(info)
+        return sorted(jobs, key=lambda info: info.created)
+
+    def results(self, job_id: str, offset: int = 0) -> Tuple[List[Any], int]:
+        """Return the responses a job has saved, from the ``offset``th on.
+
+        Returns:
+            The responses, and the offset to read the next responses from.
+        """
+        responses = []
+        if not JOB_ID.fullmatch(job_id):
+            return responses, offset
+        try:
+            with open(self.directory / f"{job_id}.ndjson") as f:
+                for i, line in enumerate(f):
+                    # A line being written has no newline yet
+                    if not line.endswith("\n"):
+                        break
+                    if i >= offset:
+                        responses.append(json.loads(line))
+        except FileNotFoundError:
+            pass
+        return responses, offset + len(responses)
+
+    async def follow(self, job_id: str) -> AsyncIterator[Any]:
+        """Yield the responses of a job, waiting for new ones until it ends."""
+        offset = 0
+        while True:
+            job = self._jobs.get(job_id)
+            # A job saves all its responses before it ends, so the responses
+            # read after it is seen to end are all of them
+            running = job is not None and job.info.status == JobStatus.RUNNING
+            responses, offset = self.results(job_id, offset)
+            for response in responses:
+                yield response
+            if not running:
+                return
+            async with job.changed:
+                # A line is written before it is counted, so the file may be ahead
+                if job.info.responses <= offset and job.info.status == JobStatus.RUNNING:
+                    await job.changed.wait()
+
+    async def cancel(self, job_id: str) -> Optional[JobInfo]:
+        """Cancel a running job, keeping the responses it has saved.
+
+        Returns:
+            The JobInfo of the job, or None if there is no such job.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return self._load(job_id)
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+        return job.info
+
+    async def delete(self, job_id: str) -> Optional[JobInfo]:
+        """Cancel a job if it is running, and delete its files.
+
+        Returns:
+            The JobInfo of the job, or None if there is no such job.
+        """
+        info = await self.cancel(job_id)
+        if info is None:
+            return None
+        self._jobs.pop(job_id, None)
+        for suffix in (".json", ".ndjson"):
+            (self.directory / f"{job_id}{suffix}").unlink(missing_ok=True)
+        return info
+
+    async def close(self) -> None:
+        """Stop the jobs still running, as the process stops, marking them interrupted."""
+        self._closing = True
+        try:
+            for job_id in list(self._jobs):
+                await self.cancel(job_id)
+        finally:
+            self._closing = False
+        self._jobs.clear()
+
+
+# The process-wide manager shared by every endpoint
+job_manager = JobManager()
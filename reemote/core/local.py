@@ -1,8 +1,9 @@
 from abc import abstractmethod
 from typing import AsyncGenerator
 
-from reemote.context import Context, ConnectionType
-from reemote.core.response import Response
+from reemote.context import Context, ConnectionType, ExecutionContext
+from reemote.core.model_cache import validate_model
+from reemote.core.response import Response, StreamFormat
 
 from pathlib import PurePath
 from typing import Optional, Union
@@ -17,6 +18,16 @@ class LocalModel(BaseModel):
         default="all", description="The inventory host group. Defaults to 'all'."
     )
     name: Optional[str] = Field(default=None, description="Optional name.")
+    stream: Optional[StreamFormat] = Field(
+        default=None,
+        description="Stream one response per host as it completes, as 'ndjson' or 'sse' (REST API only).",
+        exclude=True,
+    )
+    background: bool = Field(
+        default=False,
+        description="Run as a background job, answering at once with the job's id (REST API only).",
+        exclude=True,
+    )
 
 
 def localmodel(
@@ -24,9 +35,16 @@ def localmodel(
         "all", description="Optional inventory group (defaults to 'all')"
     ),
     name: Optional[str] = Query(None, description="Optional name"),
+    stream: Optional[StreamFormat] = Query(
+        None,
+        description="Stream one response per host as it completes, as 'ndjson' or 'sse'",
+    ),
+    background: bool = Query(
+        False, description="Run as a background job, answering at once with the job's id"
+    ),
 ) -> LocalModel:
     """FastAPI dependency for common parameters"""
-    return LocalModel(group=group, name=name)
+    return LocalModel(group=group, name=name, stream=stream, background=background)
 
 
 class LocalPathModel(LocalModel):
@@ -63,16 +81,26 @@ class Local:
         self.kwargs = kwargs
 
     async def execute(self) -> AsyncGenerator[Context, Response]:
-        model_instance = self.Model.model_validate(self.kwargs)
+        model_instance = validate_model(self.Model, self.kwargs)
         yield Context(
             type=ConnectionType.LOCAL,
             callback=self._callback,
             call=self.__class__.child + "(" + str(model_instance) + ")",
             caller=model_instance,
             group=model_instance.group,
+            fact=self._fact(model_instance),
         )
 
+    @staticmethod
+    def _fact(model_instance: LocalModel) -> Optional[str]:
+        """Return the name of the fact this operation reads, if it only reads one.
+
+        Operations that only read the state of a host override this, so that
+        their responses can be answered from the fact cache.
+        """
+        return None
+
     @staticmethod
     @abstractmethod
-    async def _callback(context: Context) -> None:
+    async def _callback(context: ExecutionContext) -> None:
         pass
\ No newline at end of file
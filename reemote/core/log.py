@@ -0,0 +1,133 @@
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import queue
+import reprlib
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+# The run id outside of any run
+NO_RUN = "-"
+
+# The run and host that the current task is working on, added to every record
+run_id: contextvars.ContextVar[str] = contextvars.ContextVar("run_id", default=NO_RUN)
+host: contextvars.ContextVar[str] = contextvars.ContextVar("host", default="-")
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(run_id)s %(host)s] %(message)s"
+
+_repr = reprlib.Repr()
+_repr.maxlevel = 4
+_repr.maxstring = 500
+_repr.maxother = 500
+_repr.maxdict = 20
+_repr.maxlist = 20
+
+
+class Payload:
+    """Format a value for a log message only when the message is emitted.
+
+    Strings, such as the stdout of a command, are truncated, as are long
+    lists and dictionaries and deeply nested values, so that logging a large
+    result costs no more than logging a small one.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        if isinstance(self.value, str):
+            return _repr.repr(self.value)[1:-1]
+        return _repr.repr(self.value)
+
+
+def payload(value: Any) -> Payload:
+    """Wrap a value that may be large for use as a log message argument."""
+    return Payload(value)
+
+
+class RunContextFilter(logging.Filter):
+    """Add the current run id and host to each record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = run_id.get()
+        record.host = host.get()
+        return True
+
+
+@contextmanager
+def run_context() -> Iterator[str]:
+    """Tag the records logged in this context with a new run id."""
+    token = run_id.set(uuid.uuid4().hex[:8])
+    try:
+        yield run_id.get()
+    finally:
+        run_id.reset(token)
+
+
+@contextmanager
+def host_context(name: str) -> Iterator[None]:
+    """Tag the records logged in this context with a host."""
+    token = host.set(name)
+    try:
+        yield
+    finally:
+        host.reset(token)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_filename: Optional[str] = None
+
+
+def configure_logging(filename: str, level: int = logging.DEBUG) -> None:
+    """Send log records to ``filename`` through a background thread.
+
+    Records are put on a queue by the logging call and written to the file by
+    a QueueListener thread, so file writes do not block the event loop.  The
+    file is overwritten when logging is first configured.  Calling this again
+    with the same file does nothing.
+    """
+    global _listener, _queue_handler, _filename
+
+    if filename == _filename:
+        return
+    stop_logging()
+
+    file_handler = logging.FileHandler(filename, mode="w")
+    file_handler.setFormatter(logging.Formatter(FORMAT))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(records)
+    _queue_handler.addFilter(RunContextFilter())
+    _listener = logging.handlers.QueueListener(
+        records, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    _filename = filename
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    logging.getLogger("reemote").setLevel(level)
+
+
+def stop_logging() -> None:
+    """Flush the queued records and stop writing to the log file."""
+    global _listener, _queue_handler, _filename
+
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    _filename = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Mapping, Type, TypeVar
+
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+
+# Immutable types whose values are their own keys
+_ATOMIC = frozenset((str, int, float, bool, bytes, type(None)))
+
+
+def freeze(value: Any) -> Hashable:
+    """Return a hashable key equal for equal arguments of the same types.
+
+    Dictionaries, lists, tuples and sets are frozen recursively.  The type of
+    every other value is part of its key, so that ``1``, ``1.0`` and ``True``,
+    which compare equal, are not validated as the same argument.  Dictionary
+    keys keep their order, which is the order of the keyword arguments, so
+    the same arguments given in another order only miss the cache.  Raises
+    TypeError if a value is not hashable.
+    """
+    cls = type(value)
+    if cls in _ATOMIC:
+        return (cls, value)
+    if cls is dict:
+        return (dict, tuple([(key, freeze(item)) for key, item in value.items()]))
+    if cls is list or cls is tuple:
+        return (cls, tuple(map(freeze, value)))
+    if cls is set or cls is frozenset:
+        return (cls, frozenset(map(freeze, value)))
+    if isinstance(value, Mapping):
+        return (cls, freeze(dict(value)))
+    hash(value)
+    return (cls, value)
+
+
+class ModelCache:
+    """Share validated operation models between the hosts of a request.
+
+    An operation is instantiated once per host with the same arguments, and
+    validates them into its Model in execute().  The cache keeps the most
+    recently validated models, keyed by Model and arguments, so the arguments
+    are validated once rather than once per host.  A cached model is shared
+    by every operation that validated the same arguments, so it must not be
+    modified.
+
+    Arguments that cannot be hashed, such as pydantic models, are validated
+    every time.
+
+    Args:
+        maxsize: The number of models kept.  0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._models: "OrderedDict[Hashable, BaseModel]" = OrderedDict()
+
+    def validate(self, model: Type[M], kwargs: Dict[str, Any]) -> M:
+        """Return ``kwargs`` validated into ``model``, from the cache if possible."""
+        try:
+            key = (model, freeze(kwargs))
+        except TypeError:
+            return model.model_validate(kwargs)
+
+        instance = self._models.get(key)
+        if instance is not None:
+            self._models.move_to_end(key)
+            self.hits += 1
+            return instance
+
+        self.misses += 1
+        instance = model.model_validate(kwargs)
+        if self.maxsize > 0:
+            self._models[key] = instance
+            if len(self._models) > self.maxsize:
+                self._models.popitem(last=False)
+        return instance
+
+    def clear(self) -> None:
+        self._models.clear()
+
+
+# The process-wide cache shared by every operation
+model_cache = ModelCache()
+
+
+def validate_model(model: Type[M], kwargs: Dict[str, Any]) -> M:
+    """Validate ``kwargs`` into ``model`` through the shared cache."""
+    return model_cache.validate(model, kwargs)
@@ -1,47 +1,74 @@
-def parse_apt_list_installed(value):
-    """Parses the output of 'apt list --installed' into a list of dictionaries.
+import io
+from typing import Iterable, NamedTuple, Union
 
-    This helper function processes the raw string output from the
-    `apt list --installed` command. It iterates through each line,
-    skipping the "Listing..." header and any empty lines. For each valid
-    package line, it accurately extracts the package name and its
-    corresponding version number.
+
+class InstalledPackage(NamedTuple):
+    """The name and version of an installed package."""
+
+    name: str
+    version: str
+
+
+def lines_of(value: Union[str, Iterable[str]]) -> Iterable[str]:
+    """Iterate over the lines of a string, or pass through an iterable of lines."""
+    if isinstance(value, str):
+        return io.StringIO(value)
+    return value
+
+
+def iter_apt_list_installed(value):
+    """Parses the output of 'apt list --installed' one line at a time.
+
+    This is the streaming form of ``parse_apt_list_installed``.  It accepts
+    the whole output, or any iterable of its lines, and yields a tuple for
+    each package as its line is read, so no intermediate list of lines or
+    dictionaries is built.
 
     Args:
-        value (str): The raw string output from the `apt list --installed`
-            command.
+        value (str | Iterable[str]): The raw output from the
+            `apt list --installed` command, or its lines.
 
-    Returns:
-        list[dict]: A list of dictionaries, where each dictionary
-            represents an installed package and contains 'name' and 'version'
-            keys. Example: `[{'name': 'zlib1g', 'version': '1:1.2.11.dfsg-2'}]`.
+    Yields:
+        InstalledPackage: The name and version of each installed package.
+            Example: `InstalledPackage(name='zlib1g', version='1:1.2.11.dfsg-2')`.
     """
-    lines = value.strip().split('\n')
-    packages = []
-
-    for line in lines:
+    for line in lines_of(value):
         line = line.strip()
         if not line or line.startswith('Listing...'):
             continue
 
         # Split package name from the rest using first '/'
-        if '/' not in line:
+        name, slash, rest = line.partition('/')
+        if not slash:
             continue
 
-        name_part, rest = line.split('/', 1)
-        name = name_part.strip()
-
         # Find the first space — version starts right after it
-        space_index = rest.find(' ')
-        if space_index == -1:
+        _, space, after_space = rest.partition(' ')
+        if not space:
             continue
 
-        # Extract everything after the first space
-        after_space = rest[space_index + 1:]
-
         # Version is everything until the next space or '['
         version = after_space.split(' ', 1)[0].split('[', 1)[0].rstrip(',')
 
-        packages.append({"name": name, "version": version})
+        yield InstalledPackage(name.strip(), version)
+
+
+def parse_apt_list_installed(value):
+    """Parses the output of 'apt list --installed' into a list of dictionaries.
 
-    return packages
+    This helper function processes the raw string output from the
+    `apt list --installed` command. It iterates through each line,
+    skipping the "Listing..." header and any empty lines. For each valid
+    package line, it accurately extracts the package name and its
+    corresponding version number.
+
+    Args:
+        value (str): The raw string output from the `apt list --installed`
+            command.
+
+    Returns:
+        list[dict]: A list of dictionaries, where each dictionary
+            represents an installed package and contains 'name' and 'version'
+            keys. Example: `[{'name': 'zlib1g', 'version': '1:1.2.11.dfsg-2'}]`.
+    """
+    return [package._asdict() for package in iter_apt_list_installed(value)]
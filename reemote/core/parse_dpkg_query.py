@@ -0,0 +1,47 @@
+from reemote.core.parse_apt_list_installed import InstalledPackage, lines_of
+
+# The format given to dpkg-query -W by GetPackages, one package per line
+DPKG_QUERY_FORMAT = r"${Package}\t${Version}\t${Status}\n"
+
+
+def iter_dpkg_query(value):
+    """Parses the output of 'dpkg-query -W' one line at a time.
+
+    The output is expected in ``DPKG_QUERY_FORMAT``: the package name, its
+    version and its status, separated by tabs.  dpkg also reports packages
+    that it knows of but that are not installed, such as removed packages
+    whose configuration files remain, so only lines whose status ends in
+    "installed" are kept.
+
+    Args:
+        value (str | Iterable[str]): The raw output from the
+            `dpkg-query -W` command, or its lines.
+
+    Yields:
+        InstalledPackage: The name and version of each installed package.
+    """
+    for line in lines_of(value):
+        fields = line.rstrip('\n').split('\t')
+        if len(fields) != 3:
+            continue
+
+        name, version, status = fields
+        if not status.endswith(' installed'):
+            continue
+
+        yield InstalledPackage(name.strip(), version.strip())
+
+
+def parse_dpkg_query(value):
+    """Parses the output of 'dpkg-query -W' into a list of dictionaries.
+
+    Args:
+        value (str): The raw string output from the `dpkg-query -W`
+            command.
+
+    Returns:
+        list[dict]: A list of dictionaries, where each dictionary
+            represents an installed package and contains 'name' and 'version'
+            keys. Example: `[{'name': 'zlib1g', 'version': '1:1.2.11.dfsg-2'}]`.
+    """
+    return [package._asdict() for package in iter_dpkg_query(value)]
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from reemote.core.inventory_model import InventoryItem
+from reemote.core.log import NO_RUN, run_id
+
+logger = logging.getLogger(__name__)
+
+
+class Seed(NamedTuple):
+    """A host that holds the files, and where it holds them."""
+
+    item: InventoryItem
+    paths: List[str]
+
+
+class Relay:
+    """Choose where each host of a distribution receives the files from.
+
+    The API host sends the files to the first hosts.  Each host that has
+    received them becomes a seed, and sends them on to later hosts, so the
+    hosts holding the files about double with every round of transfers
+    rather than grow by a fixed number.  Every source, the API host
+    included, sends to at most ``fanout`` hosts at once.  Seeds are preferred
+    to the API host, whose uplink is shared by every transfer it sends.
+
+    Args:
+        fanout: The transfers each source sends at once.
+    """
+
+    def __init__(self, fanout: int = 2):
+        self.fanout = fanout
+        self.seeds: List[Seed] = []
+        self._sending: Dict[Optional[str], int] = {None: 0}
+        self._changed = asyncio.Condition()
+
+    def _free(self, peers: bool) -> Optional[Seed]:
+        """Return a seed with a free slot, else None."""
+        if peers:
+            for seed in self.seeds:
+                if self._sending[seed.item.connection.host] < self.fanout:
+                    return seed
+        return None
+
+    @asynccontextmanager
+    async def source(self, peers: bool = True) -> AsyncIterator[Optional[Seed]]:
+        """Wait for a source with a free slot and hold the slot.
+
+        Yields the seed to copy from, or None to upload from the API host.
+        With ``peers`` false only the API host is used.
+        """
+        async with self._changed:
+            while True:
+                seed = self._free(peers)
+                if seed is not None:
+                    host = seed.item.connection.host
+                    break
+                if self._sending[None] < self.fanout:
+                    host = None
+                    break
+                await self._changed.wait()
+            self._sending[host] += 1
+        try:
+            yield seed
+        finally:
+            async with self._changed:
+                self._sending[host] -= 1
+                self._changed.notify_all()
+
+    async def seed(self, item: InventoryItem, paths: List[str]) -> None:
+        """Add a host that now holds the files at ``paths``."""
+        async with self._changed:
+            self.seeds.append(Seed(item, paths))
+            self._sending.setdefault(item.connection.host, 0)
+            self._changed.notify_all()
+
+    async def discard(self, seed: Seed) -> None:
+        """Stop sending from a seed that can no longer send."""
+        async with self._changed:
+            if seed in self.seeds:
+                self.seeds.remove(seed)
+                logger.info("%s: no longer relaying", seed.item.connection.host)
+            self._changed.notify_all()
+
+
+class RelayRegistry:
+    """Share one Relay between the hosts of a distribution.
+
+    Every host runs its own copy of an operation, so the hosts distributing
+    the same files find their Relay by a key.  Within a run the Relay is
+    kept until ``end_run()``, so that the hosts of later batches, with
+    ``serial`` or fewer ``forks`` than hosts, receive the files from the
+    seeds of earlier batches.  Outside a run it is kept while any host that
+    joined it is still distributing.
+    """
+
+    def __init__(self):
+        self._relays: Dict[Tuple[str, Hashable], Relay] = {}
+        self._members: Dict[Tuple[str, Hashable], int] = {}
+
+    @asynccontextmanager
+    async def join(self, key: Hashable, fanout: int) -> AsyncIterator[Relay]:
+        run = run_id.get()
+        key = (run, key)
+        relay = self._relays.get(key)
+        if relay is None:
+            relay = self._relays[key] = Relay(fanout)
+            self._members[key] = 0
+        self._members[key] += 1
+        try:
+            yield relay
+        finally:
+            # A host still stopping when its run ended finds the Relay gone
+            if key in self._members:
+                self._members[key] -= 1
+                if not self._members[key] and run == NO_RUN:
+                    del self._members[key]
+                    del self._relays[key]
+
+    def end_run(self, run: str) -> None:
+        """Drop the Relays of a run that has ended."""
+        for key in [key for key in self._relays if key[0] == run]:
+            del self._members[key]
+            del self._relays[key]
+
+
+# The process-wide registry shared by every distribution
+relays = RelayRegistry()
@@ -4,6 +4,8 @@ from fastapi import Body
 from fastapi import Query
 from pydantic import BaseModel, ConfigDict, Field
 
+from reemote.core.response import StreamFormat
+
 class RemoteModel(BaseModel):
     """Common parameters shared across command types"""
 
@@ -23,6 +25,20 @@ class RemoteModel(BaseModel):
         default={},
         description="Optional session arguments to pass to Asyncssh create_session().",
     )
+    ssh_compression: bool = Field(
+        default=False,
+        description="Compress the command's output with SSH compression.",
+    )
+    stream: Optional[StreamFormat] = Field(
+        default=None,
+        description="Stream one response per host as it completes, as 'ndjson' or 'sse' (REST API only).",
+        exclude=True,
+    )
+    background: bool = Field(
+        default=False,
+        description="Run as a background job, answering at once with the job's id (REST API only).",
+        exclude=True,
+    )
 
 
 def remotemodel(
@@ -40,9 +56,19 @@ def remotemodel(
         default={},
         description="Optional session arguments to pass to Asyncssh create_session().",
     ),
+    ssh_compression: bool = Query(
+        False, description="Whether to compress the command's output with SSH compression"
+    ),
+    stream: Optional[StreamFormat] = Query(
+        None,
+        description="Stream one response per host as it completes, as 'ndjson' or 'sse'",
+    ),
+    background: bool = Query(
+        False, description="Run as a background job, answering at once with the job's id"
+    ),
 ) -> RemoteModel:
     """FastAPI dependency for common parameters"""
-    return RemoteModel(group=group, name=name, sudo=sudo, su=su, connection=connection, session=session)
+    return RemoteModel(group=group, name=name, sudo=sudo, su=su, connection=connection, session=session, ssh_compression=ssh_compression, stream=stream, background=background)
 
 
 class Remote:
@@ -1,10 +1,18 @@
 # Copyright (c) 2025 Kim Jarvis TPF Software Services S.A. kim.jarvis@tpfsystems.com
 # This software is licensed under the MIT License. See the LICENSE file for details.
 #
+from enum import Enum
 from typing import Any, Dict, Optional, Tuple, Union, List
 from pydantic import Field
 from pydantic import BaseModel, RootModel
 
+class StreamFormat(str, Enum):
+    """Formats for streaming one response per host as each host completes."""
+
+    NDJSON = "ndjson"
+    SSE = "sse"
+
+
 class SSHCompletedProcessModel(BaseModel):
     # env: Optional[Dict[str, str]] = Field(
     #     default=None,
@@ -1,8 +1,14 @@
-from typing import Type, Any, Callable, List, Dict
+import json
+from typing import Type, Any, AsyncIterator, Callable, List, Dict, Optional
 from fastapi import Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, ValidationError
+from reemote.core.jobs import job_manager
+from reemote.core.model_cache import validate_model
 from reemote.core.remote import RemoteModel, remotemodel
-from reemote.execute import endpoint_execute
+from reemote.core.response import StreamFormat
+from reemote.execute import endpoint_execute, endpoint_execute_stream
 
 
 def _process_common_arguments(
@@ -14,27 +20,168 @@ def _process_common_arguments(
     elif isinstance(common, BaseModel):
         return common.model_dump()
     elif isinstance(common, dict):
-        return common
+        return {
+            key: value for key, value in common.items() if key not in ("stream", "background")
+        }
     else:
         raise TypeError("`common` must be a CommonParams instance, dict, or None")
 
 
+def _stream_format(common: RemoteModel | None) -> Optional[StreamFormat]:
+    """Return the requested stream format, if any, from the `common` arguments."""
+    if isinstance(common, dict):
+        stream = common.get("stream")
+    else:
+        stream = getattr(common, "stream", None)
+    return StreamFormat(stream) if stream else None
+
+
+def _background(common: RemoteModel | None) -> bool:
+    """Return whether the `common` arguments ask for a background job."""
+    if isinstance(common, dict):
+        return bool(common.get("background"))
+    return bool(getattr(common, "background", False))
+
+
+def _validate(model: Type[BaseModel], all_arguments: Dict[str, Any]) -> None:
+    """Helper function to validate input, raising an HTTP 422 error if it is invalid.
+
+    The validated model is cached, so the operation on each host reuses it.
+    """
+    try:
+        validate_model(model, all_arguments)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+
 async def _validate_and_execute(
     model: Type[BaseModel],
     command_class: Type,
     all_arguments: Dict[str, Any],
 ) -> List[Any]:
     """Helper function to validate input and execute the command."""
-    try:
-        model(**all_arguments)
-    except ValidationError as e:
-        raise HTTPException(status_code=422, detail=e.errors())
+    _validate(model, all_arguments)
 
-    # Execute the command with the validated data
-    responses = await endpoint_execute(lambda: command_class(**all_arguments))
+    # Execute the command with the validated data, only on hosts in its group
+    responses = await endpoint_execute(
+        lambda: command_class(**all_arguments), group=all_arguments.get("group")
+    )
     return responses
 
 
+def _streaming_response(
+    stream_format: StreamFormat,
+    responses: AsyncIterator[Any],
+) -> StreamingResponse:
+    """Send each response as an NDJSON line or a Server-Sent Event as it arrives."""
+
+    def encode(response: Any, event: str = "response") -> str:
+        data = json.dumps(jsonable_encoder(response))
+        if stream_format == StreamFormat.SSE:
+            return f"event: {event}\ndata: {data}\n\n"
+        return data + "\n"
+
+    async def body():
+        try:
+            async for response in responses:
+                yield encode(response)
+        except Exception as e:
+            # The status line has already been sent, so report the failure in-band
+            yield encode(
+                {"host": None, "changed": False, "error": True, "value": f"{e.__class__.__name__}: {e}"},
+                event="error",
+            )
+        if stream_format == StreamFormat.SSE:
+            yield "event: end\ndata: {}\n\n"
+
+    media_type = (
+        "text/event-stream"
+        if stream_format == StreamFormat.SSE
+        else "application/x-ndjson"
+    )
+    return StreamingResponse(body(), media_type=media_type)
+
+
+def _return_response(command_class: Type) -> Callable[[Any], Optional[Any]]:
+    """Return a function that keeps a host's Return response, named after the command.
+
+    The function returns None for any other response.  A response without
+    a ``call`` is a host's final response, which is its Return response.
+    """
+
+    def select(response: Any) -> Optional[Any]:
+        if not isinstance(response, dict):
+            return None
+        call = response.get("call")
+        if call is None:
+            return response
+        if not call.startswith("Return"):
+            return None
+        # Replace "Return" with the name of the command_class type
+        response["call"] = call.replace("Return", command_class.__name__, 1)
+        return response
+
+    return select
+
+
+async def _selected(
+    responses: AsyncIterator[Any],
+    select: Optional[Callable[[Any], Optional[Any]]],
+) -> AsyncIterator[Any]:
+    """Yield the responses that ``select`` keeps, as it returns them."""
+    async for response in responses:
+        if select is not None:
+            response = select(response)
+            if response is None:
+                continue
+        yield response
+
+
+def _validate_and_stream(
+    model: Type[BaseModel],
+    command_class: Type,
+    all_arguments: Dict[str, Any],
+    stream_format: StreamFormat,
+    select: Optional[Callable[[Any], Optional[Any]]] = None,
+) -> StreamingResponse:
+    """Helper function to validate input and stream the command's responses."""
+    _validate(model, all_arguments)
+    return _streaming_response(
+        stream_format,
+        _selected(
+            endpoint_execute_stream(
+                lambda: command_class(**all_arguments), group=all_arguments.get("group")
+            ),
+            select,
+        ),
+    )
+
+
+def _validate_and_submit(
+    model: Type[BaseModel],
+    command_class: Type,
+    all_arguments: Dict[str, Any],
+    select: Optional[Callable[[Any], Optional[Any]]] = None,
+) -> JSONResponse:
+    """Helper function to validate input and start the command as a background job.
+
+    The job saves the final response of each host as it completes, as a
+    stream would send it.  The response is the job's JobInfo, with status
+    202 Accepted.
+    """
+    _validate(model, all_arguments)
+    group = all_arguments.get("group")
+    info = job_manager.submit(
+        command_class.__name__,
+        lambda: _selected(
+            endpoint_execute_stream(lambda: command_class(**all_arguments), group=group),
+            select,
+        ),
+        group=group,
+    )
+    return JSONResponse(status_code=202, content=jsonable_encoder(info))
+
+
 def router_handler(
     model: Type[BaseModel],
     command_class: Type,
@@ -44,6 +191,11 @@ def router_handler(
     ) -> list[Any]:
         common_dict = _process_common_arguments(common)
         all_arguments = {**common_dict, **kwargs}
+        if _background(common):
+            return _validate_and_submit(model, command_class, all_arguments)
+        stream_format = _stream_format(common)
+        if stream_format:
+            return _validate_and_stream(model, command_class, all_arguments, stream_format)
         responses = await _validate_and_execute(model, command_class, all_arguments)
         return responses
 
@@ -59,16 +211,16 @@ def router_handler_put(
     ) -> list[Any]:
         common_dict = _process_common_arguments(common)
         all_arguments = {**common_dict, **kwargs}
+        # Each host's Return response, whether listed, streamed or saved by a job
+        select = _return_response(command_class)
+        if _background(common):
+            return _validate_and_submit(model, command_class, all_arguments, select)
+        stream_format = _stream_format(common)
+        if stream_format:
+            return _validate_and_stream(
+                model, command_class, all_arguments, stream_format, select
+            )
         responses = await _validate_and_execute(model, command_class, all_arguments)
+        return [r for r in map(select, responses) if r is not None]
 
-        # Process responses
-        out = []
-        for r in responses:
-            if r["call"].startswith("Return"):
-                # Replace "Return" with the name of the command_class type
-                r["call"] = r["call"].replace("Return", command_class.__name__, 1)
-                out.append(r)
-
-        return out
-
-    return handler
\ No newline at end of file
+    return handler
@@ -0,0 +1,87 @@
+import asyncio
+import math
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, TypeVar, Union
+
+T = TypeVar("T")
+
+
+def batch_size(serial: Union[int, str, None], total: int) -> int:
+    """Return the number of hosts per rolling batch.
+
+    Args:
+        serial: A host count, such as ``10``, a percentage of the inventory,
+            such as ``"25%"``, or None to process every host in one batch.
+        total: The number of hosts in the inventory.
+
+    Returns:
+        int: The batch size, at least 1 when there are hosts.
+    """
+    if serial is None:
+        return max(total, 1)
+    if isinstance(serial, str):
+        text = serial.strip()
+        if text.endswith("%"):
+            percent = float(text[:-1])
+            if not 0 < percent <= 100:
+                raise ValueError(f"serial percentage must be in (0, 100]: {serial}")
+            return max(1, math.ceil(total * percent / 100))
+        serial = int(text)
+    if serial < 1:
+        raise ValueError(f"serial must be at least 1: {serial}")
+    return serial
+
+
+class Scheduler:
+    """Bound how many hosts are processed at the same time.
+
+    Args:
+        forks: The maximum number of hosts processed concurrently, or None
+            for no limit.
+        serial: Process the inventory in rolling batches of this many hosts
+            (an int) or this percentage of hosts (a string such as ``"20%"``).
+            A batch starts when the previous batch has finished.
+        group_limits: The maximum number of hosts processed concurrently
+            from each named inventory group.
+    """
+
+    def __init__(
+        self,
+        forks: Optional[int] = None,
+        serial: Union[int, str, None] = None,
+        group_limits: Optional[Dict[str, int]] = None,
+    ):
+        if forks is not None and forks < 1:
+            raise ValueError(f"forks must be at least 1: {forks}")
+        for group, limit in (group_limits or {}).items():
+            if limit < 1:
+                raise ValueError(f"group limit for {group} must be at least 1: {limit}")
+        self.forks = forks
+        self.serial = serial
+        self.group_limits = dict(group_limits or {})
+        self._forks_semaphore: Optional[asyncio.Semaphore] = None
+        self._group_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def batches(self, hosts: Sequence[T]) -> List[Sequence[T]]:
+        """Split the hosts into the rolling batches to process in turn."""
+        size = batch_size(self.serial, len(hosts))
+        return [hosts[i : i + size] for i in range(0, len(hosts), size)]
+
+    @asynccontextmanager
+    async def slot(self, groups: Iterable[str]) -> AsyncIterator[None]:
+        """Wait for a free slot for a host that belongs to ``groups``."""
+        async with AsyncExitStack() as stack:
+            # Acquire group slots in a fixed order, and before the forks slot,
+            # so hosts waiting on a busy group do not hold a fork.
+            for group in sorted(set(groups) & self.group_limits.keys()):
+                semaphore = self._group_semaphores.get(group)
+                if semaphore is None:
+                    semaphore = self._group_semaphores[group] = asyncio.Semaphore(
+                        self.group_limits[group]
+                    )
+                await stack.enter_async_context(semaphore)
+            if self.forks is not None:
+                if self._forks_semaphore is None:
+                    self._forks_semaphore = asyncio.Semaphore(self.forks)
+                await stack.enter_async_context(self._forks_semaphore)
+            yield
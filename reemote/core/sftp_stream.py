@@ -0,0 +1,353 @@
+import asyncio
+import base64
+import collections
+import json
+import logging
+import tempfile
+from typing import IO, AsyncIterator, List, Optional
+
+import asyncssh
+
+from reemote.core.autotune import link_tuner
+from reemote.core.connection_pool import connection_pool
+from reemote.core.facts import fact_cache
+from reemote.core.inventory_model import Connection, InventoryItem
+
+logger = logging.getLogger(__name__)
+
+# The bytes read from the remote file at a time.  asyncssh splits each read
+# into block_size requests, up to max_requests of them in flight at once.
+CHUNK_SIZE = 1024 * 1024
+
+
+async def read_chunks(
+    connection: Connection,
+    path: str,
+    offset: int = 0,
+    length: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    block_size: int = -1,
+    max_requests: int = -1,
+    autotune: bool = False,
+) -> AsyncIterator[bytes]:
+    """Yield the bytes of a remote file, ``chunk_size`` bytes at a time.
+
+    The file is read over the pooled SFTP session of the host, which stays
+    leased until the generator finishes or is closed, so only one chunk is
+    held in memory at a time.
+
+    Args:
+        connection: The host to read from.
+        path: The remote file.
+        offset: The byte to start reading at.
+        length: The number of bytes to read, or None to read to the end.
+        chunk_size: The largest chunk yielded.
+        block_size: The block size of each SFTP read request.
+        max_requests: The maximum number of parallel SFTP read requests.
+        autotune: Choose the block size and chunk size for the host from its
+            measured RTT and throughput, instead of the ones given.
+    """
+    async with connection_pool.sftp_client(connection) as sftp:
+        meter = await link_tuner.meter(connection, sftp) if autotune else None
+        if meter is not None:
+            block_size, max_requests = meter.block_size, meter.max_requests
+        try:
+            async with sftp.open(
+                path, "rb", block_size=block_size, max_requests=max_requests
+            ) as f:
+                remaining = length
+                while remaining is None or remaining > 0:
+                    if meter is not None:
+                        chunk_size = meter.chunk_size
+                    size = chunk_size if remaining is None else min(chunk_size, remaining)
+                    data = await f.read(size, offset)
+                    if not data:
+                        break
+                    offset += len(data)
+                    if remaining is not None:
+                        remaining -= len(data)
+                    if meter is not None:
+                        meter.add(len(data))
+                    yield data
+        finally:
+            if meter is not None:
+                meter.finish()
+
+
+def ndjson_line(record: dict) -> bytes:
+    return json.dumps(record).encode() + b"\n"
+
+
+async def multiplex_chunks(
+    hosts: List[InventoryItem],
+    path: str,
+    offset: int = 0,
+    length: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    block_size: int = -1,
+    max_requests: int = -1,
+    autotune: bool = False,
+) -> AsyncIterator[bytes]:
+    """Read a remote file from several hosts at once, as NDJSON lines.
+
+    Each chunk is sent as ``{"host", "offset", "data"}``, with the data
+    base64 encoded, in the order the chunks arrive.  Each host ends with
+    ``{"host", "done": true, "size"}``, or ``{"host", "error": true,
+    "value"}`` if its read failed.  The hosts wait for the client when it
+    reads more slowly than they send, so no more than two chunks per host
+    are held in memory.
+    """
+    lines: asyncio.Queue = asyncio.Queue(maxsize=len(hosts))
+
+    async def read_host(item: InventoryItem) -> None:
+        host = item.connection.host
+        position = offset
+        try:
+            async for data in read_chunks(
+                item.connection,
+                path,
+                offset=offset,
+                length=length,
+                chunk_size=chunk_size,
+                block_size=block_size,
+                max_requests=max_requests,
+                autotune=autotune,
+            ):
+                record = {
+                    "host": host,
+                    "offset": position,
+                    "data": base64.b64encode(data).decode(),
+                }
+                await lines.put((ndjson_line(record), False))
+                position += len(data)
+            record = {"host": host, "done": True, "size": position - offset}
+        except Exception as e:
+            logger.error("%s: %s", host, e.__class__.__name__)
+            record = {"host": host, "error": True, "value": e.__class__.__name__}
+        await lines.put((ndjson_line(record), True))
+
+    tasks = [asyncio.create_task(read_host(item)) for item in hosts]
+    try:
+        # Each host ends with exactly one last line
+        running = len(tasks)
+        while running:
+            line, last = await lines.get()
+            running -= last
+            yield line
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# The chunks held in memory for each host before its chunks are spooled
+QUEUE_CHUNKS = 16
+
+# The write requests each host keeps in flight at once
+WRITE_WINDOW = 4
+
+
+class HostWriter:
+    """Write a stream of chunks to a remote file on one host.
+
+    Chunks are passed to ``feed()``, which never waits.  They are queued in
+    memory while the host keeps up.  Once ``QUEUE_CHUNKS`` chunks are
+    waiting, the host is behind, and later chunks are appended to a
+    temporary file instead.  The host reads them back from the file once its
+    queue is empty, so a slow host neither holds the stream in memory nor
+    slows the other hosts.
+
+    ``run()`` writes the chunks as they arrive, with up to ``WRITE_WINDOW``
+    write requests in flight at once at their offsets in the file.
+
+    Args:
+        item: The host to write to.
+        progress: Set whenever the writer takes a chunk or stops.
+    """
+
+    def __init__(self, item: InventoryItem, progress: asyncio.Event):
+        self.item = item
+        self.progress = progress
+        self.size = 0
+        self.failed = False
+        # Set once the file is opened, and so truncated, on the host
+        self.opened = False
+        self.spooled = 0
+        self._queue: collections.deque = collections.deque()
+        self._spool: Optional[IO[bytes]] = None
+        self._spool_read = 0
+        self._spool_write = 0
+        self._ready = asyncio.Event()
+        self._finished = False
+
+    def feed(self, data: bytes) -> None:
+        """Add the next chunk of the file."""
+        if self.failed:
+            return
+        if self._spool is None and len(self._queue) < QUEUE_CHUNKS:
+            self._queue.append(data)
+        else:
+            if self._spool is None:
+                self._spool = tempfile.TemporaryFile()
+                self._spool_read = self._spool_write = 0
+            self._spool.seek(self._spool_write)
+            self._spool.write(data)
+            self._spool_write += len(data)
+            self.spooled += len(data)
+        self._ready.set()
+
+    @property
+    def behind(self) -> bool:
+        """Whether the writer has at least half a queue of chunks to write.
+
+        This is half the queue that makes it spool, so that hosts that write
+        at about the same speed wait for each other rather than spool.
+        """
+        return self._spool is not None or len(self._queue) >= QUEUE_CHUNKS // 2
+
+    def finish(self) -> None:
+        """Mark the end of the file."""
+        self._finished = True
+        self._ready.set()
+
+    def close(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    async def _next(self, chunk_size: int) -> Optional[bytes]:
+        """Return the next chunk to write, or None at the end of the file."""
+        while True:
+            self.progress.set()
+            if self._queue:
+                return self._queue.popleft()
+            if self._spool is not None:
+                if self._spool_read < self._spool_write:
+                    self._spool.seek(self._spool_read)
+                    data = self._spool.read(min(chunk_size, self._spool_write - self._spool_read))
+                    self._spool_read += len(data)
+                    return data
+                # Caught up: keep the next chunks in memory again
+                self.close()
+            if self._finished:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+
+    async def run(
+        self,
+        path: str,
+        attrs: asyncssh.SFTPAttrs,
+        chunk_size: int = CHUNK_SIZE,
+        block_size: int = -1,
+        max_requests: int = -1,
+    ) -> int:
+        """Write the chunks to ``path`` and return the number of bytes written."""
+        try:
+            async with connection_pool.sftp_client(self.item.connection) as sftp:
+                async with sftp.open(
+                    path,
+                    "wb",
+                    attrs=attrs,
+                    block_size=block_size,
+                    max_requests=max_requests,
+                ) as f:
+                    self.opened = True
+                    writes: collections.deque = collections.deque()
+                    try:
+                        while (data := await self._next(chunk_size)) is not None:
+                            if len(writes) >= WRITE_WINDOW:
+                                await writes.popleft()
+                            writes.append(asyncio.ensure_future(f.write(data, self.size)))
+                            self.size += len(data)
+                        await asyncio.gather(*writes)
+                    except BaseException:
+                        for write in writes:
+                            write.cancel()
+                        raise
+            return self.size
+        except BaseException:
+            self.failed = True
+            raise
+        finally:
+            self._queue.clear()
+            self.close()
+            self.progress.set()
+
+
+def _invalidate_facts(writers: List[HostWriter]) -> None:
+    # A host whose writer failed partway may be left with a truncated file,
+    # so its cached facts are as stale as those of a host that wrote it all
+    for writer in writers:
+        if writer.opened:
+            fact_cache.invalidate(writer.item.connection.host)
+
+
+async def fan_out_chunks(
+    hosts: List[InventoryItem],
+    chunks: AsyncIterator[bytes],
+    path: str,
+    attrs: Optional[asyncssh.SFTPAttrs] = None,
+    chunk_size: int = CHUNK_SIZE,
+    block_size: int = -1,
+    max_requests: int = -1,
+) -> List[dict]:
+    """Write a stream of chunks to a remote file on every host at once.
+
+    ``chunks`` is read once and each chunk is passed to a HostWriter for
+    every host.  Reading waits while every host is behind, so the stream
+    goes at the pace of the fastest host, and only the hosts slower than it
+    spool.  A host that fails stops receiving chunks; the others carry on.
+
+    Returns:
+        A response for each host, in the order of ``hosts``, whose value is
+        the number of bytes written or the name of the error.
+    """
+    attrs = attrs or asyncssh.SFTPAttrs()
+    progress = asyncio.Event()
+    writers = [HostWriter(item, progress) for item in hosts]
+    tasks = [
+        asyncio.create_task(
+            writer.run(
+                path,
+                attrs,
+                chunk_size=chunk_size,
+                block_size=block_size,
+                max_requests=max_requests,
+            )
+        )
+        for writer in writers
+    ]
+    try:
+        async for data in chunks:
+            for writer in writers:
+                writer.feed(data)
+            while all(writer.behind or writer.failed for writer in writers) and not all(
+                writer.failed for writer in writers
+            ):
+                progress.clear()
+                await progress.wait()
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _invalidate_facts(writers)
+        raise
+    for writer in writers:
+        writer.finish()
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    _invalidate_facts(writers)
+
+    responses = []
+    for writer, outcome in zip(writers, outcomes):
+        host = writer.item.connection.host
+        if isinstance(outcome, BaseException):
+            logger.error("%s: %s", host, outcome.__class__.__name__)
+            responses.append(
+                {"host": host, "changed": False, "error": True, "value": outcome.__class__.__name__}
+            )
+        else:
+            if writer.spooled:
+                logger.info("%s: spooled %d bytes", host, writer.spooled)
+            responses.append({"host": host, "changed": True, "error": False, "value": outcome})
+    return responses
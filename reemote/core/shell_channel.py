@@ -0,0 +1,90 @@
+import asyncio
+import shlex
+import uuid
+from typing import AnyStr, List, Sequence
+
+import asyncssh
+from asyncssh import SSHCompletedProcess
+
+
+class ShellChannel:
+    """Run commands over one long-lived shell session instead of a channel each.
+
+    Each command is run as ``sh -c '<command>'`` by a ``sh`` process started
+    once per session, with its stdin redirected from /dev/null.  After each
+    command the shell prints a marker holding the exit status to stdout, and
+    a marker to stderr, so that the output of each command can be separated
+    from the next.  Several commands can be written at once and their results
+    read back in order, so a batch costs one round trip rather than one per
+    command.
+
+    A channel runs one batch at a time; use ``lock`` to serialise batches.
+
+    Args:
+        process: The ``sh`` process on the remote host.
+    """
+
+    def __init__(self, process: asyncssh.SSHClientProcess):
+        self.process = process
+        self.lock = asyncio.Lock()
+        self._token = uuid.uuid4().hex
+        self._sequence = 0
+        self._binary = process.stdout.channel.get_encoding()[0] is None
+
+    @classmethod
+    async def open(cls, conn: asyncssh.SSHClientConnection, **session) -> "ShellChannel":
+        """Start a shell on ``conn``, passing ``session`` to create_process()."""
+        process = await conn.create_process("sh", **session)
+        return cls(process)
+
+    def is_open(self) -> bool:
+        return self.process.exit_status is None and not self.process.channel.is_closing()
+
+    def close(self) -> None:
+        self.process.close()
+
+    def _text(self, text: str) -> AnyStr:
+        return text.encode() if self._binary else text
+
+    async def run(self, commands: Sequence[str]) -> List[SSHCompletedProcess]:
+        """Run ``commands`` in order and return the result of each one."""
+        markers = []
+        script = []
+        for command in commands:
+            self._sequence += 1
+            marker = f"__reemote_{self._token}_{self._sequence}_"
+            markers.append(marker)
+            script.append(
+                f"sh -c {shlex.quote(command)} </dev/null; "
+                f"printf '{marker}%d__' $?; printf '{marker}' >&2\n"
+            )
+        self.process.stdin.write(self._text("".join(script)))
+
+        results = []
+        for command, marker in zip(commands, markers):
+            # Read stdout and stderr together, so a command that writes a lot
+            # to stderr cannot stall on a full channel window
+            (stdout, exit_status), stderr = await asyncio.gather(
+                self._read_stdout(marker), self._read_stderr(marker)
+            )
+            results.append(
+                SSHCompletedProcess(
+                    command=command,
+                    exit_status=exit_status,
+                    returncode=exit_status,
+                    stdout=stdout,
+                    stderr=stderr,
+                )
+            )
+        return results
+
+    async def _read_stdout(self, marker: str):
+        separator = self._text(marker)
+        output = await self.process.stdout.readuntil(separator)
+        status = await self.process.stdout.readuntil(self._text("__"))
+        return output[: -len(separator)], int(status[:-2])
+
+    async def _read_stderr(self, marker: str):
+        separator = self._text(marker)
+        output = await self.process.stderr.readuntil(separator)
+        return output[: -len(separator)]
@@ -0,0 +1,260 @@
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import posixpath
+import shlex
+from pathlib import PurePath
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import asyncssh
+
+logger = logging.getLogger(__name__)
+
+LocalPath = Union[PurePath, str, bytes]
+
+# Remote files stat'ed at once
+STAT_BATCH = 128
+
+# Remote files hashed by each sha256sum command
+HASH_BATCH = 100
+
+# Files transferred at once
+TRANSFERS = 4
+
+
+class HashIndex:
+    """Remember the SHA-256 digests of local files.
+
+    A digest is reused for as long as the file's modification time and size
+    are unchanged, so each file of a tree that is synchronised again and
+    again is read only once.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    def digest(self, path: str) -> str:
+        """Return the hex SHA-256 digest of the local file ``path``."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        entry = self._digests.get(path)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            while data := f.read(1024 * 1024):
+                sha256.update(data)
+        self._digests[path] = (key, sha256.hexdigest())
+        return sha256.hexdigest()
+
+    def clear(self) -> None:
+        self._digests.clear()
+
+
+# The process-wide index shared by every synchronisation
+hash_index = HashIndex()
+
+
+def expand_globs(localpaths: Sequence[LocalPath]) -> List[str]:
+    """Expand the glob patterns in ``localpaths``, as Mput does."""
+    paths = []
+    for pattern in localpaths:
+        pattern = os.fsdecode(pattern)
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise asyncssh.SFTPNoSuchFile(f"{pattern}: No matches found")
+        paths.extend(matches)
+    return paths
+
+
+async def plan_copies(
+    sftp: asyncssh.SFTPClient,
+    localpaths: Sequence[LocalPath],
+    remotepath: LocalPath,
+    recurse: bool = False,
+) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """Return the files that put() would copy, and the directories it would create.
+
+    The destination of each local path is chosen as asyncssh does: inside
+    ``remotepath`` if it is an existing directory, otherwise ``remotepath``
+    itself.  Directories are walked if ``recurse`` is set.
+
+    Returns:
+        The (local file, remote file) pairs and the remote directories.
+    """
+    localpaths = [os.fsdecode(path) for path in localpaths]
+    remotepath = os.fsdecode(remotepath)
+    dst_is_dir = await sftp.isdir(remotepath)
+    if len(localpaths) > 1 and not dst_is_dir:
+        raise asyncssh.SFTPFailure(f"{remotepath} must be a directory")
+
+    copies: List[Tuple[str, str]] = []
+    directories: List[str] = []
+    for localpath in localpaths:
+        name = os.path.basename(os.path.normpath(localpath))
+        target = posixpath.join(remotepath, name) if dst_is_dir else remotepath
+        if not os.path.isdir(localpath):
+            if not os.path.exists(localpath):
+                raise asyncssh.SFTPNoSuchFile(f"{localpath}: No such file")
+            copies.append((localpath, target))
+            continue
+        if not recurse:
+            raise asyncssh.SFTPFailure(f"{localpath} is a directory")
+        for root, dirs, files in os.walk(localpath):
+            dirs.sort()
+            relative = os.path.relpath(root, localpath)
+            remote_root = target if relative == "." else posixpath.join(
+                target, *relative.split(os.sep)
+            )
+            directories.append(remote_root)
+            for file in sorted(files):
+                copies.append((os.path.join(root, file), posixpath.join(remote_root, file)))
+    return copies, directories
+
+
+async def _stat(sftp: asyncssh.SFTPClient, path: str) -> Optional[asyncssh.SFTPAttrs]:
+    try:
+        return await sftp.stat(path)
+    except asyncssh.SFTPNoSuchFile:
+        return None
+
+
+async def _stamp(sftp: asyncssh.SFTPClient, remote: str, st: os.stat_result) -> None:
+    # Give the remote file the local file's times, so the next sync finds
+    # it the same by its size and modification time alone
+    try:
+        await sftp.utime(remote, (int(st.st_atime), int(st.st_mtime)))
+    except asyncssh.SFTPNoSuchFile:
+        # Left out by the transfer's error_handler
+        pass
+
+
+async def remote_digests(
+    conn: asyncssh.SSHClientConnection, paths: Sequence[str]
+) -> Dict[str, str]:
+    """Return the SHA-256 digests of remote files, by running sha256sum.
+
+    Files that sha256sum cannot read, and files whose names it escapes, are
+    left out.
+    """
+    digests: Dict[str, str] = {}
+    for i in range(0, len(paths), HASH_BATCH):
+        batch = paths[i : i + HASH_BATCH]
+        result = await conn.run(
+            "sha256sum -- " + " ".join(shlex.quote(path) for path in batch), check=False
+        )
+        for line in str(result.stdout or "").splitlines():
+            if line.startswith("\\"):
+                continue
+            digest, separator, name = line.partition("  ")
+            if separator:
+                digests[name] = digest
+    return digests
+
+
+async def select_changed(
+    sftp: asyncssh.SFTPClient,
+    conn: Optional[asyncssh.SSHClientConnection],
+    copies: Sequence[Tuple[str, str]],
+    checksum: bool = False,
+) -> List[Tuple[str, str]]:
+    """Return the copies whose remote file differs from the local file.
+
+    A remote file is the same as the local file if it has the same size and
+    modification time.  Otherwise, if ``checksum`` is set and the sizes
+    match, the files are the same if their SHA-256 digests match; the remote
+    digests are computed by sha256sum over ``conn``.  The modification time
+    of a remote file found the same by its digest is set to the local
+    file's, so that the next comparison of the file needs no digest.
+    """
+    attrs: List[Optional[asyncssh.SFTPAttrs]] = []
+    for i in range(0, len(copies), STAT_BATCH):
+        attrs.extend(
+            await asyncio.gather(
+                *(_stat(sftp, remote) for _, remote in copies[i : i + STAT_BATCH])
+            )
+        )
+
+    changed: List[Tuple[str, str]] = []
+    to_hash: List[Tuple[str, str, os.stat_result]] = []
+    for (local, remote), remote_attrs in zip(copies, attrs):
+        st = os.stat(local)
+        if remote_attrs is None or remote_attrs.size != st.st_size:
+            changed.append((local, remote))
+        elif remote_attrs.mtime == int(st.st_mtime):
+            continue
+        elif checksum and conn is not None:
+            to_hash.append((local, remote, st))
+        else:
+            changed.append((local, remote))
+
+    if to_hash:
+        digests = await remote_digests(conn, [remote for _, remote, _ in to_hash])
+        for local, remote, st in to_hash:
+            local_digest = await asyncio.to_thread(hash_index.digest, local)
+            if digests.get(remote) != local_digest:
+                changed.append((local, remote))
+            else:
+                await _stamp(sftp, remote, st)
+
+    # Keep the order of the copies
+    order = {copy: i for i, copy in enumerate(copies)}
+    changed.sort(key=order.__getitem__)
+    return changed
+
+
+async def sync_copies(
+    sftp: asyncssh.SFTPClient,
+    conn: Optional[asyncssh.SSHClientConnection],
+    localpaths: Sequence[LocalPath],
+    remotepath: LocalPath,
+    transfer: Callable[[str, str], Awaitable[None]],
+    recurse: bool = False,
+    preserve: bool = False,
+    checksum: bool = False,
+) -> List[str]:
+    """Copy only the local files that differ from their remote copies.
+
+    The files that put() would copy are compared with the remote files by
+    ``select_changed()``, and ``transfer(local, remote)`` is called for each
+    file that differs.  Directories are created unless they hold a file
+    found unchanged, which shows that they exist.  Unless ``preserve`` is
+    set, in which case ``transfer`` keeps them, the local modification
+    times are set on the files transferred, so the next sync skips them.
+
+    Returns:
+        The remote paths of the files transferred.
+    """
+    copies, directories = await plan_copies(sftp, localpaths, remotepath, recurse)
+    changed = await select_changed(sftp, conn, copies, checksum=checksum)
+
+    changed_set = set(changed)
+    existing = {
+        posixpath.dirname(remote) for local, remote in copies if (local, remote) not in changed_set
+    }
+    for directory in directories:
+        if directory not in existing:
+            await sftp.makedirs(directory, exist_ok=True)
+    semaphore = asyncio.Semaphore(TRANSFERS)
+
+    async def copy(local: str, remote: str) -> None:
+        async with semaphore:
+            # Stat'ed first, so a file changed while it is sent is sent again
+            st = os.stat(local)
+            await transfer(local, remote)
+            if not preserve:
+                await _stamp(sftp, remote, st)
+
+    await asyncio.gather(*(copy(local, remote) for local, remote in changed))
+
+    logger.info(
+        "%s: %d of %d files transferred", remotepath, len(changed), len(copies)
+    )
+    return [remote for _, remote in changed]
@@ -0,0 +1,410 @@
+import asyncio
+import json
+import logging
+import os
+import posixpath
+import stat as stat_module
+from pathlib import Path, PurePath
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import asyncssh
+
+from reemote.config import Config
+from reemote.core.autotune import Meter
+from reemote.core.inventory_model import Connection
+from reemote.core.sync import LocalPath, plan_copies
+
+logger = logging.getLogger(__name__)
+
+# The bytes copied at a time
+CHUNK_SIZE = 1024 * 1024
+
+# The bytes copied between saves of a file's offset to the checkpoint
+CHECKPOINT_INTERVAL = 16 * 1024 * 1024
+
+# The bytes before the saved offset compared on both sides before resuming
+VERIFY_SIZE = 64 * 1024
+
+
+class Checkpoint:
+    """The offsets of the files being transferred, saved in a local JSON file.
+
+    Each entry is keyed by the host and the source and destination paths,
+    and holds the number of bytes already copied with the size and
+    modification time the source had when the copy started.  The file is
+    rewritten atomically each time an entry changes, so it always holds a
+    consistent set of offsets if the process dies.
+
+    Args:
+        path: The checkpoint file.
+    """
+
+    def __init__(self, path: Union[str, PurePath]):
+        self.path = Path(path)
+        try:
+            with open(self.path) as f:
+                self._entries: Dict[str, dict] = json.load(f)
+        except FileNotFoundError:
+            self._entries = {}
+        except json.JSONDecodeError:
+            logger.warning("%s: ignoring a corrupt checkpoint file", self.path)
+            self._entries = {}
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._entries.get(key)
+
+    def set(self, key: str, entry: dict) -> None:
+        self._entries[key] = entry
+        self._save()
+
+    def remove(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(temporary, self.path)
+
+
+# The checkpoints open in this process, by path, so that the hosts of a
+# request update one copy of the file rather than overwrite each other's
+_checkpoints: Dict[Path, Checkpoint] = {}
+
+
+def get_checkpoint(path: Optional[LocalPath] = None) -> Checkpoint:
+    """Return the checkpoint saved in ``path``, by default in the data directory."""
+    path = Path(os.fsdecode(path)) if path is not None else Config.data_dir / "checkpoints.json"
+    path = path.absolute()
+    if path not in _checkpoints:
+        _checkpoints[path] = Checkpoint(path)
+    return _checkpoints[path]
+
+
+class LocalFile:
+    """A local file read and written at offsets, like an SFTPClientFile."""
+
+    def __init__(self, fd: int):
+        self._fd = fd
+
+    @classmethod
+    async def open(cls, path: str, mode: str) -> "LocalFile":
+        flags = {"rb": os.O_RDONLY, "r+b": os.O_RDWR, "wb": os.O_WRONLY | os.O_CREAT | os.O_TRUNC}
+        return cls(await asyncio.to_thread(os.open, path, flags[mode], 0o666))
+
+    async def read(self, size: int, offset: int) -> bytes:
+        return await asyncio.to_thread(os.pread, self._fd, size, offset)
+
+    async def write(self, data: bytes, offset: int) -> None:
+        view = memoryview(data)
+        while view:
+            written = await asyncio.to_thread(os.pwrite, self._fd, view, offset)
+            view = view[written:]
+            offset += written
+
+    async def truncate(self, size: int) -> None:
+        await asyncio.to_thread(os.ftruncate, self._fd, size)
+
+    async def close(self) -> None:
+        os.close(self._fd)
+
+
+async def _stat_local(path: str) -> Tuple[int, int]:
+    st = await asyncio.to_thread(os.stat, path)
+    return st.st_size, st.st_mtime_ns
+
+
+async def _stat_remote(sftp: asyncssh.SFTPClient, path: str) -> Tuple[int, int]:
+    attrs = await sftp.stat(path)
+    mtime = attrs.mtime_ns if attrs.mtime_ns is not None else (attrs.mtime or 0) * 10**9
+    return attrs.size or 0, mtime
+
+
+async def _size_local(path: str) -> Optional[int]:
+    try:
+        return (await _stat_local(path))[0]
+    except FileNotFoundError:
+        return None
+
+
+async def _size_remote(sftp: asyncssh.SFTPClient, path: str) -> Optional[int]:
+    try:
+        return (await _stat_remote(sftp, path))[0]
+    except asyncssh.SFTPNoSuchFile:
+        return None
+
+
+async def _read_exactly(f, size: int, offset: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        block = await f.read(size - len(data), offset + len(data))
+        if not block:
+            break
+        data += block
+    return data
+
+
+async def _prefix_matches(src, dst, offset: int) -> bool:
+    """Whether the ``VERIFY_SIZE`` bytes before ``offset`` are the same on both sides."""
+    start = max(0, offset - VERIFY_SIZE)
+    source, destination = await asyncio.gather(
+        _read_exactly(src, offset - start, start), _read_exactly(dst, offset - start, start)
+    )
+    return len(source) == offset - start and source == destination
+
+
+async def _resume(
+    key: str,
+    checkpoint: Checkpoint,
+    identity: Tuple[int, int],
+    src,
+    open_dst: Callable,
+    dst_size: Optional[int],
+    srcpath: str,
+    dstpath: str,
+    progress_handler: Optional[Callable] = None,
+    meter: Optional[Meter] = None,
+) -> int:
+    """Copy ``src`` to the destination from the offset saved for ``key``.
+
+    The saved offset is used if the source has the size and modification
+    time it had when the copy started, the destination holds at least that
+    many bytes, and the last bytes before the offset match.  Otherwise the
+    copy starts again.  The offset is saved every ``CHECKPOINT_INTERVAL``
+    bytes, and when the copy fails, and the entry is removed once the copy
+    is complete.  With a ``meter``, the chunks are the size it tunes for the
+    host.
+
+    Returns:
+        The bytes copied.
+    """
+    size, _ = identity
+    entry = checkpoint.get(key)
+    offset = 0
+    if entry is not None and tuple(entry["source"]) == identity and dst_size is not None:
+        offset = min(entry["offset"], dst_size)
+
+    dst = await open_dst("r+b" if offset else "wb")
+    try:
+        if offset and not await _prefix_matches(src, dst, offset):
+            logger.info("%s: copied bytes differ, copying again", dstpath)
+            offset = 0
+        if offset:
+            logger.info("%s: resuming at %d of %d bytes", dstpath, offset, size)
+        await dst.truncate(offset)
+
+        start = saved = offset
+        chunk_size = CHUNK_SIZE if meter is None else meter.chunk_size
+        pending = asyncio.ensure_future(src.read(chunk_size, offset))
+        try:
+            while True:
+                data = await pending
+                if not data:
+                    break
+                # Read the next chunk while this one is written
+                if meter is not None:
+                    chunk_size = meter.chunk_size
+                pending = asyncio.ensure_future(src.read(chunk_size, offset + len(data)))
+                await dst.write(data, offset)
+                offset += len(data)
+                if meter is not None:
+                    meter.add(len(data))
+                if progress_handler is not None:
+                    progress_handler(srcpath, dstpath, offset, size)
+                if offset - saved >= CHECKPOINT_INTERVAL:
+                    checkpoint.set(key, {"source": list(identity), "offset": offset})
+                    saved = offset
+        except BaseException:
+            pending.cancel()
+            if offset > saved:
+                checkpoint.set(key, {"source": list(identity), "offset": offset})
+            raise
+    finally:
+        await dst.close()
+    checkpoint.remove(key)
+    return offset - start
+
+
+def _key(connection: Connection, direction: str, srcpath: str, dstpath: str) -> str:
+    return f"{connection.host}:{getattr(connection, 'port', None) or 22} {direction} {srcpath} {dstpath}"
+
+
+async def resume_get_file(
+    sftp: asyncssh.SFTPClient,
+    connection: Connection,
+    checkpoint: Checkpoint,
+    remotepath: str,
+    localpath: str,
+    preserve: bool = False,
+    block_size: int = -1,
+    max_requests: int = -1,
+    progress_handler: Optional[Callable] = None,
+    meter: Optional[Meter] = None,
+) -> int:
+    """Download a remote file, resuming a download that stopped part way."""
+    identity = await _stat_remote(sftp, remotepath)
+    async with sftp.open(
+        remotepath, "rb", block_size=block_size, max_requests=max_requests
+    ) as src:
+        copied = await _resume(
+            _key(connection, "get", remotepath, os.path.abspath(localpath)),
+            checkpoint,
+            identity,
+            src,
+            lambda mode: LocalFile.open(localpath, mode),
+            await _size_local(localpath),
+            remotepath,
+            localpath,
+            progress_handler,
+            meter,
+        )
+    if preserve:
+        attrs = await sftp.stat(remotepath)
+        os.utime(localpath, (attrs.atime or attrs.mtime, attrs.mtime))
+        if attrs.permissions is not None:
+            os.chmod(localpath, stat_module.S_IMODE(attrs.permissions))
+    return copied
+
+
+async def resume_put_file(
+    sftp: asyncssh.SFTPClient,
+    connection: Connection,
+    checkpoint: Checkpoint,
+    localpath: str,
+    remotepath: str,
+    preserve: bool = False,
+    block_size: int = -1,
+    max_requests: int = -1,
+    progress_handler: Optional[Callable] = None,
+    meter: Optional[Meter] = None,
+) -> int:
+    """Upload a local file, resuming an upload that stopped part way."""
+    identity = await _stat_local(localpath)
+    src = await LocalFile.open(localpath, "rb")
+    try:
+        copied = await _resume(
+            _key(connection, "put", os.path.abspath(localpath), remotepath),
+            checkpoint,
+            identity,
+            src,
+            lambda mode: sftp.open(
+                remotepath, mode, block_size=block_size, max_requests=max_requests
+            ),
+            await _size_remote(sftp, remotepath),
+            localpath,
+            remotepath,
+            progress_handler,
+            meter,
+        )
+    finally:
+        await src.close()
+    if preserve:
+        st = os.stat(localpath)
+        await sftp.setstat(
+            remotepath,
+            asyncssh.SFTPAttrs(
+                permissions=stat_module.S_IMODE(st.st_mode),
+                atime=int(st.st_atime),
+                mtime=int(st.st_mtime),
+            ),
+        )
+    return copied
+
+
+async def plan_downloads(
+    sftp: asyncssh.SFTPClient,
+    remotepaths: Sequence[LocalPath],
+    localpath: LocalPath,
+    recurse: bool = False,
+) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """Return the files that get() would copy, and the local directories it would create.
+
+    The counterpart of ``plan_copies()`` for downloads: the destination of
+    each remote path is inside ``localpath`` if it is an existing directory,
+    otherwise ``localpath`` itself.
+
+    Returns:
+        The (remote file, local file) pairs and the local directories.
+    """
+    remotepaths = [os.fsdecode(path) for path in remotepaths]
+    localpath = os.fsdecode(localpath)
+    dst_is_dir = os.path.isdir(localpath)
+    if len(remotepaths) > 1 and not dst_is_dir:
+        raise asyncssh.SFTPFailure(f"{localpath} must be a directory")
+
+    copies: List[Tuple[str, str]] = []
+    directories: List[str] = []
+    for remotepath in remotepaths:
+        name = posixpath.basename(posixpath.normpath(remotepath))
+        target = os.path.join(localpath, name) if dst_is_dir else localpath
+        if not await sftp.isdir(remotepath):
+            copies.append((remotepath, target))
+            continue
+        if not recurse:
+            raise asyncssh.SFTPFailure(f"{remotepath} is a directory")
+        pending = [(remotepath, target)]
+        while pending:
+            remote_root, local_root = pending.pop(0)
+            directories.append(local_root)
+            entries = sorted(
+                [entry async for entry in sftp.scandir(remote_root)],
+                key=lambda entry: entry.filename,
+            )
+            for entry in entries:
+                if entry.filename in (".", ".."):
+                    continue
+                remote = posixpath.join(remote_root, entry.filename)
+                local = os.path.join(local_root, entry.filename)
+                if entry.attrs.type == asyncssh.FILEXFER_TYPE_DIRECTORY:
+                    pending.append((remote, local))
+                else:
+                    copies.append((remote, local))
+    return copies, directories
+
+
+async def resume_get_paths(
+    sftp: asyncssh.SFTPClient,
+    connection: Connection,
+    checkpoint: Checkpoint,
+    remotepaths: Sequence[LocalPath],
+    localpath: LocalPath,
+    recurse: bool = False,
+    **kwargs,
+) -> int:
+    """Download remote files and directories, resuming each file where it stopped.
+
+    Returns:
+        The bytes copied.
+    """
+    copies, directories = await plan_downloads(sftp, remotepaths, localpath, recurse)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+    copied = 0
+    for remote, local in copies:
+        copied += await resume_get_file(sftp, connection, checkpoint, remote, local, **kwargs)
+    return copied
+
+
+async def resume_put_paths(
+    sftp: asyncssh.SFTPClient,
+    connection: Connection,
+    checkpoint: Checkpoint,
+    localpaths: Sequence[LocalPath],
+    remotepath: LocalPath,
+    recurse: bool = False,
+    **kwargs,
+) -> int:
+    """Upload local files and directories, resuming each file where it stopped.
+
+    Returns:
+        The bytes copied.
+    """
+    copies, directories = await plan_copies(sftp, localpaths, remotepath, recurse)
+    for directory in directories:
+        await sftp.makedirs(directory, exist_ok=True)
+    copied = 0
+    for local, remote in copies:
+        copied += await resume_put_file(sftp, connection, checkpoint, local, remote, **kwargs)
+    return copied
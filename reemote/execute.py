@@ -6,18 +6,37 @@ import asyncssh
 import asyncio
 import inspect
 from asyncssh import SSHCompletedProcess
-from reemote.context import Context, ConnectionType
-from typing import Any, AsyncGenerator, List, Tuple, Dict, Callable
+from reemote.context import Context, ConnectionType, ExecutionContext
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 # from reemote.core.response import Response  # Removed to avoid circularity if any
 from reemote.config import Config
 from reemote.core.response import ssh_completed_process_to_dict
-from reemote.core.inventory_model import Inventory
+from reemote.core.inventory_model import Inventory, InventoryItem
+from reemote.core.compression import ssh_connection
+from reemote.core.connection_pool import connection_pool
+from reemote.core.facts import fact_cache
+from reemote.core.relay import relays
+from reemote.core.scheduler import Scheduler
+from reemote.core.log import configure_logging, host_context, payload, run_context
 
+logger = logging.getLogger(__name__)
 
-async def pass_through_command(context: Context) -> dict[str, str | None | Any] | None:
-    if not context.group or "all" in context.group or context.group in context.inventory_item.groups:
-        logging.info(f"{context.call}")
+
+async def pass_through_command(context: ExecutionContext) -> dict[str, str | None | Any] | None:
+    if context.inventory_item.in_group(context.group):
+        logger.info("%s", context.call)
         try:
             result = {
                 "host": context.inventory_item.connection.host,
@@ -26,17 +45,17 @@ async def pass_through_command(context: Context) -> dict[str, str | None | Any]
                 "error": context.error,
             }
 
-            logging.info(f"{result}")
+            logger.info("%s", payload(result))
             return result
         except Exception as e:
-            logging.error(f"{e} {context}", exc_info=True)
+            logger.error("%s %s", e, payload(context), exc_info=True)
             raise
     return None
 
 
-async def run_command_on_local(context: Context) -> dict[str, str | None | Any] | None:
-    if not context.group or "all" in context.group or context.group in context.inventory_item.groups:
-        logging.info(f"{context.call}")
+async def run_command_on_local(context: ExecutionContext) -> dict[str, str | None | Any] | None:
+    if context.inventory_item.in_group(context.group):
+        logger.info("%s", context.call)
         try:
             result = {
                 "host": context.inventory_item.connection.host,
@@ -44,30 +63,32 @@ async def run_command_on_local(context: Context) -> dict[str, str | None | Any]
                 "changed": context.changed,
                 "error": context.error,
             }
-            logging.info(f"{result}")
+            logger.info("%s", payload(result))
             return result
         except Exception as e:
-            logging.error(f"{e} {context}", exc_info=True)
+            logger.error("%s %s", e, payload(context), exc_info=True)
             raise
     return None
 
 
+def _sudo_command(context: ExecutionContext) -> str:
+    if context.inventory_item.authentication.sudo_password is None:
+        return f"sudo {context.command}"
+    return f"echo {context.inventory_item.authentication.sudo_password} | sudo -S {context.command}"
+
+
 async def run_command_on_host(
-    context: Context,
+    context: ExecutionContext,
 ) -> dict[str, str | None | bool | Any] | None:
     cp = SSHCompletedProcess()
-    if not context.group or "all" in context.group or context.group in context.inventory_item.groups:
-        logging.info(f"{context.call}")
+    if context.inventory_item.in_group(context.group):
+        logger.info("%s", context.call)
         try:
-            conn = await asyncssh.connect(
-                **context.inventory_item.connection.to_json_serializable()
-            )
-            async with conn as conn:
+            async with connection_pool.connection(
+                ssh_connection(context.inventory_item.connection, context.ssh_compression)
+            ) as conn:
                 if context.sudo:
-                    if context.inventory_item.authentication.sudo_password is None:
-                        full_command = f"sudo {context.command}"
-                    else:
-                        full_command = f"echo {context.inventory_item.authentication.sudo_password} | sudo -S {context.command}"
+                    full_command = _sudo_command(context)
                     cp = await conn.run(
                         full_command,
                         check=False,
@@ -118,7 +139,7 @@ async def run_command_on_host(
                         check=False,
                     )
         except (asyncssh.ProcessError, OSError, asyncssh.Error) as e:
-            logging.error(f"{e} {context}", exc_info=True)
+            logger.error("%s %s", e, payload(context), exc_info=True)
             raise
         result = {
             "host": context.inventory_item.connection.host,
@@ -126,11 +147,75 @@ async def run_command_on_host(
             "changed": context.changed,
             "error": context.error,
         }
-        logging.info(f"{result}")
+        logger.info("%s", payload(result))
         return result
     return None
 
 
+async def run_commands_on_host(
+    contexts: List[ExecutionContext],
+) -> List[dict[str, str | None | bool | Any] | None]:
+    """Run REMOTE Contexts for one host, in order, over its shell channel.
+
+    The commands are written to the pooled shell channel together and their
+    results read back in order, saving a channel open and a round trip per
+    command.  Contexts that use su need to answer a password prompt, so they
+    run on their own channel, in their place in the sequence.  Commands that
+    ask for SSH compression run over the compressed connection, so a change
+    of ``ssh_compression`` also starts a new batch.
+
+    Returns:
+        The response of each Context, or None for a Context whose group does
+        not include the host.
+    """
+    results: List[dict[str, str | None | bool | Any] | None] = [None] * len(contexts)
+    batch: List[Tuple[int, ExecutionContext]] = []
+
+    async def run_batch():
+        if not batch:
+            return
+        inventory_item = batch[0][1].inventory_item
+        compress = batch[0][1].ssh_compression
+        commands = [
+            _sudo_command(context) if context.sudo else context.command
+            for _, context in batch
+        ]
+        try:
+            async with connection_pool.shell_channel(
+                ssh_connection(inventory_item.connection, compress),
+                inventory_item.session.to_json_serializable(),
+            ) as shell:
+                cps = await shell.run(commands)
+        except (asyncio.IncompleteReadError, OSError, asyncssh.Error) as e:
+            logger.error("%s %s", e, payload([context for _, context in batch]), exc_info=True)
+            raise
+        for (i, context), cp in zip(batch, cps):
+            results[i] = {
+                "host": inventory_item.connection.host,
+                "value": ssh_completed_process_to_dict(cp),
+                "changed": context.changed,
+                "error": context.error,
+            }
+            logger.info("%s", payload(results[i]))
+            if context.changed:
+                fact_cache.invalidate(inventory_item.connection.host)
+        batch.clear()
+
+    for i, context in enumerate(contexts):
+        if not context.inventory_item.in_group(context.group):
+            continue
+        if context.su:
+            await run_batch()
+            results[i] = await run_command_on_host(context)
+        else:
+            if batch and batch[0][1].ssh_compression != context.ssh_compression:
+                await run_batch()
+            logger.info("%s", context.call)
+            batch.append((i, context))
+    await run_batch()
+    return results
+
+
 async def pre_order_generator_async(
     node: object,
 ) -> AsyncGenerator[Context | Any, Any | None]:
@@ -214,15 +299,50 @@ async def pre_order_generator_async(
                 stack[-1] = (stack[-1][0], stack[-1][1], return_value)
 
         except Exception as e:
-            logging.error(f"{e}", exc_info=True)
+            logger.error("%s", e, exc_info=True)
             raise
 
 
+async def dispatch_context(context: ExecutionContext) -> dict[str, str | None | Any] | None:
+    """Run a Context, answering it from the fact cache if it names a fresh fact."""
+    host = context.inventory_item.connection.host
+    fact = context.fact if context.inventory_item.in_group(context.group) else None
+    if fact:
+        result = fact_cache.get(host, fact)
+        if result is not None:
+            logger.info("%s (cached)", context.call)
+            return result
+
+    if context.type == ConnectionType.LOCAL:
+        result = await run_command_on_local(context)
+    elif context.type == ConnectionType.REMOTE:
+        result = await run_command_on_host(context)
+    elif context.type == ConnectionType.PASSTHROUGH:
+        result = await pass_through_command(context)
+    else:
+        raise ValueError(f"Unsupported connection type: {context.type}")
+
+    if result is not None:
+        if result["changed"]:
+            # The host changed, so what is known about it may be stale
+            fact_cache.invalidate(host)
+        elif fact and not result["error"]:
+            fact_cache.set(host, fact, result)
+    return result
+
+
 async def process_host(
-    inventory_item: Tuple[Dict[str, Any], Dict[str, Any]],
+    inventory_item: InventoryItem,
     obj_factory: Callable[[], Any],
-) -> List[Any]:
-    responses: List[Any] = []
+    on_result: Optional[Callable[[Any], Awaitable[None]]] = None,
+) -> Any:
+    """Run an operation tree on one host.
+
+    Returns:
+        The response of the last Context that ran on the host, or None if no
+        Context ran (for example, because the host is not in the group).
+    """
+    final_response: Any = None
 
     # Create a new instance for this host using the factory
     host_instance = obj_factory()
@@ -234,22 +354,17 @@ async def process_host(
         context = await gen.__anext__()
     except StopAsyncIteration:
         # Generator completed immediately (no context to execute)
-        return responses
+        return final_response
 
     while True:
         try:
             if isinstance(context, Context):
-                context.inventory_item = inventory_item
-                if context.type == ConnectionType.LOCAL:
-                    result = await run_command_on_local(context)
-                elif context.type == ConnectionType.REMOTE:
-                    result = await run_command_on_host(context)
-                elif context.type == ConnectionType.PASSTHROUGH:
-                    result = await pass_through_command(context)
-                else:
-                    raise ValueError(f"Unsupported connection type: {context.type}")
+                result = await dispatch_context(ExecutionContext(context, inventory_item))
 
-                responses.append(result)
+                if result is not None:
+                    final_response = result
+                    if on_result is not None:
+                        await on_result(result)
 
                 # Send result back and get next command
                 context = await gen.asend(result)
@@ -263,74 +378,262 @@ async def process_host(
             # Async generator is done
             break
 
-    return responses
+    return final_response
+
+
+async def process_operations(
+    inventory_item: InventoryItem,
+    operations: List[Any],
+    limit: Optional[int] = None,
+) -> List[Any]:
+    """Run several operation trees on one host concurrently.
+
+    At most ``limit`` trees run at once.  If a tree raises, the others are
+    cancelled, and the exception is raised once they have stopped.
+
+    Returns:
+        The final response of each tree, in the order of ``operations``.
+    """
+    semaphore = asyncio.Semaphore(limit) if limit else None
+
+    async def process_operation(operation):
+        if semaphore is None:
+            return await process_host(inventory_item, lambda: operation)
+        async with semaphore:
+            return await process_host(inventory_item, lambda: operation)
+
+    tasks = [asyncio.create_task(process_operation(operation)) for operation in operations]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # Let the cancelled trees return their leases before the caller goes on
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def _inventory_model(inventory: Union[Inventory, Dict[str, Any], None]) -> Inventory:
+    """Return ``inventory`` as a validated Inventory.
+
+    Passing a validated Inventory lets every Context share its items instead
+    of validating a new InventoryItem for each command.
+    """
+    if isinstance(inventory, Inventory):
+        return inventory
+    return Inventory.model_validate(inventory or {"hosts": []})
 
 
 async def process_inventory(
-    inventory: dict,
+    inventory: Union[Inventory, Dict[str, Any]],
     root_obj_factory: Callable[[], Any],
+    forks: Optional[int] = None,
+    serial: Union[int, str, None] = None,
+    group_limits: Optional[Dict[str, int]] = None,
+    group: Optional[str] = None,
 ) -> List[Any]:
-    if not inventory:
+    # Only hosts in the group run the operation, so schedule no others
+    hosts = _inventory_model(inventory).hosts_in_group(group)
+    if not hosts:
         return []
 
-    tasks = []
+    scheduler = Scheduler(forks=forks, serial=serial, group_limits=group_limits)
 
-    for item in inventory["hosts"]:
-        task = asyncio.create_task(process_host(item, root_obj_factory))
-        tasks.append(task)
+    async def process_scheduled_host(item):
+        with host_context(item.connection.host):
+            async with scheduler.slot(item.groups):
+                return await process_host(item, root_obj_factory)
 
-    # Wait for all hosts to complete
-    all_responses: List[Any] = await asyncio.gather(*tasks)
+    # The last response for each host, in inventory order
+    responses: Dict[str, Any] = {}
 
-    # Recursively flatten the nested lists and filter out None objects
-    def recursive_flatten_and_filter(data):
-        if isinstance(data, list):  # If it's a list, recurse into its elements
-            for item in data:
-                yield from recursive_flatten_and_filter(item)
-        elif data is not None:  # If it's not None, yield it
-            yield data
+    with run_context() as run:
+        try:
+            for batch in scheduler.batches(hosts):
+                tasks = [
+                    asyncio.create_task(process_scheduled_host(item)) for item in batch
+                ]
+                # Wait for all hosts in the batch to complete before starting the next
+                for response in await asyncio.gather(*tasks):
+                    if response is not None:
+                        responses[response["host"]] = response
+        finally:
+            relays.end_run(run)
+
+    return list(responses.values())
 
-    # Flatten and filter the responses
-    flattened_responses = list(recursive_flatten_and_filter(all_responses))
 
-    # Extract the last item for each host
-    unique_hosts = set(item["host"] for item in flattened_responses)  # Get unique hosts
-    response = [
-        next(item for item in reversed(flattened_responses) if item["host"] == host)
-        for host in unique_hosts
-    ]
+class _HostFailure:
+    """Carries an exception from a host task to the stream consumer."""
 
-    return response
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+async def stream_inventory(
+    inventory: Union[Inventory, Dict[str, Any]],
+    root_obj_factory: Callable[[], Any],
+    forks: Optional[int] = None,
+    serial: Union[int, str, None] = None,
+    group_limits: Optional[Dict[str, int]] = None,
+    group: Optional[str] = None,
+    intermediate: bool = False,
+    max_pending: int = 128,
+) -> AsyncIterator[Any]:
+    """Yield responses as soon as each host produces them.
+
+    By default the final response of each host is yielded when that host
+    finishes, in completion order.  With ``intermediate`` the response of
+    every Context is yielded as it completes, so the last response yielded
+    for a host is its final response.  At most ``max_pending`` responses are
+    buffered; hosts wait for the consumer when the buffer is full.  Only hosts
+    in ``group`` are processed.
+    """
+    hosts = _inventory_model(inventory).hosts_in_group(group)
+    if not hosts:
+        return
+
+    scheduler = Scheduler(forks=forks, serial=serial, group_limits=group_limits)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+    finished = object()
+
+    async def process_streamed_host(item):
+        async def on_result(result):
+            if intermediate:
+                await queue.put(result)
+
+        with host_context(item.connection.host):
+            async with scheduler.slot(item.groups):
+                response = await process_host(item, root_obj_factory, on_result)
+        if not intermediate and response is not None:
+            await queue.put(response)
+
+    async def produce():
+        try:
+            with run_context() as run:
+                try:
+                    for batch in scheduler.batches(hosts):
+                        tasks = [
+                            asyncio.create_task(process_streamed_host(item))
+                            for item in batch
+                        ]
+                        try:
+                            await asyncio.gather(*tasks)
+                        except BaseException:
+                            for task in tasks:
+                                task.cancel()
+                            raise
+                finally:
+                    relays.end_run(run)
+        except Exception as e:
+            await queue.put(_HostFailure(e))
+        await queue.put(finished)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            if isinstance(item, _HostFailure):
+                raise item.exception
+            yield item
+    finally:
+        # Stop the remaining hosts if the consumer stops early
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
 
 
 async def execute(
     root_obj_factory: Callable[[], Any],
     inventory: Inventory,
+    forks: Optional[int] = None,
+    serial: Union[int, str, None] = None,
+    group_limits: Optional[Dict[str, int]] = None,
+    group: Optional[str] = None,
 ) -> List[Any]:
-    return await process_inventory(inventory.to_json_serializable(), root_obj_factory)
+    return await process_inventory(
+        inventory,
+        root_obj_factory,
+        forks=forks,
+        serial=serial,
+        group_limits=group_limits,
+        group=group,
+    )
 
 
-async def endpoint_execute(
+async def execute_stream(
     root_obj_factory: Callable[[], Any],
-) -> List[Any]:
+    inventory: Inventory,
+    forks: Optional[int] = None,
+    serial: Union[int, str, None] = None,
+    group_limits: Optional[Dict[str, int]] = None,
+    group: Optional[str] = None,
+    intermediate: bool = False,
+) -> AsyncIterator[Any]:
+    """Like execute(), but yield each host's responses as they become available."""
+    async for response in stream_inventory(
+        inventory,
+        root_obj_factory,
+        forks=forks,
+        serial=serial,
+        group_limits=group_limits,
+        group=group,
+        intermediate=intermediate,
+    ):
+        yield response
+
+
+def _endpoint_config() -> Config:
     config = Config()
 
-    # Inline the reemote_logging logic here
-    filepath = config.get_logging()
+    # Log to the configured file, through a background thread.  Logging is
+    # only set up again if the file changes.
+    configure_logging(config.get_logging())
+
+    return config
 
-    # Configure logging
-    logging.basicConfig(
-        level=logging.DEBUG,
-        filename=filepath,
-        filemode="w",  # Overwrite the file each time
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    )
 
-    # Create a named logger "reemote"
-    logger = logging.getLogger("reemote")
-    logger.setLevel(logging.DEBUG)  # Set desired log level for your logger
+def endpoint_hosts(group: Optional[str] = None) -> List[InventoryItem]:
+    """Return the configured hosts in ``group``, for endpoints that do not run operations."""
+    return _endpoint_config().get_inventory_model().hosts_in_group(group)
 
-    # Suppress asyncssh logs by setting its log level to WARNING or higher
-    # logging.getLogger("asyncssh").setLevel(logging.WARNING)
 
-    return await process_inventory(config.get_inventory(), root_obj_factory)
+async def endpoint_execute(
+    root_obj_factory: Callable[[], Any],
+    forks: Optional[int] = None,
+    serial: Union[int, str, None] = None,
+    group_limits: Optional[Dict[str, int]] = None,
+    group: Optional[str] = None,
+) -> List[Any]:
+    config = _endpoint_config()
+    return await process_inventory(
+        config.get_inventory_model(),
+        root_obj_factory,
+        forks=forks,
+        serial=serial,
+        group_limits=group_limits,
+        group=group,
+    )
+
+
+async def endpoint_execute_stream(
+    root_obj_factory: Callable[[], Any],
+    forks: Optional[int] = None,
+    serial: Union[int, str, None] = None,
+    group_limits: Optional[Dict[str, int]] = None,
+    group: Optional[str] = None,
+    intermediate: bool = False,
+) -> AsyncIterator[Any]:
+    """Like endpoint_execute(), but yield each host's responses as they become available."""
+    config = _endpoint_config()
+    async for response in stream_inventory(
+        config.get_inventory_model(),
+        root_obj_factory,
+        forks=forks,
+        serial=serial,
+        group_limits=group_limits,
+        group=group,
+        intermediate=intermediate,
+    ):
+        yield response
@@ -1,17 +1,19 @@
-from typing import AsyncGenerator, List
+from typing import Any, AsyncGenerator, List
 
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel, Field
 
-from reemote.context import Context
+from reemote.context import Context, ConnectionType, ExecutionContext
 from reemote.core.remote import RemoteModel, remotemodel
 from reemote.core.remote import Remote
+from reemote.core.model_cache import validate_model
 from reemote.core.response import (
     Response,
     ShellResponseModel,
 )
 from reemote.core.router_handler import router_handler
-from reemote.system import Callback
+from reemote.execute import run_commands_on_host
+from reemote.system import Callback, Return
 from reemote.core.local import LocalModel, localmodel
 
 
@@ -26,7 +28,7 @@ class Shell(Remote):
     Model = ShellRequestModel
 
     async def execute(self) -> AsyncGenerator[Context, Response]:
-        model_instance = self.Model.model_validate(self.kwargs)
+        model_instance = validate_model(self.Model, self.kwargs)
         yield Context(
             command=model_instance.cmd,
             call=self.__class__.child + "(" + str(model_instance) + ")",
@@ -43,14 +45,97 @@ async def shell(
     return await router_handler(ShellRequestModel, Shell)(cmd=cmd, common=common)
 
 
+class PipelineRequestModel(RemoteModel):
+    operations: List[Any] = Field(
+        ..., description="The operations to run, such as Shell operations."
+    )
+
+
+class Pipeline(Remote):
+    """Run independent remote commands as one batch over a persistent shell.
+
+    The first command of each operation is written to the host's shell
+    channel together with the others, and the results are read back in
+    order, so the batch costs one round trip instead of one per command.
+    The operations must not depend on each other's results.  Any later
+    steps of an operation, and operations whose first step is not a remote
+    command, run one at a time after the batch, in order.
+
+    The response's value is the list of the operations' final responses.
+    """
+
+    Model = PipelineRequestModel
+
+    async def execute(self) -> AsyncGenerator[Context, Response]:
+        model_instance = validate_model(self.Model, self.kwargs)
+
+        # Start each operation and take its first step
+        pending = []
+        for operation in model_instance.operations:
+            generator = operation.execute()
+            try:
+                pending.append((generator, await generator.__anext__()))
+            except StopAsyncIteration:
+                pass
+        batch = [
+            step
+            for _, step in pending
+            if isinstance(step, Context) and step.type == ConnectionType.REMOTE
+        ]
+
+        async def run_batch(context: ExecutionContext):
+            return await run_commands_on_host(
+                [ExecutionContext(step, context.inventory_item) for step in batch]
+            )
+
+        r = yield Context(
+            type=ConnectionType.LOCAL,
+            callback=run_batch,
+            call=self.__class__.child + "(" + str(model_instance) + ")",
+            caller=model_instance,
+            changed=False,
+            group=model_instance.group,
+        )
+        if r is None:
+            # The host is not in the group
+            for generator, _ in pending:
+                await generator.aclose()
+            return
+
+        batch_responses = dict(zip(map(id, batch), r["value"]))
+        responses = []
+        for generator, step in pending:
+            if id(step) in batch_responses:
+                response = batch_responses[id(step)]
+                try:
+                    step = await generator.asend(response)
+                except StopAsyncIteration:
+                    responses.append(response)
+                    continue
+            # Run the remaining steps of the operation one at a time
+            while True:
+                response = yield step
+                try:
+                    step = await generator.asend(response)
+                except StopAsyncIteration:
+                    break
+            responses.append(response)
+
+        yield Return(
+            value=responses,
+            changed=any(response and response["changed"] for response in responses),
+            group=model_instance.group,
+        )
+
+
 
 
 class ContextGetResponse(BaseModel):
     error: bool
     value: Context
 
-async def context_get_callback(context: Context):
-    return context
+async def context_get_callback(context: ExecutionContext):
+    return context.to_context()
 
 class Getcontext(Remote):
     Model = LocalModel
@@ -5,7 +5,7 @@ from reemote.config import Config
 from reemote.core.inventory_model import InventoryItem, Inventory
 from reemote.core.remote import Remote
 from reemote.system import Callback
-from reemote.context import Context
+from reemote.context import ExecutionContext
 from reemote.core.router_handler import router_handler
 from reemote.core.local import LocalModel, localmodel
 
@@ -175,7 +175,7 @@ class InventoryGetResponse(BaseModel):
     error: bool
     value: Inventory
 
-async def inventory_get_callback(context: Context):
+async def inventory_get_callback(context: ExecutionContext):
     return Config().get_inventory()
 
 class Getinventory(Remote):
@@ -0,0 +1,107 @@
+from typing import Any, List
+
+from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from reemote.core.jobs import JobInfo, job_manager
+from reemote.core.response import StreamFormat
+from reemote.core.router_handler import _streaming_response
+
+router = APIRouter()
+
+
+class JobResults(BaseModel):
+    job: JobInfo = Field(..., description="The job")
+    responses: List[Any] = Field(
+        default_factory=list, description="The responses saved from the offset on"
+    )
+    next: int = Field(..., description="The offset to poll the next responses from")
+
+
+def _not_found(job_id: str) -> HTTPException:
+    return HTTPException(status_code=404, detail=f"No job {job_id}")
+
+
+@router.get("/", tags=["Job Management"], response_model=List[JobInfo])
+async def list_jobs() -> List[JobInfo]:
+    """# List the jobs
+
+    Any endpoint called with `background=true` starts a job.
+    """
+    return job_manager.list()
+
+
+@router.get("/{job_id}", tags=["Job Management"], response_model=JobResults)
+async def get_job(
+    job_id: str = Path(..., description="The id returned when the job was submitted"),
+    offset: int = Query(
+        0, ge=0, description="The number of responses already read, to read only newer ones"
+    ),
+) -> JobResults:
+    """# Poll a job
+
+    Returns the state of the job and the responses its hosts have saved.
+    Pass the `next` of one poll as the `offset` of the next to read only
+    the responses saved since.
+    """
+    info = job_manager.get(job_id)
+    if info is None:
+        raise _not_found(job_id)
+    responses, next_offset = job_manager.results(job_id, offset)
+    return JobResults(job=info, responses=responses, next=next_offset)
+
+
+@router.get(
+    "/{job_id}/stream",
+    tags=["Job Management"],
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}, "text/event-stream": {}},
+            "description": "The job's responses, as they are saved, until the job ends",
+        }
+    },
+)
+async def stream_job(
+    job_id: str = Path(..., description="The id returned when the job was submitted"),
+    format: StreamFormat = Query(
+        StreamFormat.NDJSON, description="Stream the responses as 'ndjson' or 'sse'"
+    ),
+) -> StreamingResponse:
+    """# Stream a job's responses
+
+    Sends the responses saved so far, then each new response as it is
+    saved, and ends when the job ends.
+    """
+    if job_manager.get(job_id) is None:
+        raise _not_found(job_id)
+    return _streaming_response(format, job_manager.follow(job_id))
+
+
+@router.post("/{job_id}/cancel", tags=["Job Management"], response_model=JobInfo)
+async def cancel_job(
+    job_id: str = Path(..., description="The id returned when the job was submitted"),
+) -> JobInfo:
+    """# Cancel a job
+
+    The hosts still running stop; the responses already saved are kept.
+    """
+    info = await job_manager.cancel(job_id)
+    if info is None:
+        raise _not_found(job_id)
+    return info
+
+
+@router.delete("/{job_id}", tags=["Job Management"], response_model=JobInfo)
+async def delete_job(
+    job_id: str = Path(..., description="The id returned when the job was submitted"),
+) -> JobInfo:
+    """# Delete a job
+
+    Cancels the job if it is running, and deletes its saved responses.
+    """
+    info = await job_manager.delete(job_id)
+    if info is None:
+        raise _not_found(job_id)
+    return info
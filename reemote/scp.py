@@ -1,5 +1,9 @@
 import logging
-from typing import Callable, List, Optional
+import os
+import posixpath
+import shlex
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional
 
 import asyncssh
 from fastapi import APIRouter, Depends, Query
@@ -9,7 +13,14 @@ from reemote.core.router_handler import router_handler
 from reemote.core.local import LocalModel, localmodel
 from reemote.core.local import Local
 from reemote.core.response import ResponseModel
-from reemote.context import Context
+from reemote.context import ExecutionContext
+from reemote.core.autotune import link_tuner
+from reemote.core.connection_pool import connection_pool
+from reemote.core.facts import fact_cache
+from reemote.core.relay import Seed, relays
+from reemote.core.sync import sync_copies
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -25,27 +36,103 @@ class ScpModel(LocalModel):
     block_size: int = 16384
     progress_handler: Optional[Callable] = None
     error_handler: Optional[Callable] = None
+    autotune: bool = Field(
+        False,
+        description="Choose block_size for the host from its measured RTT and throughput",
+    )
 
 
-class Upload(Local):
-    Model = ScpModel
+@asynccontextmanager
+async def scp_options(context: ExecutionContext) -> AsyncIterator[dict]:
+    """Yield the block_size and progress_handler of a copy.
 
-    @staticmethod
-    async def _callback(context: Context):
-        try:
-            return await asyncssh.scp(
+    With autotune, block_size is the one learned for the host over SFTP,
+    and the copy is measured to refine it.
+    """
+    caller = context.caller
+    if not caller.autotune:
+        yield dict(block_size=caller.block_size, progress_handler=caller.progress_handler)
+        return
+    connection = context.inventory_item.connection
+    async with connection_pool.sftp_client(connection) as sftp:
+        meter = await link_tuner.meter(connection, sftp)
+    try:
+        yield dict(
+            block_size=meter.block_size,
+            progress_handler=meter.progress_handler(caller.progress_handler),
+        )
+    finally:
+        meter.finish()
+
+
+class UploadModel(ScpModel):
+    sync: bool = Field(
+        False,
+        description="Only upload the files whose size or modification time differ from the remote files",
+    )
+    checksum: bool = Field(
+        False,
+        description="With sync, compare the SHA-256 digests of files of the same size but different modification time",
+    )
+
+
+async def sync_upload(context: ExecutionContext) -> None:
+    """Upload only the files of the source paths that differ on the host."""
+    caller = context.caller
+    connection = context.inventory_item.connection
+    async with connection_pool.connection(connection) as conn:
+        # SFTP compares the files; scp copies the ones that differ
+        async with connection_pool.sftp_client(connection) as sftp:
+
+            async def transfer(local: str, remote: str) -> None:
+                async with scp_options(context) as options:
+                    await asyncssh.scp(
+                        local,
+                        (conn, remote),
+                        preserve=caller.preserve,
+                        error_handler=caller.error_handler,
+                        **options,
+                    )
+
+            transferred = await sync_copies(
+                sftp,
+                conn,
+                caller.srcpaths,
+                caller.dstpath,
+                transfer,
+                recurse=caller.recurse,
+                preserve=caller.preserve,
+                checksum=caller.checksum,
+            )
+    context.changed = bool(transferred)
+
+
+async def upload_paths(context: ExecutionContext) -> None:
+    """Upload the source paths to the host."""
+    async with connection_pool.connection(context.inventory_item.connection) as conn:
+        async with scp_options(context) as options:
+            await asyncssh.scp(
                 srcpaths=context.caller.srcpaths,
-                dstpath=(context.inventory_item.connection.host, context.caller.dstpath),
-                username=context.inventory_item.connection.username,
+                dstpath=(conn, context.caller.dstpath),
                 preserve=context.caller.preserve,
                 recurse=context.caller.recurse,
-                block_size=context.caller.block_size,
-                progress_handler=context.caller.progress_handler,
                 error_handler=context.caller.error_handler,
+                **options,
             )
+
+
+class Upload(Local):
+    Model = UploadModel
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
+        try:
+            if context.caller.sync:
+                return await sync_upload(context)
+            return await upload_paths(context)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 @router.post("/upload", tags=["SCP Operations"], response_model=ResponseModel)
@@ -81,10 +168,22 @@ async def upload(
             include_in_schema=False,  # This hides it from OpenAPI schema
             description="Callback function name for error handling"
         ),
+        sync: bool = Query(
+            False,
+            description="Only upload the files whose size or modification time differ from the remote files"
+        ),
+        checksum: bool = Query(
+            False,
+            description="With sync, compare the SHA-256 digests of files of the same size but different modification time"
+        ),
+        autotune: bool = Query(
+            False,
+            description="Choose block_size for the host from its measured RTT and throughput"
+        ),
         common: LocalModel = Depends(localmodel)
 ) -> ResponseModel:
     """# Upload files to the host"""
-    return await router_handler(ScpModel, Upload)(
+    return await router_handler(UploadModel, Upload)(
         srcpaths=srcpaths,
         dstpath=dstpath,
         preserve=preserve,
@@ -92,27 +191,30 @@ async def upload(
         block_size=block_size,
         progress_handler=progress_handler,
         error_handler=error_handler,
+        sync=sync,
+        checksum=checksum,
+        autotune=autotune,
         common=common)
 
 class Download(Local):
     Model = ScpModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            return await asyncssh.scp(
-                srcpaths=[(context.inventory_item.connection.host, path) for path in context.caller.srcpaths],
-                dstpath=context.caller.dstpath,
-                username=context.inventory_item.connection.username,
-                preserve=context.caller.preserve,
-                recurse=context.caller.recurse,
-                block_size=context.caller.block_size,
-                progress_handler=context.caller.progress_handler,
-                error_handler=context.caller.error_handler,
-            )
+            async with connection_pool.connection(context.inventory_item.connection) as conn:
+                async with scp_options(context) as options:
+                    return await asyncssh.scp(
+                        srcpaths=[(conn, path) for path in context.caller.srcpaths],
+                        dstpath=context.caller.dstpath,
+                        preserve=context.caller.preserve,
+                        recurse=context.caller.recurse,
+                        error_handler=context.caller.error_handler,
+                        **options,
+                    )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 @router.post("/download", tags=["SCP Operations"], response_model=ResponseModel)
@@ -148,6 +250,10 @@ async def download(
             include_in_schema=False,  # This hides it from OpenAPI schema
             description="Callback function name for error handling"
         ),
+        autotune: bool = Query(
+            False,
+            description="Choose block_size for the host from its measured RTT and throughput"
+        ),
         common: LocalModel = Depends(localmodel)
 ) -> ResponseModel:
     """# Download files from the host"""
@@ -159,6 +265,7 @@ async def download(
         block_size=block_size,
         progress_handler=progress_handler,
         error_handler=error_handler,
+        autotune=autotune,
         common=common)
 
 class CopyModel(ScpModel):
@@ -170,22 +277,27 @@ class Copy(Local):
     Model = CopyModel
 
     @staticmethod
-    async def _callback(command: Context):
+    async def _callback(command: ExecutionContext):
         try:
-            return await asyncssh.scp(
-                srcpaths=[(command.inventory_item.connection.host, path) for path in command.caller.srcpaths],
-                dstpath=(command.caller.dsthost, command.caller.dstpath),
-                username=command.inventory_item.connection.username,
-                preserve=command.caller.preserve,
-                recurse=command.caller.recurse,
-                block_size=command.caller.block_size,
-                progress_handler=command.caller.progress_handler,
-                error_handler=command.caller.error_handler,
-            )
+            async with connection_pool.connection(command.inventory_item.connection) as conn:
+                return await asyncssh.scp(
+                    srcpaths=[(conn, path) for path in command.caller.srcpaths],
+                    dstpath=(command.caller.dsthost, command.caller.dstpath),
+                    username=command.inventory_item.connection.username,
+                    preserve=command.caller.preserve,
+                    recurse=command.caller.recurse,
+                    block_size=command.caller.block_size,
+                    progress_handler=command.caller.progress_handler,
+                    error_handler=command.caller.error_handler,
+                )
         except Exception as e:
             command.error = True
-            logging.error(f"{command.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", command.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
+        finally:
+            # The files land on dsthost, whose facts the executor does not
+            # clear; a copy that failed part way may have written some
+            fact_cache.invalidate(command.caller.dsthost)
 
 @router.post("/copy", tags=["SCP Operations"], response_model=ResponseModel)
 async def copy(
@@ -237,3 +349,182 @@ async def copy(
         progress_handler=progress_handler,
         error_handler=error_handler,
         common=common)
+
+class DistributeModel(ScpModel):
+    fanout: int = Field(
+        2,
+        ge=1,
+        description="The hosts each host that holds the files sends them to at once",
+    )
+
+
+def placed_paths(srcpaths: List[str], dstpath: str, dst_is_dir: bool) -> List[str]:
+    """Return where an upload of ``srcpaths`` to ``dstpath`` puts them."""
+    if dst_is_dir:
+        return [
+            posixpath.join(dstpath, os.path.basename(os.path.normpath(path)))
+            for path in srcpaths
+        ]
+    return [dstpath]
+
+
+def relay_command(seed: Seed, context: ExecutionContext, dst_is_dir: bool) -> str:
+    """Return the scp command that copies the files from a seed to the host."""
+    caller = context.caller
+    connection = context.inventory_item.connection
+    host = f"[{connection.host}]" if ":" in connection.host else connection.host
+    username = getattr(connection, "username", None)
+    if username:
+        host = f"{username}@{host}"
+    dstpath = caller.dstpath
+    if (
+        dst_is_dir
+        and len(seed.paths) == 1
+        and posixpath.basename(seed.paths[0]) != os.path.basename(os.path.normpath(caller.srcpaths[0]))
+    ):
+        # The seed holds the file under the name of its own destination
+        dstpath = placed_paths(caller.srcpaths, caller.dstpath, dst_is_dir)[0]
+
+    # Batch mode fails rather than prompts if the seed cannot log in
+    args = ["scp", "-B"]
+    if caller.preserve:
+        args.append("-p")
+    if caller.recurse:
+        args.append("-r")
+    port = getattr(connection, "port", None)
+    if port:
+        args.extend(["-P", str(port)])
+    return shlex.join([*args, *seed.paths, f"{host}:{dstpath}"])
+
+
+async def seed_holds_files(seed: Seed) -> bool:
+    """Return whether a seed can still be reached and holds its files."""
+    try:
+        async with connection_pool.connection(seed.item.connection) as conn:
+            result = await conn.run(shlex.join(["ls", "-d", "--", *seed.paths]), check=False)
+    except (OSError, asyncssh.Error):
+        return False
+    return result.exit_status == 0
+
+
+async def distribute(context: ExecutionContext) -> Optional[str]:
+    """Receive the source paths on the host, from a seed if one is free.
+
+    Returns:
+        The seed the files were copied from, or None if they were uploaded
+        from the API host.
+    """
+    caller = context.caller
+    item = context.inventory_item
+    key = (caller.group, tuple(caller.srcpaths), caller.dstpath, caller.preserve, caller.recurse, caller.fanout)
+    async with relays.join(key, caller.fanout) as relay:
+        async with connection_pool.sftp_client(item.connection) as sftp:
+            dst_is_dir = await sftp.isdir(caller.dstpath)
+
+        source = None
+        relayed = False
+        async with relay.source() as seed:
+            if seed is None:
+                await upload_paths(context)
+            else:
+                source = seed.item.connection.host
+                try:
+                    async with connection_pool.connection(seed.item.connection) as conn:
+                        await conn.run(relay_command(seed, context, dst_is_dir), check=True)
+                    relayed = True
+                except (OSError, asyncssh.Error) as e:
+                    logger.error("%s: relay from %s failed: %s", item.connection.host, source, e.__class__.__name__)
+                    # scp failing may be the fault of this host, such as a
+                    # refused login, so keep a seed that still holds the files
+                    if not isinstance(e, asyncssh.ProcessError) or not await seed_holds_files(seed):
+                        await relay.discard(seed)
+        if seed is not None and not relayed:
+            source = None
+            async with relay.source(peers=False):
+                await upload_paths(context)
+
+        await relay.seed(item, placed_paths(caller.srcpaths, caller.dstpath, dst_is_dir))
+    return source
+
+
+class Distribute(Local):
+    """Upload files to many hosts, relaying them between the hosts.
+
+    The API host uploads the files to the first hosts, and each host that
+    has them copies them on to the next hosts with scp, so the time to reach
+    every host grows with the logarithm of the number of hosts rather than
+    with the number.  Each host sends to at most ``fanout`` hosts at once.
+    The hosts must be able to log in to each other with scp without a
+    password, for example by key or with agent forwarding.  A host that
+    cannot be reached from a seed is uploaded to from the API host.
+    """
+
+    Model = DistributeModel
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
+        try:
+            source = await distribute(context)
+            context.changed = True
+            return source
+        except Exception as e:
+            context.error = True
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
+            return f"{e.__class__.__name__}"
+
+@router.post("/distribute", tags=["SCP Operations"], response_model=ResponseModel)
+async def distribute_files(
+        srcpaths: List[str] = Query(
+            ...,
+            description="The paths of the source files or directories to copy"
+        ),
+        dstpath: str = Query(
+            None,
+            description="The path of the destination file or directory to copy into"
+        ),
+        preserve: bool = Query(
+            False,
+            description="Whether or not to preserve the original file attributes"
+        ),
+        recurse: bool = Query(
+            False,
+            description="Whether or not to recursively copy directories"
+        ),
+        block_size: int = Query(
+            16384,
+            ge=1,
+            description="The block size to use for file reads and writes"
+        ),
+        fanout: int = Query(
+            2,
+            ge=1,
+            description="The hosts each host that holds the files sends them to at once"
+        ),
+        progress_handler: Optional[str] = Query(
+            None,
+            include_in_schema=False,  # This hides it from OpenAPI schema
+            description="Callback function name for upload progress"
+        ),
+        error_handler: Optional[str] = Query(
+            None,
+            include_in_schema=False,  # This hides it from OpenAPI schema
+            description="Callback function name for error handling"
+        ),
+        autotune: bool = Query(
+            False,
+            description="Choose block_size for the host from its measured RTT and throughput"
+        ),
+        common: LocalModel = Depends(localmodel)
+) -> ResponseModel:
+    """# Upload files to the hosts, relaying them from host to host"""
+    return await router_handler(DistributeModel, Distribute)(
+        srcpaths=srcpaths,
+        dstpath=dstpath,
+        preserve=preserve,
+        recurse=recurse,
+        block_size=block_size,
+        fanout=fanout,
+        progress_handler=progress_handler,
+        error_handler=error_handler,
+        autotune=autotune,
+        common=common)
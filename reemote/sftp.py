@@ -1,23 +1,60 @@
 import logging
 import stat as stat_module
+from contextlib import asynccontextmanager
 from pathlib import PurePath
-from typing import AsyncGenerator, Callable, List, Optional, Sequence, Union
+from typing import (
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import asyncssh
 from asyncssh.sftp import FXF_READ
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import (
     BaseModel,
     Field,
     field_validator,
     model_validator,
 )
-from reemote.context import Context
+from reemote.context import ExecutionContext
+from reemote.core.connection_pool import connection_pool
 from reemote.system import Return
 from reemote.core.local import Local
+from reemote.core.model_cache import validate_model
 from reemote.core.local import LocalModel, LocalPathModel, localmodel
 from reemote.core.response import Response, ResponseElement, ResponseModel
 from reemote.core.router_handler import router_handler, router_handler_put
+from reemote.core.sftp_stream import (
+    CHUNK_SIZE,
+    fan_out_chunks,
+    multiplex_chunks,
+    read_chunks,
+)
+from reemote.core.sync import expand_globs, sync_copies
+from reemote.core.autotune import Meter, link_tuner
+from reemote.core.compression import (
+    Method,
+    get_compressed,
+    read_compressed,
+    ssh_connection,
+)
+from reemote.core.inventory_model import Connection
+from reemote.core.transfer import (
+    get_checkpoint,
+    resume_get_paths,
+    resume_put_file,
+    resume_put_paths,
+)
+from reemote.execute import endpoint_hosts
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -33,15 +70,18 @@ class Islink(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    def _fact(model_instance: LocalPathModel) -> str:
+        return f"Islink({model_instance.path})"
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.islink(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.islink(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -67,15 +107,18 @@ class Isfile(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    def _fact(model_instance: LocalPathModel) -> str:
+        return f"Isfile({model_instance.path})"
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.isfile(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.isfile(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -101,15 +144,18 @@ class Isdir(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    def _fact(model_instance: LocalPathModel) -> str:
+        return f"Isdir({model_instance.path})"
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.isdir(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.isdir(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -135,15 +181,18 @@ class Getsize(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    def _fact(model_instance: LocalPathModel) -> str:
+        return f"Getsize({model_instance.path})"
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.getsize(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.getsize(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -169,15 +218,14 @@ class Getatime(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.getatime(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.getatime(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -203,15 +251,14 @@ class GetatimeNs(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.getatime_ns(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.getatime_ns(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -230,15 +277,14 @@ class Getmtime(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.getmtime(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.getmtime(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -258,15 +304,14 @@ class GetmtimeNs(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.getmtime_ns(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.getmtime_ns(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -286,15 +331,14 @@ class Getcrtime(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.getcrtime(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.getcrtime(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -313,15 +357,14 @@ class GetcrtimeNs(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.getcrtime_ns(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.getcrtime_ns(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -350,15 +393,14 @@ class Getcwd(Local):
     Model = GetcwdRequest
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.getcwd()
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.getcwd()
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -406,18 +448,21 @@ class Stat(Local):
     Model = StatModel
 
     @staticmethod
-    async def _callback(context: Context):
+    def _fact(model_instance: StatModel) -> str:
+        return f"Stat({model_instance.path}, follow_symlinks={model_instance.follow_symlinks})"
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    sftp_attrs = await sftp.stat(
-                        context.caller.path, follow_symlinks=context.caller.follow_symlinks
-                    )
-                    return sftp_attrs_to_dict(sftp_attrs)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                sftp_attrs = await sftp.stat(
+                    context.caller.path, follow_symlinks=context.caller.follow_symlinks
+                )
+                return sftp_attrs_to_dict(sftp_attrs)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -453,35 +498,85 @@ class ReadModel(LocalPathModel):
     max_requests: Optional[int] = Field(
         -1, description="The maximum number of parallel read or write requests"
     )
+    offset: int = Field(0, ge=0, description="The byte offset to start reading at")
+    length: Optional[int] = Field(
+        None, ge=0, description="The number of bytes to read, or all if not set"
+    )
+    autotune: bool = Field(
+        False,
+        description="Choose block_size and max_requests for the host from its measured RTT and throughput",
+    )
+    ssh_compression: bool = Field(
+        False, description="Read the file over an SSH connection that compresses its data"
+    )
+    compress: Optional[Method] = Field(
+        None,
+        description="Compress the file on the host with gzip or zstd as it is read, and decompress it locally",
+    )
 
 
 class ReadResponse(ResponseElement):
     value: str = Field(default="", description="File contents, or an error message")
 
 
+def host_connection(context: ExecutionContext) -> Connection:
+    """Return the host's connection parameters, with SSH compression if the operation asks for it."""
+    return ssh_connection(context.inventory_item.connection, context.caller.ssh_compression)
+
+
+async def read_compressed_file(context: ExecutionContext):
+    """Read the file compressed by gzip or zstd on the host, and decompress it here."""
+    caller = context.caller
+    path = str(caller.path)
+    connection = host_connection(context)
+    # Stat the file first, so that a missing file fails as an uncompressed read does
+    async with connection_pool.sftp_client(connection) as sftp:
+        await sftp.stat(path)
+    async with connection_pool.connection(connection) as conn:
+        content = b"".join(
+            [
+                data
+                async for data in read_compressed(
+                    conn, path, caller.compress, caller.offset, caller.length
+                )
+            ]
+        )
+    if caller.encoding is None:
+        return content
+    return content.decode(caller.encoding, caller.errors)
+
+
 class Read(Local):
     Model = ReadModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
+            if context.caller.compress:
+                context.changed = False
+                return await read_compressed_file(context)
+            async with connection_pool.sftp_client(host_connection(context)) as sftp:
+                context.changed = False
+                async with transfer_options(context, sftp) as (options, meter):
                     f = await sftp.open(
                         path=context.caller.path,
                         pflags_or_mode=FXF_READ,
                         encoding=context.caller.encoding,
                         errors=context.caller.errors,
-                        block_size=context.caller.block_size,
-                        max_requests=context.caller.max_requests,
+                        block_size=options["block_size"],
+                        max_requests=options["max_requests"],
+                    )
+                    length = context.caller.length
+                    content = await f.read(
+                        -1 if length is None else length, context.caller.offset
                     )
-                    content = await f.read()
                     await f.close()
-                    return content
+                    if meter is not None:
+                        meter.add(len(content))
+                return content
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -504,10 +599,32 @@ async def read(
     max_requests: Optional[int] = Query(
         -1, description="The maximum number of parallel read requests"
     ),
+    offset: int = Query(0, ge=0, description="The byte offset to start reading at"),
+    length: Optional[int] = Query(
+        None, ge=0, description="The number of bytes to read, or all if not set"
+    ),
+    autotune: bool = Query(
+        False,
+        description="Choose block_size and max_requests for the host from its measured RTT and throughput",
+    ),
+    ssh_compression: bool = Query(
+        False, description="Read the file over an SSH connection that compresses its data"
+    ),
+    compress: Optional[Method] = Query(
+        None,
+        description="Compress the file on the host with gzip or zstd as it is read, and decompress it locally",
+    ),
     common: LocalModel = Depends(localmodel),
 ) -> List[ReadResponse]:
     """# Read a remote file"""
-    params = {"path": path}
+    params = {
+        "path": path,
+        "offset": offset,
+        "length": length,
+        "autotune": autotune,
+        "ssh_compression": ssh_compression,
+        "compress": compress,
+    }
     if encoding is not None:
         params["encoding"] = encoding
     if errors is not None:
@@ -519,6 +636,88 @@ async def read(
     return await router_handler(ReadModel, Read)(**params, common=common)
 
 
+@router.get(
+    "/read_stream",
+    tags=["SFTP Operations"],
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/octet-stream": {}, "application/x-ndjson": {}},
+            "description": "The file's bytes from one host, or NDJSON chunks from several",
+        }
+    },
+)
+async def read_stream(
+    path: str = Query(..., description="The name of the remote file to read"),
+    offset: int = Query(0, ge=0, description="The byte offset to start reading at"),
+    length: Optional[int] = Query(
+        None, ge=0, description="The number of bytes to read, or all if not set"
+    ),
+    chunk_size: int = Query(
+        CHUNK_SIZE, gt=0, description="The number of bytes read at a time"
+    ),
+    block_size: int = Query(-1, description="The block size to use for read requests"),
+    max_requests: int = Query(
+        -1, description="The maximum number of parallel read requests"
+    ),
+    autotune: bool = Query(
+        False,
+        description="Choose block_size and chunk_size for each host from its measured RTT and throughput",
+    ),
+    common: LocalModel = Depends(localmodel),
+) -> StreamingResponse:
+    """# Stream a remote file
+
+    The file is sent as it is read, without holding it in memory.  When the
+    group holds one host, the body is the file's bytes.  When it holds
+    several, the body is NDJSON: one `{"host", "offset", "data"}` line per
+    chunk, with the data base64 encoded, and a last `{"host", "done", "size"}`
+    or `{"host", "error", "value"}` line for each host.
+    """
+    hosts = endpoint_hosts(common.group)
+    if not hosts:
+        raise HTTPException(status_code=404, detail=f"No hosts in group {common.group}")
+    kwargs = dict(
+        offset=offset,
+        length=length,
+        chunk_size=chunk_size,
+        block_size=block_size,
+        max_requests=max_requests,
+        autotune=autotune,
+    )
+
+    if len(hosts) > 1:
+        return StreamingResponse(
+            multiplex_chunks(hosts, path, **kwargs), media_type="application/x-ndjson"
+        )
+
+    host = hosts[0].connection.host
+    chunks = read_chunks(hosts[0].connection, path, **kwargs)
+    # Read the first chunk before answering, so that a missing file is an
+    # error status rather than an empty body
+    try:
+        first = await anext(chunks, b"")
+    except asyncssh.SFTPNoSuchFile:
+        raise HTTPException(status_code=404, detail=f"{host}: SFTPNoSuchFile")
+    except Exception as e:
+        logger.error("%s: %s", host, e.__class__.__name__)
+        raise HTTPException(status_code=502, detail=f"{host}: {e.__class__.__name__}")
+
+    async def body():
+        try:
+            yield first
+            async for data in chunks:
+                yield data
+        finally:
+            await chunks.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="application/octet-stream",
+        headers={"X-Reemote-Host": host},
+    )
+
+
 class ListdirResponse(ResponseElement):
     value: Union[str, List[str]] = Field(
         default="", description="List of files in directory, or an error message"
@@ -529,15 +728,14 @@ class Listdir(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.listdir(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.listdir(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -593,16 +791,15 @@ class Readdir(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    sftp_names = await sftp.readdir(context.caller.path)
-                    return sftp_names_to_dict(sftp_names)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                sftp_names = await sftp.readdir(context.caller.path)
+                return sftp_names_to_dict(sftp_names)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -628,15 +825,18 @@ class Exists(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    def _fact(model_instance: LocalPathModel) -> str:
+        return f"Exists({model_instance.path})"
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.exists(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.exists(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -655,15 +855,18 @@ class Lexists(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    def _fact(model_instance: LocalPathModel) -> str:
+        return f"Lexists({model_instance.path})"
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.lexists(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.lexists(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -682,16 +885,19 @@ class Lstat(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    def _fact(model_instance: LocalPathModel) -> str:
+        return f"Lstat({model_instance.path})"
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    sftp_attrs = await sftp.lstat(context.caller.path)
-                    return sftp_attrs_to_dict(sftp_attrs)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                sftp_attrs = await sftp.lstat(context.caller.path)
+                return sftp_attrs_to_dict(sftp_attrs)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -718,15 +924,14 @@ class Readlink(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.readlink(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.readlink(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -751,15 +956,14 @@ class Glob(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.glob(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.glob(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -778,16 +982,15 @@ class GlobSftpName(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    sftp_names = await sftp.glob_sftpname(context.caller.path)
-                    return sftp_names_to_dict(sftp_names)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                sftp_names = await sftp.glob_sftpname(context.caller.path)
+                return sftp_names_to_dict(sftp_names)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -848,16 +1051,19 @@ class StatVfs(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    def _fact(model_instance: LocalPathModel) -> str:
+        return f"StatVfs({model_instance.path})"
+
+    @staticmethod
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    sftp_vfs_attrs = await sftp.statvfs(context.caller.path)
-                    context.changed = False
-                    return sftp_vfs_attrs_to_dict(sftp_vfs_attrs)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                sftp_vfs_attrs = await sftp.statvfs(context.caller.path)
+                context.changed = False
+                return sftp_vfs_attrs_to_dict(sftp_vfs_attrs)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -883,15 +1089,14 @@ class Realpath(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return await sftp.realpath(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return await sftp.realpath(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -913,23 +1118,22 @@ class Client(Local):
     Model = ClientResponse
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    context.changed = False
-                    return {
-                        "version": sftp.version,
-                        # "logger": sftp.logger,
-                        "max_packet_len": sftp.limits.max_packet_len,
-                        "max_read_len": sftp.limits.max_read_len,
-                        "max_write_len": sftp.limits.max_write_len,
-                        "max_open_handles": sftp.limits.max_open_handles,
-                        "supports_remote_copy": sftp.supports_remote_copy,
-                    }
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                context.changed = False
+                return {
+                    "version": sftp.version,
+                    # "logger": sftp.logger,
+                    "max_packet_len": sftp.limits.max_packet_len,
+                    "max_read_len": sftp.limits.max_read_len,
+                    "max_write_len": sftp.limits.max_write_len,
+                    "max_open_handles": sftp.limits.max_open_handles,
+                    "supports_remote_copy": sftp.supports_remote_copy,
+                }
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1031,26 +1235,25 @@ class Copy(Local):
     Model = CopyRequestModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.copy(
-                        srcpaths=context.caller.srcpaths,
-                        dstpath=context.caller.dstpath,
-                        preserve=context.caller.preserve,
-                        recurse=context.caller.recurse,
-                        follow_symlinks=context.caller.follow_symlinks,
-                        sparse=context.caller.sparse,
-                        block_size=context.caller.block_size,
-                        max_requests=context.caller.max_requests,
-                        progress_handler=context.caller.progress_handler,
-                        error_handler=context.caller.error_handler,
-                        remote_only=context.caller.remote_only,
-                    )
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.copy(
+                    srcpaths=context.caller.srcpaths,
+                    dstpath=context.caller.dstpath,
+                    preserve=context.caller.preserve,
+                    recurse=context.caller.recurse,
+                    follow_symlinks=context.caller.follow_symlinks,
+                    sparse=context.caller.sparse,
+                    block_size=context.caller.block_size,
+                    max_requests=context.caller.max_requests,
+                    progress_handler=context.caller.progress_handler,
+                    error_handler=context.caller.error_handler,
+                    remote_only=context.caller.remote_only,
+                )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1058,26 +1261,25 @@ class Mcopy(Local):
     Model = McopyModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.mcopy(
-                        srcpaths=context.caller.srcpaths,
-                        dstpath=context.caller.dstpath,
-                        preserve=context.caller.preserve,
-                        recurse=context.caller.recurse,
-                        follow_symlinks=context.caller.follow_symlinks,
-                        sparse=context.caller.sparse,
-                        block_size=context.caller.block_size,
-                        max_requests=context.caller.max_requests,
-                        progress_handler=context.caller.progress_handler,
-                        error_handler=context.caller.error_handler,
-                        remote_only=context.caller.remote_only,
-                    )
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.mcopy(
+                    srcpaths=context.caller.srcpaths,
+                    dstpath=context.caller.dstpath,
+                    preserve=context.caller.preserve,
+                    recurse=context.caller.recurse,
+                    follow_symlinks=context.caller.follow_symlinks,
+                    sparse=context.caller.sparse,
+                    block_size=context.caller.block_size,
+                    max_requests=context.caller.max_requests,
+                    progress_handler=context.caller.progress_handler,
+                    error_handler=context.caller.error_handler,
+                    remote_only=context.caller.remote_only,
+                )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1191,6 +1393,36 @@ async def mcopy(
     )
 
 
+@asynccontextmanager
+async def transfer_options(
+    context: ExecutionContext, sftp: asyncssh.SFTPClient
+) -> AsyncIterator[Tuple[dict, Optional[Meter]]]:
+    """Yield the block_size, max_requests and progress_handler of a transfer.
+
+    With autotune, block_size and max_requests are the ones learned for the
+    host, and a Meter, also yielded, measures the transfer to refine them.
+    """
+    caller = context.caller
+    # Read has no progress handler
+    progress_handler = getattr(caller, "progress_handler", None)
+    if not caller.autotune:
+        yield dict(
+            block_size=caller.block_size,
+            max_requests=caller.max_requests,
+            progress_handler=progress_handler,
+        ), None
+        return
+    meter = await link_tuner.meter(context.inventory_item.connection, sftp)
+    try:
+        yield dict(
+            block_size=meter.block_size,
+            max_requests=meter.max_requests,
+            progress_handler=meter.progress_handler(progress_handler),
+        ), meter
+    finally:
+        meter.finish()
+
+
 class GetModel(LocalModel):
     remotepaths: Union[PurePath, str, bytes, Sequence[Union[PurePath, str, bytes]]] = (
         Field(
@@ -1208,6 +1440,32 @@ class GetModel(LocalModel):
     max_requests: Optional[int] = -1
     progress_handler: Optional[Callable] = None
     error_handler: Optional[Callable] = None
+    resume: bool = Field(
+        False,
+        description="Resume files a previous transfer left part way, from the offsets saved in the checkpoint file",
+    )
+    checkpoint: Optional[Union[PurePath, str]] = Field(
+        None,
+        description="The local file that saves the offsets of resumable transfers, by default checkpoints.json in the data directory",
+    )
+    autotune: bool = Field(
+        False,
+        description="Choose block_size and max_requests for the host from its measured RTT and throughput",
+    )
+    ssh_compression: bool = Field(
+        False, description="Transfer the files over an SSH connection that compresses their data"
+    )
+    compress: Optional[Method] = Field(
+        None,
+        description="Compress each file on the host with gzip or zstd as it is downloaded, and decompress it locally",
+    )
+
+    @model_validator(mode="after")
+    def check_compress(self):
+        """Ensure that a compressed download is not also resumed."""
+        if self.compress and self.resume:
+            raise ValueError("compress and resume cannot be used together")
+        return self
 
     @field_validator("remotepaths", mode="before")
     @classmethod
@@ -1246,14 +1504,57 @@ class MgetModel(GetModel):
     pass
 
 
+async def resume_get(context: ExecutionContext, remotepaths) -> None:
+    """Download ``remotepaths``, resuming the files a previous download left part way."""
+    caller = context.caller
+    connection = host_connection(context)
+    async with connection_pool.sftp_client(connection) as sftp:
+        async with transfer_options(context, sftp) as (options, meter):
+            copied = await resume_get_paths(
+                sftp,
+                connection,
+                get_checkpoint(caller.checkpoint),
+                remotepaths,
+                caller.localpath,
+                recurse=caller.recurse,
+                preserve=caller.preserve,
+                meter=meter,
+                **options,
+            )
+    logger.info("%s: %d bytes downloaded", connection.host, copied)
+
+
+async def compressed_get(context: ExecutionContext, remotepaths) -> None:
+    """Download ``remotepaths``, compressing each file with gzip or zstd on the host."""
+    caller = context.caller
+    connection = host_connection(context)
+    async with connection_pool.connection(connection) as conn:
+        async with connection_pool.sftp_client(connection) as sftp:
+            written = await get_compressed(
+                sftp,
+                conn,
+                remotepaths,
+                caller.localpath,
+                caller.compress,
+                recurse=caller.recurse,
+                preserve=caller.preserve,
+                progress_handler=caller.progress_handler,
+            )
+    logger.info("%s: %d bytes downloaded", connection.host, written)
+
+
 class Get(Local):
     Model = GetModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
+            if context.caller.resume:
+                return await resume_get(context, context.caller.remotepaths)
+            if context.caller.compress:
+                return await compressed_get(context, context.caller.remotepaths)
+            async with connection_pool.sftp_client(host_connection(context)) as sftp:
+                async with transfer_options(context, sftp) as (options, _):
                     return await sftp.get(
                         remotepaths=context.caller.remotepaths,
                         localpath=context.caller.localpath,
@@ -1261,14 +1562,12 @@ class Get(Local):
                         recurse=context.caller.recurse,
                         follow_symlinks=context.caller.follow_symlinks,
                         sparse=context.caller.sparse,
-                        block_size=context.caller.block_size,
-                        max_requests=context.caller.max_requests,
-                        progress_handler=context.caller.progress_handler,
+                        **options,
                         error_handler=context.caller.error_handler,
                     )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1276,10 +1575,16 @@ class Mget(Local):
     Model = MgetModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
+            if context.caller.resume or context.caller.compress:
+                async with connection_pool.sftp_client(host_connection(context)) as sftp:
+                    remotepaths = await sftp.glob(context.caller.remotepaths)
+                if context.caller.compress:
+                    return await compressed_get(context, remotepaths)
+                return await resume_get(context, remotepaths)
+            async with connection_pool.sftp_client(host_connection(context)) as sftp:
+                async with transfer_options(context, sftp) as (options, _):
                     return await sftp.mget(
                         remotepaths=context.caller.remotepaths,
                         localpath=context.caller.localpath,
@@ -1287,14 +1592,12 @@ class Mget(Local):
                         recurse=context.caller.recurse,
                         follow_symlinks=context.caller.follow_symlinks,
                         sparse=context.caller.sparse,
-                        block_size=context.caller.block_size,
-                        max_requests=context.caller.max_requests,
-                        progress_handler=context.caller.progress_handler,
+                        **options,
                         error_handler=context.caller.error_handler,
                     )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1331,6 +1634,25 @@ async def get(
     error_handler: Optional[str] = Query(
         None, description="Callback function name for error handling"
     ),
+    resume: bool = Query(
+        False,
+        description="Resume files a previous transfer left part way, from the offsets saved in the checkpoint file",
+    ),
+    checkpoint: Optional[str] = Query(
+        None,
+        description="The local file that saves the offsets of resumable transfers",
+    ),
+    autotune: bool = Query(
+        False,
+        description="Choose block_size and max_requests for the host from its measured RTT and throughput",
+    ),
+    ssh_compression: bool = Query(
+        False, description="Transfer the files over an SSH connection that compresses their data"
+    ),
+    compress: Optional[Method] = Query(
+        None,
+        description="Compress each file on the host with gzip or zstd as it is downloaded, and decompress it locally",
+    ),
     common: LocalModel = Depends(localmodel),
 ) -> ResponseModel:
     """# Download remote files"""
@@ -1345,6 +1667,11 @@ async def get(
         max_requests=max_requests,
         progress_handler=progress_handler,
         error_handler=error_handler,
+        resume=resume,
+        checkpoint=checkpoint,
+        autotune=autotune,
+        ssh_compression=ssh_compression,
+        compress=compress,
         common=common,
     )
 
@@ -1382,6 +1709,25 @@ async def mget(
     error_handler: Optional[str] = Query(
         None, description="Callback function name for error handling"
     ),
+    resume: bool = Query(
+        False,
+        description="Resume files a previous transfer left part way, from the offsets saved in the checkpoint file",
+    ),
+    checkpoint: Optional[str] = Query(
+        None,
+        description="The local file that saves the offsets of resumable transfers",
+    ),
+    autotune: bool = Query(
+        False,
+        description="Choose block_size and max_requests for the host from its measured RTT and throughput",
+    ),
+    ssh_compression: bool = Query(
+        False, description="Transfer the files over an SSH connection that compresses their data"
+    ),
+    compress: Optional[Method] = Query(
+        None,
+        description="Compress each file on the host with gzip or zstd as it is downloaded, and decompress it locally",
+    ),
     common: LocalModel = Depends(localmodel),
 ) -> ResponseModel:
     """# Download remote files with glob pattern match"""
@@ -1396,6 +1742,11 @@ async def mget(
         max_requests=max_requests,
         progress_handler=progress_handler,
         error_handler=error_handler,
+        resume=resume,
+        checkpoint=checkpoint,
+        autotune=autotune,
+        ssh_compression=ssh_compression,
+        compress=compress,
         common=common,
     )
 
@@ -1417,6 +1768,29 @@ class PutModel(LocalModel):
     max_requests: Optional[int] = -1
     progress_handler: Optional[Callable] = None
     error_handler: Optional[Callable] = None
+    sync: bool = Field(
+        False,
+        description="Only upload the files whose size or modification time differ from the remote files",
+    )
+    checksum: bool = Field(
+        False,
+        description="With sync, compare the SHA-256 digests of files of the same size but different modification time",
+    )
+    resume: bool = Field(
+        False,
+        description="Resume files a previous transfer left part way, from the offsets saved in the checkpoint file",
+    )
+    checkpoint: Optional[Union[PurePath, str]] = Field(
+        None,
+        description="The local file that saves the offsets of resumable transfers, by default checkpoints.json in the data directory",
+    )
+    autotune: bool = Field(
+        False,
+        description="Choose block_size and max_requests for the host from its measured RTT and throughput",
+    )
+    ssh_compression: bool = Field(
+        False, description="Transfer the files over an SSH connection that compresses their data"
+    )
 
     @field_validator("localpaths", mode="before")
     @classmethod
@@ -1455,14 +1829,82 @@ class MputModel(PutModel):
     pass
 
 
+async def sync_put(context: ExecutionContext, localpaths) -> None:
+    """Upload only the files of ``localpaths`` that differ on the host."""
+    caller = context.caller
+    connection = host_connection(context)
+    async with connection_pool.connection(connection) as conn:
+        async with connection_pool.sftp_client(connection) as sftp:
+
+            async def transfer(local: str, remote: str) -> None:
+                async with transfer_options(context, sftp) as (options, meter):
+                    if caller.resume:
+                        await resume_put_file(
+                            sftp,
+                            connection,
+                            get_checkpoint(caller.checkpoint),
+                            local,
+                            remote,
+                            preserve=caller.preserve,
+                            meter=meter,
+                            **options,
+                        )
+                        return
+                    await sftp.put(
+                        local,
+                        remote,
+                        preserve=caller.preserve,
+                        follow_symlinks=caller.follow_symlinks,
+                        sparse=caller.sparse,
+                        error_handler=caller.error_handler,
+                        **options,
+                    )
+
+            transferred = await sync_copies(
+                sftp,
+                conn,
+                localpaths,
+                caller.remotepath,
+                transfer,
+                recurse=caller.recurse,
+                preserve=caller.preserve,
+                checksum=caller.checksum,
+            )
+    context.changed = bool(transferred)
+
+
+async def resume_put(context: ExecutionContext, localpaths) -> None:
+    """Upload ``localpaths``, resuming the files a previous upload left part way."""
+    caller = context.caller
+    connection = host_connection(context)
+    async with connection_pool.sftp_client(connection) as sftp:
+        async with transfer_options(context, sftp) as (options, meter):
+            copied = await resume_put_paths(
+                sftp,
+                connection,
+                get_checkpoint(caller.checkpoint),
+                localpaths,
+                caller.remotepath,
+                recurse=caller.recurse,
+                preserve=caller.preserve,
+                meter=meter,
+                **options,
+            )
+    logger.info("%s: %d bytes uploaded", connection.host, copied)
+
+
 class Put(Local):
     Model = PutModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
+            if context.caller.sync:
+                return await sync_put(context, context.caller.localpaths)
+            if context.caller.resume:
+                return await resume_put(context, context.caller.localpaths)
+            async with connection_pool.sftp_client(host_connection(context)) as sftp:
+                async with transfer_options(context, sftp) as (options, _):
                     return await sftp.put(
                         localpaths=context.caller.localpaths,
                         remotepath=context.caller.remotepath,
@@ -1470,14 +1912,12 @@ class Put(Local):
                         recurse=context.caller.recurse,
                         follow_symlinks=context.caller.follow_symlinks,
                         sparse=context.caller.sparse,
-                        block_size=context.caller.block_size,
-                        max_requests=context.caller.max_requests,
-                        progress_handler=context.caller.progress_handler,
+                        **options,
                         error_handler=context.caller.error_handler,
                     )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1485,10 +1925,14 @@ class Mput(Local):
     Model = MputModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
+            if context.caller.sync:
+                return await sync_put(context, expand_globs(context.caller.localpaths))
+            if context.caller.resume:
+                return await resume_put(context, expand_globs(context.caller.localpaths))
+            async with connection_pool.sftp_client(host_connection(context)) as sftp:
+                async with transfer_options(context, sftp) as (options, _):
                     return await sftp.mput(
                         localpaths=context.caller.localpaths,
                         remotepath=context.caller.remotepath,
@@ -1496,14 +1940,12 @@ class Mput(Local):
                         recurse=context.caller.recurse,
                         follow_symlinks=context.caller.follow_symlinks,
                         sparse=context.caller.sparse,
-                        block_size=context.caller.block_size,
-                        max_requests=context.caller.max_requests,
-                        progress_handler=context.caller.progress_handler,
+                        **options,
                         error_handler=context.caller.error_handler,
                     )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1540,6 +1982,29 @@ async def put(
     error_handler: Optional[str] = Query(
         None, description="Callback function name for error handling"
     ),
+    sync: bool = Query(
+        False,
+        description="Only upload the files whose size or modification time differ from the remote files",
+    ),
+    checksum: bool = Query(
+        False,
+        description="With sync, compare the SHA-256 digests of files of the same size but different modification time",
+    ),
+    resume: bool = Query(
+        False,
+        description="Resume files a previous transfer left part way, from the offsets saved in the checkpoint file",
+    ),
+    checkpoint: Optional[str] = Query(
+        None,
+        description="The local file that saves the offsets of resumable transfers",
+    ),
+    autotune: bool = Query(
+        False,
+        description="Choose block_size and max_requests for the host from its measured RTT and throughput",
+    ),
+    ssh_compression: bool = Query(
+        False, description="Transfer the files over an SSH connection that compresses their data"
+    ),
     common: LocalModel = Depends(localmodel),
 ) -> ResponseModel:
     """# Upload local files"""
@@ -1554,6 +2019,12 @@ async def put(
         max_requests=max_requests,
         progress_handler=progress_handler,
         error_handler=error_handler,
+        sync=sync,
+        checksum=checksum,
+        resume=resume,
+        checkpoint=checkpoint,
+        autotune=autotune,
+        ssh_compression=ssh_compression,
         common=common,
     )
 
@@ -1591,6 +2062,29 @@ async def mput(
     error_handler: Optional[str] = Query(
         None, description="Callback function name for error handling"
     ),
+    sync: bool = Query(
+        False,
+        description="Only upload the files whose size or modification time differ from the remote files",
+    ),
+    checksum: bool = Query(
+        False,
+        description="With sync, compare the SHA-256 digests of files of the same size but different modification time",
+    ),
+    resume: bool = Query(
+        False,
+        description="Resume files a previous transfer left part way, from the offsets saved in the checkpoint file",
+    ),
+    checkpoint: Optional[str] = Query(
+        None,
+        description="The local file that saves the offsets of resumable transfers",
+    ),
+    autotune: bool = Query(
+        False,
+        description="Choose block_size and max_requests for the host from its measured RTT and throughput",
+    ),
+    ssh_compression: bool = Query(
+        False, description="Transfer the files over an SSH connection that compresses their data"
+    ),
     common: LocalModel = Depends(localmodel),
 ) -> ResponseModel:
     """# Upload local files with glob pattern match"""
@@ -1605,6 +2099,12 @@ async def mput(
         max_requests=max_requests,
         progress_handler=progress_handler,
         error_handler=error_handler,
+        sync=sync,
+        checksum=checksum,
+        resume=resume,
+        checkpoint=checkpoint,
+        autotune=autotune,
+        ssh_compression=ssh_compression,
         common=common,
     )
 
@@ -1658,20 +2158,19 @@ class Mkdir(Local):
     Model = MkdirModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    sftp_attrs = context.caller.get_sftp_attrs()
-                    if sftp_attrs:
-                        await sftp.mkdir(
-                            path=context.caller.path, attrs=sftp_attrs if sftp_attrs else None
-                        )
-                    else:
-                        await sftp.mkdir(path=context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                sftp_attrs = context.caller.get_sftp_attrs()
+                if sftp_attrs:
+                    await sftp.mkdir(
+                        path=context.caller.path, attrs=sftp_attrs if sftp_attrs else None
+                    )
+                else:
+                    await sftp.mkdir(path=context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1706,16 +2205,15 @@ class Setstat(Local):
     Model = MkdirModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    sftp_attrs = context.caller.get_sftp_attrs()
-                    if sftp_attrs:
-                        await sftp.setstat(path=context.caller.path, attrs=sftp_attrs)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                sftp_attrs = context.caller.get_sftp_attrs()
+                if sftp_attrs:
+                    await sftp.setstat(path=context.caller.path, attrs=sftp_attrs)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1753,20 +2251,19 @@ class Makedirs(Local):
     Model = MkdirModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    sftp_attrs = context.caller.get_sftp_attrs()
-                    if sftp_attrs:
-                        await sftp.makedirs(
-                            path=context.caller.path, attrs=sftp_attrs if sftp_attrs else None
-                        )
-                    else:
-                        await sftp.makedirs(path=context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                sftp_attrs = context.caller.get_sftp_attrs()
+                if sftp_attrs:
+                    await sftp.makedirs(
+                        path=context.caller.path, attrs=sftp_attrs if sftp_attrs else None
+                    )
+                else:
+                    await sftp.makedirs(path=context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1801,14 +2298,13 @@ class Rmdir(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.rmdir(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.rmdir(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1828,14 +2324,13 @@ class Rmtree(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.rmtree(context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.rmtree(context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1864,18 +2359,17 @@ class Chmod(Local):
     Model = ChmodModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.chmod(
-                        path=context.caller.path,
-                        mode=context.caller.permissions,
-                        follow_symlinks=context.caller.follow_symlinks,
-                    )
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.chmod(
+                    path=context.caller.path,
+                    mode=context.caller.permissions,
+                    follow_symlinks=context.caller.follow_symlinks,
+                )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1913,19 +2407,18 @@ class Chown(Local):
     Model = ChownModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.chown(
-                        path=context.caller.path,
-                        uid=context.caller.uid,
-                        gid=context.caller.gid,
-                        follow_symlinks=context.caller.follow_symlinks,
-                    )
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.chown(
+                    path=context.caller.path,
+                    uid=context.caller.uid,
+                    gid=context.caller.gid,
+                    follow_symlinks=context.caller.follow_symlinks,
+                )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -1969,18 +2462,17 @@ class Utime(Local):
     Model = UtimeModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.utime(
-                        path=context.caller.path,
-                        times=(context.caller.atime, context.caller.mtime),
-                        follow_symlinks=context.caller.follow_symlinks,
-                    )
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.utime(
+                    path=context.caller.path,
+                    times=(context.caller.atime, context.caller.mtime),
+                    follow_symlinks=context.caller.follow_symlinks,
+                )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -2018,14 +2510,13 @@ class Chdir(Local):
     Model = ChdirModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.chdir(path=context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.chdir(path=context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -2069,16 +2560,15 @@ class Rename(Local):
     Model = RenameModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.rename(
-                        oldpath=context.caller.oldpath, newpath=context.caller.newpath
-                    )
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.rename(
+                    oldpath=context.caller.oldpath, newpath=context.caller.newpath
+                )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -2103,14 +2593,13 @@ class Remove(Local):
     Model = LocalPathModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.remove(path=context.caller.path)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.remove(path=context.caller.path)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -2183,25 +2672,24 @@ class Write(Local):
     Model = WriteModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    sftp_attrs = context.caller.get_sftp_attrs()
-                    f = await sftp.open(
-                        path=context.caller.path,
-                        pflags_or_mode=context.caller.mode,
-                        attrs=sftp_attrs if sftp_attrs else None,
-                        encoding=context.caller.encoding,
-                        errors=context.caller.errors,
-                        block_size=context.caller.block_size,
-                        max_requests=context.caller.max_requests,
-                    )
-                    content = await f.write(context.caller.text)
-                    await f.close()
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                sftp_attrs = context.caller.get_sftp_attrs()
+                f = await sftp.open(
+                    path=context.caller.path,
+                    pflags_or_mode=context.caller.mode,
+                    attrs=sftp_attrs if sftp_attrs else None,
+                    encoding=context.caller.encoding,
+                    errors=context.caller.errors,
+                    block_size=context.caller.block_size,
+                    max_requests=context.caller.max_requests,
+                )
+                content = await f.write(context.caller.text)
+                await f.close()
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -2261,6 +2749,53 @@ async def write(
     return await router_handler(WriteModel, Write)(**params, common=common)
 
 
+class WriteStreamResponse(ResponseElement):
+    value: Union[int, str] = Field(
+        default=0, description="The number of bytes written, or an error message"
+    )
+
+
+@router.post(
+    "/write_stream",
+    tags=["SFTP Operations"],
+    response_model=List[WriteStreamResponse],
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}},
+            "required": True,
+        }
+    },
+)
+async def write_stream(
+    request: Request,
+    path: str = Query(..., description="The name of the remote file to write"),
+    permissions: Optional[int] = Query(
+        None, ge=0, le=0o7777, description="File permissions as integer"
+    ),
+    block_size: int = Query(-1, description="The block size to use for write requests"),
+    max_requests: int = Query(
+        -1, description="The maximum number of parallel write requests"
+    ),
+    common: LocalModel = Depends(localmodel),
+) -> List[WriteStreamResponse]:
+    """# Write the request body to a remote file on every host
+
+    The body is written to the hosts as it arrives, without holding it in
+    memory.  A host that falls behind has the rest of the body spooled to a
+    temporary file, so it does not slow down the others.
+    """
+    hosts = endpoint_hosts(common.group)
+    attrs = asyncssh.SFTPAttrs(permissions=permissions)
+    return await fan_out_chunks(
+        hosts,
+        request.stream(),
+        path,
+        attrs=attrs,
+        block_size=block_size,
+        max_requests=max_requests,
+    )
+
+
 class LinkModel(LocalModel):
     file_path: Union[PurePath, str, bytes] = Field(
         ...,  # Required field
@@ -2290,16 +2825,15 @@ class Link(Local):
     Model = LinkModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.link(
-                        oldpath=context.caller.file_path, newpath=context.caller.link_path
-                    )
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.link(
+                    oldpath=context.caller.file_path, newpath=context.caller.link_path
+                )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -2323,16 +2857,15 @@ class Symlink(Local):
     Model = LinkModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.symlink(
-                        oldpath=context.caller.file_path, newpath=context.caller.link_path
-                    )
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.symlink(
+                    oldpath=context.caller.file_path, newpath=context.caller.link_path
+                )
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -2378,14 +2911,13 @@ class Truncate(Local):
     Model = TruncateModel
 
     @staticmethod
-    async def _callback(context: Context):
+    async def _callback(context: ExecutionContext):
         try:
-            async with asyncssh.connect(**context.inventory_item.connection.to_json_serializable()) as conn:
-                async with conn.start_sftp_client() as sftp:
-                    return await sftp.truncate(path=context.caller.file_path, size=context.caller.size)
+            async with connection_pool.sftp_client(context.inventory_item.connection) as sftp:
+                return await sftp.truncate(path=context.caller.file_path, size=context.caller.size)
         except Exception as e:
             context.error = True
-            logging.error(f"{context.inventory_item.connection.host}: {e.__class__.__name__}")
+            logger.error("%s: %s", context.inventory_item.connection.host, e.__class__.__name__)
             return f"{e.__class__.__name__}"
 
 
@@ -2418,7 +2950,7 @@ class Directory(Local):
     ) -> AsyncGenerator[
         Isdir | Rmdir | Mkdir | Stat | Chmod | Chown | Utime | Return, Response
     ]:
-        model_instance = self.Model.model_validate(self.kwargs)
+        model_instance = validate_model(self.Model, self.kwargs)
 
         changed = False
         isdir = yield Isdir(path=model_instance.path, group=model_instance.group)
@@ -2436,7 +2968,7 @@ class Directory(Local):
                             group=model_instance.group)
                 changed = True
             elif model_instance.present and isdir["value"]:
-                r = yield Stat(path="/home/user/freddy", group=model_instance.group)
+                r = yield Stat(path=model_instance.path, group=model_instance.group)
                 if (
                     model_instance.permissions
                     and r["value"]["permissions"] != model_instance.permissions
@@ -1,9 +1,11 @@
 from pydantic import Field
-from typing import AsyncGenerator, Callable, Any
-from reemote.context import Context, ConnectionType
+from typing import AsyncGenerator, Callable, Any, List
+from reemote.context import Context, ConnectionType, ExecutionContext
 from reemote.core.response import Response
 from reemote.core.local import LocalModel
 from reemote.core.local import Local
+from reemote.core.model_cache import validate_model
+from reemote.execute import process_operations
 
 
 class CallbackRequestModel(LocalModel):
@@ -17,7 +19,7 @@ class Callback(Local):
     Model = CallbackRequestModel
 
     async def execute(self) -> AsyncGenerator[Context, Response]:
-        model_instance = self.Model.model_validate(self.kwargs)
+        model_instance = validate_model(self.Model, self.kwargs)
 
         yield Context(
             type=ConnectionType.LOCAL,
@@ -38,7 +40,7 @@ class Return(Local):
     Model = ReturnRequestModel
 
     async def execute(self) -> AsyncGenerator[Context, Response]:
-        model_instance = self.Model.model_validate(self.kwargs)
+        model_instance = validate_model(self.Model, self.kwargs)
 
         yield Context(
             type=ConnectionType.PASSTHROUGH,
@@ -48,3 +50,49 @@ class Return(Local):
             caller=model_instance,
             group=model_instance.group,
         )
+
+
+class ParallelRequestModel(LocalModel):
+    operations: List[Any] = Field(
+        ..., description="The operations to run concurrently."
+    )
+    limit: int = Field(
+        10, ge=1, description="The maximum number of operations running at once."
+    )
+
+
+class Parallel(Local):
+    """Run several operations concurrently on each host.
+
+    The operations share the host's pooled connection and SFTP session.  The
+    response's value is the list of the operations' final responses, in the
+    order of ``operations``.
+    """
+
+    Model = ParallelRequestModel
+
+    async def execute(self) -> AsyncGenerator[Context, Response]:
+        model_instance = validate_model(self.Model, self.kwargs)
+
+        async def run_operations(context: ExecutionContext):
+            return await process_operations(
+                context.inventory_item, model_instance.operations, model_instance.limit
+            )
+
+        r = yield Context(
+            type=ConnectionType.LOCAL,
+            callback=run_operations,
+            call=self.__class__.child + "(" + str(model_instance) + ")",
+            caller=model_instance,
+            changed=False,
+            group=model_instance.group,
+        )
+        if r is None:
+            # The host is not in the group
+            return
+
+        yield Return(
+            value=r["value"],
+            changed=any(response and response["changed"] for response in r["value"]),
+            group=model_instance.group,
+        )
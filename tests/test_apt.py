@@ -3,6 +3,10 @@ import pytest
 from reemote.apt import Install, Remove, Update, Upgrade
 from reemote.apt import GetPackages
 from reemote.apt import Package
+from reemote.apt import PackageList
+from reemote.apt import split_package
+from reemote.core.parse_apt_list_installed import iter_apt_list_installed
+from reemote.core.parse_apt_list_installed import parse_apt_list_installed
 from reemote.execute import endpoint_execute
 
 
@@ -81,3 +85,57 @@ async def test_apt_packages(setup_inventory):
             )
 
     await endpoint_execute(lambda: Root())
+
+@pytest.mark.asyncio
+async def test_apt_get_packages_subset(setup_inventory):
+    class Root:
+        async def execute(self):
+            r = yield GetPackages(packages=["bash", "no-such-package"])
+            if r:
+                assert not r["changed"]
+                assert [p.name for p in r["value"].packages] == ["bash"]
+            r = yield Package(packages=["bash"], present=True, sudo=True)
+            if r:
+                assert not r["changed"]
+
+    r = await endpoint_execute(lambda: Root())
+    assert len(r) == 2
+
+@pytest.mark.asyncio
+async def test_apt_package_pinned(setup_inventory):
+    class Root:
+        async def execute(self):
+            r = yield GetPackages(packages=["bash"])
+            if r:
+                version = r["value"].packages[0].version
+                r = yield Package(packages=[f"bash={version}"], present=True, sudo=True)
+                assert r and not r["changed"]
+
+    r = await endpoint_execute(lambda: Root(), group="server104")
+    assert len(r) == 1
+
+def test_apt_split_package():
+    assert split_package("tree") == ("tree", None)
+    assert split_package("nginx=1.24.0-2") == ("nginx", "1.24.0-2")
+    assert split_package("zlib1g=1:1.2.13.dfsg-1") == ("zlib1g", "1:1.2.13.dfsg-1")
+    assert split_package("libc6:amd64") == ("libc6", None)
+    assert split_package("libc6:amd64=2.36-9") == ("libc6", "2.36-9")
+    assert split_package("foo/bookworm-backports") == ("foo", None)
+
+def test_apt_parse_packages():
+    stdout = (
+        "Listing...\n"
+        "tree/stable,now 2.1.0-1 amd64 [installed]\n"
+        "zlib1g/stable,now 1:1.2.13.dfsg-1 amd64 [installed,automatic]\n"
+    )
+    packages = list(iter_apt_list_installed(stdout))
+    assert packages == [("tree", "2.1.0-1"), ("zlib1g", "1:1.2.13.dfsg-1")]
+    assert parse_apt_list_installed(stdout) == [
+        {"name": "tree", "version": "2.1.0-1"},
+        {"name": "zlib1g", "version": "1:1.2.13.dfsg-1"},
+    ]
+    package_list = PackageList.from_tuples(packages)
+    assert package_list.packages[1].name == "zlib1g"
+    assert PackageList.model_validate(package_list.model_dump()) == PackageList(
+        packages=packages
+    )
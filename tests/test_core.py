@@ -18,6 +18,22 @@ async def test_core_group(setup_inventory):
     r = await endpoint_execute(lambda: Root())
     assert len([item for item in r if item is not None])==1
 
+@pytest.mark.asyncio
+async def test_core_group_scheduling(setup_inventory):
+    """verify that only hosts in the requested group are processed."""
+    from reemote.system import Return
+
+    hosts = []
+
+    class Root:
+        async def execute(self):
+            hosts.append(self)
+            yield Return(value="Hello")
+
+    r = await endpoint_execute(lambda: Root(), group="server105")
+    assert [item["host"] for item in r] == ["server105"]
+    assert len(hosts) == 1
+
 @pytest.mark.asyncio
 async def test_core_recent_responses(setup_inventory):
     """verify that, for each host, only the most recent response is returned."""
@@ -30,3 +46,156 @@ async def test_core_recent_responses(setup_inventory):
 
     r = await endpoint_execute(lambda: Root())
 
+
+@pytest.mark.asyncio
+async def test_core_responses_in_inventory_order(setup_inventory):
+    """verify that each host's last response is returned in inventory order."""
+    from reemote.config import Config
+    from reemote.system import Return
+
+    class Root:
+        async def execute(self):
+            yield Return(value="first")
+            yield Return(value="last")
+
+    r = await endpoint_execute(lambda: Root())
+    hosts = [item["connection"]["host"] for item in Config().get_inventory()["hosts"]]
+    assert [item["host"] for item in r] == hosts
+    assert all(item["value"] == "last" for item in r)
+
+
+@pytest.mark.asyncio
+async def test_core_connection_reuse(setup_inventory):
+    """verify that consecutive commands on a host reuse one pooled connection."""
+    from reemote.host import Shell
+    from reemote.core.connection_pool import connection_pool
+
+    class Root:
+        async def execute(self):
+            yield Shell(cmd="echo Hello")
+            yield Shell(cmd="echo World")
+
+    await endpoint_execute(lambda: Root())
+    connects = connection_pool.connects
+    await endpoint_execute(lambda: Root())
+    assert connection_pool.connects == connects
+
+@pytest.mark.asyncio
+async def test_core_stream(setup_inventory):
+    """verify that streamed responses arrive per host, with intermediates on request."""
+    from reemote.execute import endpoint_execute_stream
+    from reemote.system import Callback
+
+    async def _callback(context):
+        return context.value
+
+    class Root:
+        async def execute(self):
+            yield Callback(callback=_callback, value="first")
+            yield Callback(callback=_callback, value="last")
+
+    r = [item async for item in endpoint_execute_stream(lambda: Root())]
+    assert sorted(item["host"] for item in r) == ["server104", "server105"]
+    assert all(item["value"] == "last" for item in r)
+
+    r = [item async for item in endpoint_execute_stream(lambda: Root(), intermediate=True)]
+    assert len(r) == 4
+
+def test_core_stream_endpoint(setup_inventory):
+    """verify that an endpoint streams one NDJSON line per host when asked to."""
+    import json
+    from fastapi.testclient import TestClient
+    from reemote.app import app
+
+    with TestClient(app) as client:
+        r = client.get("/reemote/inventory/get", params={"stream": "ndjson"})
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in r.text.splitlines()]
+        assert sorted(line["host"] for line in lines) == ["server104", "server105"]
+
+def test_core_stream_put_endpoint(setup_inventory, setup_directory):
+    """verify that a put endpoint answers with the same records listed, streamed or in a job."""
+    import json
+    from fastapi.testclient import TestClient
+    from reemote.app import app
+
+    params = {"path": "testdata/put_dir", "present": True}
+    with TestClient(app) as client:
+        client.put("/reemote/sftp/directory", params=params)
+        listed = client.put("/reemote/sftp/directory", params=params).json()
+
+        r = client.put("/reemote/sftp/directory", params={**params, "stream": "ndjson"})
+        streamed = [json.loads(line) for line in r.text.splitlines()]
+
+        job = client.put("/reemote/sftp/directory", params={**params, "background": True}).json()
+        r = client.get(f"/reemote/jobs/{job['id']}/stream")
+        saved = [json.loads(line) for line in r.text.splitlines()]
+        client.delete(f"/reemote/jobs/{job['id']}")
+
+    def by_host(records):
+        return sorted(records, key=lambda record: record["host"])
+
+    assert len(listed) == 2 and not any(record["changed"] for record in listed)
+    assert by_host(streamed) == by_host(listed)
+    assert by_host(saved) == by_host(listed)
+
+@pytest.mark.asyncio
+async def test_core_fact_cache(setup_inventory):
+    """verify that facts are answered from the cache until the host changes."""
+    from reemote.core.facts import fact_cache
+    from reemote.core.local import Local, LocalModel
+    from reemote.system import Return
+
+    calls = []
+
+    class FactModel(LocalModel):
+        pass
+
+    class Fact(Local):
+        Model = FactModel
+
+        @staticmethod
+        def _fact(model_instance):
+            return "Fact()"
+
+        @staticmethod
+        async def _callback(context):
+            context.changed = False
+            calls.append(context.inventory_item.connection.host)
+            return len(calls)
+
+    fact_cache.clear()
+    await endpoint_execute(lambda: Fact())
+    r = await endpoint_execute(lambda: Fact())
+    assert len(calls) == 2
+    assert all(not item["changed"] for item in r)
+
+    await endpoint_execute(lambda: Return(group="server104"))
+    await endpoint_execute(lambda: Fact())
+    assert sorted(calls) == ["server104", "server104", "server105"]
+
+@pytest.mark.asyncio
+async def test_core_model_cache(setup_inventory):
+    """verify that the hosts of a request share one validated model."""
+    from reemote.core.local import Local, LocalModel
+    from reemote.core.model_cache import model_cache
+
+    models = []
+
+    class CachedModel(LocalModel):
+        value: int
+
+    class Cached(Local):
+        Model = CachedModel
+
+        @staticmethod
+        async def _callback(context):
+            models.append(context.caller)
+
+    model_cache.clear()
+    await endpoint_execute(lambda: Cached(value=1))
+    assert len(models) == 2
+    assert models[0] is models[1]
+
+    await endpoint_execute(lambda: Cached(value=True))
+    assert models[2] is not models[0]
@@ -30,6 +30,32 @@ async def test_shell_sudo(setup_inventory):
 
     await endpoint_execute(lambda: Root())
 
+@pytest.mark.asyncio
+async def test_pipeline(setup_inventory):
+    from reemote.host import Pipeline, Shell
+
+    class Root:
+        async def execute(self):
+            r = yield Pipeline(
+                operations=[
+                    Shell(cmd="echo Hello"),
+                    Shell(cmd="printf World"),
+                    Shell(cmd="echo error >&2; exit 3"),
+                    Shell(cmd="echo server104", group="server104"),
+                ]
+            )
+            if r:
+                hello, world, error, server104 = r["value"]
+                assert hello["value"]["stdout"] == "Hello\n"
+                assert world["value"]["stdout"] == "World"
+                assert error["value"]["stderr"] == "error\n"
+                assert error["value"]["returncode"] == 3
+                assert (server104 is None) == (r["host"] != "server104")
+                assert r["changed"]
+
+    r = await endpoint_execute(lambda: Root())
+    assert len(r)==2
+
 @pytest.mark.asyncio
 async def test_get_context(setup_inventory):
     from reemote.host import Getcontext
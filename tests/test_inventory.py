@@ -126,3 +126,16 @@ async def test_inventory_unreachable_host_sftp_fact():
 
     rl = await endpoint_execute(lambda: Root())
     assert any("error" in r for r in rl)
+
+
+def test_inventory_cached_model(setup_inventory):
+    """verify that the validated inventory is reused until the file changes."""
+    config = Config()
+    inventory = config.get_inventory_model()
+    assert config.get_inventory_model() is inventory
+    assert [item.connection.host for item in inventory.hosts_in_group("server104")] == ["server104"]
+    assert len(inventory.hosts_in_group("all")) == 2
+
+    hosts = config.get_inventory()["hosts"][:1]
+    config.set_inventory({"hosts": hosts})
+    assert len(config.get_inventory_model().hosts) == 1
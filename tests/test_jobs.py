@@ -0,0 +1,63 @@
+def test_jobs_background(setup_inventory):
+    """verify that a background job answers at once and saves a response per host."""
+    import json
+    from fastapi.testclient import TestClient
+    from reemote.app import app
+
+    with TestClient(app) as client:
+        r = client.post("/reemote/host/shell", params={"cmd": "echo Hello", "background": True})
+        assert r.status_code == 202
+        job = r.json()
+        assert job["operation"] == "Shell" and job["status"] == "running"
+
+        # The stream ends when the job ends
+        r = client.get(f"/reemote/jobs/{job['id']}/stream")
+        lines = [json.loads(line) for line in r.text.splitlines()]
+        assert sorted(line["host"] for line in lines) == ["server104", "server105"]
+        assert all(line["value"]["stdout"] == "Hello\n" for line in lines)
+
+        r = client.get(f"/reemote/jobs/{job['id']}", params={"offset": 1})
+        assert r.json()["job"]["status"] == "completed"
+        assert len(r.json()["responses"]) == 1 and r.json()["next"] == 2
+
+        assert job["id"] in [item["id"] for item in client.get("/reemote/jobs/").json()]
+        assert client.delete(f"/reemote/jobs/{job['id']}").status_code == 200
+        assert client.get(f"/reemote/jobs/{job['id']}").status_code == 404
+
+
+def test_jobs_cancel(setup_inventory):
+    """verify that cancelling a job stops it and keeps its record."""
+    from fastapi.testclient import TestClient
+    from reemote.app import app
+
+    with TestClient(app) as client:
+        r = client.post("/reemote/host/shell", params={"cmd": "sleep 30", "background": True})
+        job = r.json()
+        r = client.post(f"/reemote/jobs/{job['id']}/cancel")
+        assert r.json()["status"] == "cancelled"
+        assert client.get(f"/reemote/jobs/{job['id']}").json()["job"]["status"] == "cancelled"
+        client.delete(f"/reemote/jobs/{job['id']}")
+
+
+def test_jobs_finished_released(tmp_path):
+    """verify that an ended job is read back from its files rather than held."""
+    import asyncio
+    from reemote.core.jobs import JobManager, JobStatus
+
+    async def responses():
+        for host in ("server104", "server105"):
+            yield {"host": host, "changed": False, "error": host == "server105", "value": None}
+
+    async def run():
+        manager = JobManager(tmp_path)
+        info = manager.submit("Shell", responses)
+        task = manager._jobs[info.id].task
+        followed = [response async for response in manager.follow(info.id)]
+        await task
+        assert info.id not in manager._jobs
+        saved = manager.get(info.id)
+        assert saved.status == JobStatus.COMPLETED
+        assert saved.responses == 2 and saved.errors == 1
+        assert manager.results(info.id) == (followed, 2)
+
+    asyncio.run(run())
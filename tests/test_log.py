@@ -0,0 +1,46 @@
+import logging
+
+import pytest
+
+from reemote.core.log import RunContextFilter, payload, run_context
+from reemote.execute import endpoint_execute
+
+
+def test_log_payload_truncated():
+    result = {"host": "server104", "value": {"stdout": "x" * 100000}}
+    assert len(str(payload(result))) < 1000
+    assert str(payload("Hello")) == "Hello"
+
+
+@pytest.mark.asyncio
+async def test_log_run_context(setup_inventory):
+    """verify that each record is tagged with the run and the host it came from."""
+    from reemote.system import Callback
+
+    records = []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            records.append((record.run_id, record.host))
+
+    async def _callback(context):
+        logging.getLogger("reemote.test").warning("callback")
+        return context.value
+
+    class Root:
+        async def execute(self):
+            yield Callback(callback=_callback)
+
+    handler = Capture()
+    handler.addFilter(RunContextFilter())
+    logging.getLogger("reemote.test").addHandler(handler)
+    try:
+        await endpoint_execute(lambda: Root())
+    finally:
+        logging.getLogger("reemote.test").removeHandler(handler)
+
+    assert sorted(host for _, host in records) == ["server104", "server105"]
+    assert len({run for run, _ in records}) == 1
+    assert records[0][0] != "-"
+    with run_context() as run:
+        assert run != records[0][0]
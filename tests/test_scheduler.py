@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from reemote.core.scheduler import Scheduler, batch_size
+from reemote.execute import endpoint_execute
+
+
+def test_scheduler_batch_size():
+    assert batch_size(None, 10) == 10
+    assert batch_size(3, 10) == 3
+    assert batch_size("25%", 10) == 3
+    assert batch_size("100%", 10) == 10
+    with pytest.raises(ValueError):
+        batch_size(0, 10)
+    assert [len(batch) for batch in Scheduler(serial=4).batches(list(range(10)))] == [4, 4, 2]
+
+
+async def _run_concurrently(**kwargs):
+    from reemote.system import Callback
+
+    running = []
+    peak = []
+
+    async def _callback(context):
+        running.append(context.inventory_item.connection.host)
+        peak.append(len(running))
+        await asyncio.sleep(0.05)
+        running.remove(context.inventory_item.connection.host)
+        return "done"
+
+    class Root:
+        async def execute(self):
+            yield Callback(callback=_callback)
+
+    r = await endpoint_execute(lambda: Root(), **kwargs)
+    return r, max(peak)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_unbounded(setup_inventory):
+    r, peak = await _run_concurrently()
+    assert len(r) == 2
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_forks(setup_inventory):
+    r, peak = await _run_concurrently(forks=1)
+    assert len(r) == 2
+    assert peak == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_serial(setup_inventory):
+    r, peak = await _run_concurrently(serial="50%")
+    assert len(r) == 2
+    assert peak == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_group_limits(setup_inventory):
+    r, peak = await _run_concurrently(group_limits={"all": 1})
+    assert len(r) == 2
+    assert peak == 1
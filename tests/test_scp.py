@@ -54,3 +54,128 @@ async def test_scp_copy(setup_inventory, setup_directory):
                     assert r1["value"]
 
     await endpoint_execute(lambda: Root())
+
+
+@pytest.mark.asyncio
+async def test_scp_copy_facts(setup_inventory, setup_directory):
+    """verify that a copy is not hidden by the destination's cached facts."""
+    from reemote.scp import Copy
+    from reemote.sftp import Isfile
+
+    path = "/home/user/testdata/file_e.txt"
+
+    class Before:
+        async def execute(self):
+            r = yield Isfile(path=path)
+            assert r and not r["value"]
+
+    class Transfer:
+        async def execute(self):
+            r = yield Copy(
+                srcpaths=["/home/user/testdata/file_b.txt"],
+                dstpath=path,
+                dsthost="server104",
+            )
+            assert r and not r["error"]
+
+    class After:
+        async def execute(self):
+            r = yield Isfile(path=path)
+            assert r and r["value"]
+
+    # Separate runs, so the destination is stat'ed before and after the copy
+    await endpoint_execute(lambda: Before(), group="server104")
+    await endpoint_execute(lambda: Transfer(), group="server105")
+    await endpoint_execute(lambda: After(), group="server104")
+
+
+@pytest.mark.asyncio
+async def test_scp_upload_sync(setup_inventory, setup_directory):
+    from reemote.scp import Upload
+
+    class Root:
+        async def execute(self):
+            r = yield Upload(
+                srcpaths=["tests/testdata"],
+                dstpath="synced",
+                recurse=True,
+                preserve=True,
+                sync=True,
+            )
+            if r:
+                assert not r["error"]
+            r = yield Upload(
+                srcpaths=["tests/testdata"],
+                dstpath="synced",
+                recurse=True,
+                preserve=True,
+                sync=True,
+                checksum=True,
+            )
+            if r:
+                assert not r["error"]
+                assert not r["changed"]
+
+    r = await endpoint_execute(lambda: Root())
+    assert len(r) == 2
+
+
+@pytest.mark.asyncio
+async def test_scp_upload_sync_defaults(setup_inventory, setup_directory):
+    """verify that sync skips unchanged files without preserve."""
+    from reemote.scp import Upload
+
+    class Root:
+        async def execute(self):
+            r = yield Upload(srcpaths=["tests/testdata"], dstpath="synced", recurse=True, sync=True)
+            if r:
+                assert not r["error"]
+                assert r["changed"]
+            r = yield Upload(srcpaths=["tests/testdata"], dstpath="synced", recurse=True, sync=True)
+            if r:
+                assert not r["error"]
+                assert not r["changed"]
+
+    r = await endpoint_execute(lambda: Root())
+    assert len(r) == 2
+
+
+@pytest.mark.asyncio
+async def test_scp_distribute(setup_inventory, setup_directory):
+    from reemote.scp import Distribute
+    from reemote.sftp import Isfile
+
+    class Root:
+        async def execute(self):
+            r = yield Distribute(
+                srcpaths=["tests/testdata/file_b.txt"],
+                dstpath="/home/user/testdata/file_d.txt",
+                fanout=1,
+            )
+            if r:
+                assert not r["error"]
+                assert r["changed"]
+            r = yield Isfile(path="/home/user/testdata/file_d.txt")
+            if r:
+                assert r["value"]
+
+    r = await endpoint_execute(lambda: Root())
+    assert len(r) == 2
+
+
+@pytest.mark.asyncio
+async def test_scp_distribute_serial(setup_inventory, setup_directory):
+    """verify that the hosts of a later batch receive the files from an earlier one."""
+    from reemote.scp import Distribute
+
+    class Root:
+        async def execute(self):
+            yield Distribute(
+                srcpaths=["tests/testdata/file_b.txt"],
+                dstpath="/home/user/testdata/file_f.txt",
+                fanout=1,
+            )
+
+    r = await endpoint_execute(lambda: Root(), serial=1)
+    # Distribute returns the seed a host copied from, or None from the API host
+    assert [item["value"] for item in r] == [None, "server104"]
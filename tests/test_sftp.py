@@ -49,6 +49,26 @@ async def test_sftp_get(setup_inventory, setup_directory):
     await endpoint_execute(lambda: Root())
 
 
+@pytest.mark.asyncio
+async def test_sftp_get_autotune(setup_inventory, setup_directory):
+    from reemote.config import Config
+    from reemote.core.autotune import link_tuner
+    from reemote.sftp import Get
+    import os
+
+    class Root:
+        async def execute(self):
+            r = yield Get(remotepaths="testdata/file_b.txt", localpath="/tmp", autotune=True)
+            assert r and not r["error"]
+            assert os.path.exists("/tmp/file_b.txt")
+
+    link_tuner.clear()
+    await endpoint_execute(lambda: Root())
+    for item in Config().get_inventory_model().hosts:
+        link = link_tuner.get(item.connection)
+        assert link and link.rtt > 0 and link.block_size > 0
+
+
 @pytest.mark.asyncio
 async def test_sftp_mget(setup_inventory, setup_directory):
     from reemote.sftp import Mget
@@ -77,6 +97,61 @@ async def test_sftp_put(setup_inventory, setup_directory):
 
     await endpoint_execute(lambda: Root())
 
+@pytest.fixture
+def resume_file(tmp_path):
+    import os
+
+    path = tmp_path / "file_e.bin"
+    path.write_bytes(os.urandom(3 * 1024 * 1024))
+    return path
+
+
+@pytest.mark.asyncio
+async def test_sftp_put_resume(setup_inventory, setup_directory, resume_file, tmp_path):
+    from reemote.sftp import Put
+    from reemote.host import Shell
+    import hashlib
+
+    checkpoint = str(tmp_path / "checkpoints.json")
+    dropped = []
+    resumed = []
+
+    def stop(srcpath, dstpath, offset, size):
+        dropped.append(offset)
+        if offset < size:
+            raise RuntimeError("connection dropped")
+
+    def record(srcpath, dstpath, offset, size):
+        resumed.append(offset)
+
+    class Root:
+        async def execute(self):
+            r = yield Put(
+                localpaths=str(resume_file),
+                remotepath="testdata/file_e.bin",
+                resume=True,
+                checkpoint=checkpoint,
+                progress_handler=stop,
+            )
+            assert r and r["error"]
+            r = yield Put(
+                localpaths=str(resume_file),
+                remotepath="testdata/file_e.bin",
+                resume=True,
+                checkpoint=checkpoint,
+                progress_handler=record,
+            )
+            assert r and not r["error"]
+            r = yield Shell(cmd="sha256sum testdata/file_e.bin")
+            assert r and r["value"]["stdout"].split()[0] == hashlib.sha256(
+                resume_file.read_bytes()
+            ).hexdigest()
+
+    await endpoint_execute(lambda: Root(), group="server104")
+    # The second transfer went on from where the first one stopped
+    assert resumed[0] > dropped[-1]
+    assert resumed[-1] == 3 * 1024 * 1024
+
 @pytest.mark.asyncio
 async def test_sftp_mput(setup_inventory, setup_directory):
     from reemote.sftp import Mput
@@ -95,3 +170,96 @@ async def test_sftp_mput(setup_inventory, setup_directory):
             assert r and r["value"]
 
     await endpoint_execute(lambda: Root())
+
+@pytest.mark.asyncio
+async def test_sftp_read_range(setup_inventory, setup_directory):
+    from reemote.sftp import Read
+
+    class Root:
+        async def execute(self):
+            r = yield Read(path="testdata/file_b.txt", offset=2, length=3)
+            assert r and r["value"] == "le_"
+
+    r = await endpoint_execute(lambda: Root())
+    assert len(r) == 2
+
+
+@pytest.mark.asyncio
+async def test_sftp_read_compress(setup_inventory, setup_directory):
+    from reemote.sftp import Read
+
+    class Root:
+        async def execute(self):
+            r = yield Read(path="testdata/file_b.txt", compress="gzip")
+            assert r and r["value"] == "file_b"
+            r = yield Read(path="testdata/file_b.txt", compress="gzip", offset=2, length=3)
+            assert r and r["value"] == "le_"
+            r = yield Read(path="testdata/file_b.txt", ssh_compression=True)
+            assert r and r["value"] == "file_b"
+
+    r = await endpoint_execute(lambda: Root())
+    assert len(r) == 6
+
+def test_sftp_read_stream(setup_inventory, setup_directory):
+    import base64
+    import json
+    from fastapi.testclient import TestClient
+    from reemote.app import app
+
+    with TestClient(app) as client:
+        r = client.get(
+            "/reemote/sftp/read_stream",
+            params={"path": "testdata/file_b.txt", "group": "server104", "offset": 2},
+        )
+        assert r.headers["content-type"] == "application/octet-stream"
+        assert r.content == b"le_b"
+
+        r = client.get("/reemote/sftp/read_stream", params={"path": "testdata/file_b.txt"})
+        lines = [json.loads(line) for line in r.text.splitlines()]
+        data = [base64.b64decode(line["data"]) for line in lines if "data" in line]
+        assert data == [b"file_b", b"file_b"]
+        assert sum(1 for line in lines if line.get("done")) == 2
+
+def test_sftp_write_stream(setup_inventory, setup_directory):
+    from fastapi.testclient import TestClient
+    from reemote.app import app
+
+    def body():
+        yield b"written "
+        yield b"in chunks"
+
+    with TestClient(app) as client:
+        r = client.post(
+            "/reemote/sftp/write_stream",
+            params={"path": "testdata/streamed.txt"},
+            content=body(),
+        )
+        assert [item["value"] for item in r.json()] == [17, 17]
+
+        r = client.get(
+            "/reemote/sftp/read_stream",
+            params={"path": "testdata/streamed.txt", "group": "server105"},
+        )
+        assert r.content == b"written in chunks"
+
+def test_sftp_write_stream_facts(setup_inventory, setup_directory):
+    """verify that a streamed write is not hidden by a cached file size."""
+    from fastapi.testclient import TestClient
+    from reemote.app import app
+
+    with TestClient(app) as client:
+        client.post(
+            "/reemote/sftp/write_stream",
+            params={"path": "testdata/streamed.txt"},
+            content=b"short",
+        )
+        r = client.get("/reemote/sftp/getsize", params={"path": "testdata/streamed.txt"})
+        assert [item["value"] for item in r.json()] == [5, 5]
+
+        client.post(
+            "/reemote/sftp/write_stream",
+            params={"path": "testdata/streamed.txt"},
+            content=b"a little longer",
+        )
+        r = client.get("/reemote/sftp/getsize", params={"path": "testdata/streamed.txt"})
+        assert [item["value"] for item in r.json()] == [15, 15]
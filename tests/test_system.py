@@ -61,3 +61,60 @@ async def test_return(setup_inventory):
 
     r = await endpoint_execute(lambda: Parent())
     assert len(r) == 2
+
+@pytest.mark.asyncio
+async def test_parallel(setup_inventory):
+    """verify that Parallel runs operations concurrently, up to its limit."""
+    import asyncio
+    from reemote.system import Callback, Parallel
+    from reemote.context import Context
+
+    running = {"server104": 0, "server105": 0}
+    peak = []
+
+    async def _callback(context: Context):
+        host = context.inventory_item.connection.host
+        running[host] += 1
+        peak.append(running[host])
+        await asyncio.sleep(0.05)
+        running[host] -= 1
+        return context.value
+
+    class Root:
+        async def execute(self):
+            r = yield Parallel(
+                operations=[Callback(callback=_callback, value=i) for i in range(6)],
+                limit=3,
+            )
+            if r:
+                assert [item["value"] for item in r["value"]] == list(range(6))
+                assert r["changed"]
+
+    r = await endpoint_execute(lambda: Root())
+    assert len(r) == 2
+    assert max(peak) == 3
+
+@pytest.mark.asyncio
+async def test_system_execution_context(setup_inventory):
+    from reemote.context import ConnectionType, Context, ExecutionContext
+
+    contexts = []
+
+    async def _callback(context: ExecutionContext):
+        assert isinstance(context, ExecutionContext)
+        context.changed = False
+        return context.to_context().inventory_item.connection.host
+
+    class Root:
+        async def execute(self):
+            context = Context(type=ConnectionType.LOCAL, callback=_callback)
+            contexts.append(context)
+            r = yield context
+            if r:
+                assert r["value"] == r["host"]
+                assert not r["changed"]
+
+    r = await endpoint_execute(lambda: Root())
+    assert len(r) == 2
+    # The Context created by the operation is left as it was
+    assert all(c.changed and c.inventory_item is None for c in contexts)